@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from array import array
 from typing import Any, Iterable
 
 
@@ -18,11 +19,16 @@ class Feature:
     Attributes:
         _name (str): human-readable name of the feature (e.g., "over 65 years old")
         _value (str): machine-readable value of the feature (e.g., True)
+        _hash (int): hash of the feature, computed once since features are shared and hashed into many sets
     """
 
     def __init__(self, name, value=None):
         self._name: str = name
         self._value: Any = value
+        self._hash: int = hash((name, value))
+
+    def __reduce__(self):
+        return type(self), (self._name, self._value)  # string hashes differ between processes, so rehash on load
 
     @property
     def name(self) -> str:
@@ -38,7 +44,7 @@ class Feature:
         elif not isinstance(other, Feature):
             return False
         else:
-            return self._name == other.name and self._value == other.value
+            return self._name == other._name and self._value == other._value
 
     def __str__(self) -> str:
         return self.__repr__()
@@ -47,7 +53,57 @@ class Feature:
         return f"{self._name} = {self._value}"
 
     def __hash__(self) -> int:
-        return hash((self._name, self._value))
+        return self._hash
+
+
+class FeatureVocabulary:
+    """Interns features, storing every distinct `Feature` once and mapping it to a dense integer id.
+
+    Attributes:
+        _ids (dict[tuple[str, Any], int]): id of every interned feature, keyed by its (name, value) pair
+        _features (list[Feature]): the interned features, indexed by id
+    """
+
+    def __init__(self, features: Iterable[Feature] = ()):
+        self._ids: dict[tuple[str, Any], int] = {}
+        self._features: list[Feature] = []
+        for feature in features:
+            self.intern(feature)
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def __iter__(self):
+        return iter(self._features)
+
+    def __contains__(self, feature: Feature) -> bool:
+        return (feature.name, feature.value) in self._ids
+
+    def intern(self, feature: Feature) -> int:
+        """Returns the id of `feature`, assigning it the next free id if it has not been seen before."""
+        return self.intern_pair(feature.name, feature.value, feature)
+
+    def intern_pair(self, name: str, value: Any = None, feature: Feature = None) -> int:
+        """Returns the id of the feature with the given name and value, interning it (as `feature` if given, as a
+        new `Feature` otherwise) if it has not been seen before."""
+        key = (name, value)
+        feature_id = self._ids.get(key)
+        if feature_id is None:
+            feature_id = self._ids[key] = len(self._features)
+            self._features.append(feature if feature is not None else Feature(name, value))
+        return feature_id
+
+    def get_id(self, feature: Feature) -> int | None:
+        """Returns the id of `feature`, or None if it has not been interned."""
+        return self._ids.get((feature.name, feature.value))
+
+    def feature(self, feature_id: int) -> Feature:
+        """Returns the interned feature with the given id."""
+        return self._features[feature_id]
+
+    def encode(self, features: Iterable[Feature]) -> array:
+        """Interns every feature and returns their ids, sorted, as an `array("i")`."""
+        return array("i", sorted({self.intern(feature) for feature in features}))
 
 
 class FeatureSet:
@@ -58,6 +114,8 @@ class FeatureSet:
         _clas (str | None): optional attribute set as the pre-defined classification of this object
     """
 
+    __slots__ = ("_feat", "_clas")
+
     def __init__(self, features: set[Feature], known_clas=None):
         self._feat: set[Feature] = features
         self._clas: str | None = known_clas
@@ -89,6 +147,60 @@ class FeatureSet:
         """
         pass
 
+    @classmethod
+    def build_batch(cls, source_objects: Iterable[Any], known_clas=None, label_key: str = None,
+                    **kwargs) -> list[FeatureSet]:
+        """Builds a feature set for every source object of a batch. Calls `build` once per object by default;
+        subclasses that can extract features for a whole batch at once override it.
+
+        :param source_objects: objects to build the feature sets from
+        :param known_clas: pre-defined classification shared by every source object
+        :param label_key: key of the source objects' own classification, overrides `known_clas`
+        :param kwargs: any additional data passed on to `build`
+        :return: the feature sets, in the order of `source_objects`
+        """
+        return [cls.build(source_object, source_object[label_key] if label_key is not None else known_clas, **kwargs)
+                for source_object in source_objects]
+
+
+class CompactFeatureSet(FeatureSet):
+    """Array-backed `FeatureSet` that stores the sorted ids of its features in a `FeatureVocabulary` instead of a set
+    of `Feature` objects. `feat` is still available as a view that looks the features up in the vocabulary.
+
+    Attributes:
+        _feat (array[int]): sorted vocabulary ids of the features that define this object
+        _vocabulary (FeatureVocabulary): vocabulary the ids refer to
+        _clas (str | None): optional attribute set as the pre-defined classification of this object
+    """
+
+    __slots__ = ("_vocabulary",)  # the ids take the place of the feature set in the inherited `_feat` slot
+
+    def __init__(self, ids: array, vocabulary: FeatureVocabulary, known_clas=None):
+        super().__init__(ids, known_clas)
+        self._vocabulary: FeatureVocabulary = vocabulary
+
+    def __reduce__(self):
+        # the ids may be a memoryview of a memory-mapped file, which cannot be pickled, so they are copied
+        return type(self), (array("i", self._feat), self._vocabulary, self._clas)
+
+    @classmethod
+    def encode(cls, feature_set: FeatureSet, vocabulary: FeatureVocabulary) -> CompactFeatureSet:
+        """Returns a compact copy of `feature_set`, interning its features into `vocabulary`."""
+        return cls(vocabulary.encode(feature_set.feat), vocabulary, feature_set.clas)
+
+    @property
+    def ids(self) -> array:
+        return self._feat
+
+    @property
+    def vocabulary(self) -> FeatureVocabulary:
+        return self._vocabulary
+
+    @property
+    def feat(self) -> set[Feature]:
+        feature = self._vocabulary.feature
+        return {feature(feature_id) for feature_id in self._feat}
+
 
 class AbstractClassifier(ABC):
     """Abstract definition for an object classifier."""
@@ -103,6 +215,18 @@ class AbstractClassifier(ABC):
         """
         pass
 
+    def present_features(self, top_n: int = 1) -> dict[str, list[tuple[Feature, float]]]:
+        """Returns `top_n` feature(s) used by this classifier for every class, in the descending order of
+        informativeness of the feature in determining that class for any object. Informativeness of a feature is a
+        quantity that represents how "good" a feature is in determining the class for an object.
+
+        Classifiers that do not rank their features return an empty dict, which is the default.
+
+        :param top_n: how many of the top features to return per class; must be 1 or greater
+        :return: the top features of every class with their informativeness, best first, by class name
+        """
+        return {}
+
     @classmethod
     @abstractmethod
     def train(cls, training_set: Iterable[FeatureSet]) -> AbstractClassifier:
@@ -0,0 +1,176 @@
+"""Reproducible throughput and memory benchmarks of feature building, training and prediction on synthetic
+Jeopardy-style questions, e.g. `python jeopardy_benchmarks.py --scales 10000 200000 --output bench.json`
+"""
+from jeopardy_classifier_models import *
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+DEFAULT_SCALES = [10_000, 200_000, 2_000_000]
+
+# approximate share of each round in 200k_questions.json, and the dollar values its questions can have
+_ROUND_WEIGHTS = [0.49, 0.49, 0.0175, 0.0025]
+_ROUND_VALUES = [[200, 400, 600, 800, 1000], [400, 800, 1200, 1600, 2000], [None], [None]]
+_WORDS = ("this the of a in is was his her to by for that name city country war king river book film famous first "
+          "president state capital island queen novel song element planet ocean mountain composer painter").split()
+
+
+def synthetic_questions(n: int, seed: int = 0) -> Iterator[dict]:
+    """Lazily generates `n` questions in the 200k_questions.json schema, with round, value, category and length
+    distributions loosely modelled on the real dataset. The same seed always yields the same questions.
+
+    :param n: number of questions to generate
+    :param seed: seed of the random number generator
+    :return: an iterator over the questions
+    """
+    rng = random.Random(seed)
+    n_categories = max(10, n // 8)  # the real dataset has roughly one category per 8 questions
+    for index in range(n):
+        round_index = rng.choices(range(len(ROUNDS)), _ROUND_WEIGHTS)[0]
+        value = rng.choice(_ROUND_VALUES[round_index])
+        yield {
+            "category": f"CATEGORY {rng.randrange(n_categories)}",
+            "air_date": (datetime.date(1984, 9, 10) + datetime.timedelta(days=index * 10_000 // n)).isoformat(),
+            "question": "'" + " ".join(rng.choices(_WORDS, k=rng.randint(3, 25))) + "'",
+            "value": None if value is None else f"${value:,}",
+            "answer": " ".join(rng.choices(_WORDS, k=rng.randint(1, 3))),
+            "round": ROUNDS[round_index],
+            "show_number": str(1 + index // 61),
+        }
+
+
+def run_scale(n: int, seed: int = 0, score_limit: int = 100_000, trace_memory: bool = False) -> list[dict]:
+    """Benchmarks every stage on `n` synthetic questions.
+
+    Stages run in order: building plain feature sets (discarded as they are built), building compact feature sets,
+    training on the compact sets, then `gamma`, `gamma_batch`, `predict` and `predict_many` on up to `score_limit` of
+    them, so that every batch method can be compared with its per-question counterpart.
+
+    :param n: number of synthetic questions
+    :param seed: seed of the synthetic questions
+    :param score_limit: maximum number of questions scored by the prediction stages
+    :param trace_memory: whether to also measure the peak Python allocations of each stage with tracemalloc, which
+        slows every stage down
+    :return: one result per stage
+    """
+    vocabulary = FeatureVocabulary()
+    state = {}
+
+    def build():
+        for question in synthetic_questions(n, seed):
+            JeopardyFeatureSet.build(question, question["round"])
+
+    def build_compact():
+        state["feature_sets"] = [JeopardyFeatureSet.build_compact(question, question["round"], vocabulary)
+                                 for question in synthetic_questions(n, seed)]
+
+    def train():
+        state["classifier"] = JeopardyClassifier.train(state["feature_sets"], vocabulary=vocabulary)
+
+    def gamma():
+        for feature_set in state["feature_sets"][:score_limit]:
+            state["classifier"].gamma(feature_set)
+
+    def predict():
+        for feature_set in state["feature_sets"][:score_limit]:
+            state["classifier"].predict(feature_set)
+
+    n_scored = min(n, score_limit)
+    stages = [("build", n, build), ("build_compact", n, build_compact), ("train", n, train),
+              ("gamma", n_scored, gamma),
+              ("gamma_batch", n_scored, lambda: state["classifier"].gamma_batch(state["feature_sets"][:score_limit])),
+              ("predict", n_scored, predict),
+              ("predict_many", n_scored, lambda: state["classifier"].predict_many(state["feature_sets"][:score_limit]))]
+    return [_measure(n, stage, items, function, trace_memory) for stage, items, function in stages]
+
+
+def run_benchmarks(scales: Iterable[int] = DEFAULT_SCALES, seed: int = 0, score_limit: int = 100_000,
+                   trace_memory: bool = False, isolate: bool = True) -> dict:
+    """Benchmarks every scale, by default each in a fresh process so that its cumulative max RSS is not inflated by
+    the scales before it.
+
+    :param scales: numbers of synthetic questions to benchmark
+    :param seed: seed of the synthetic questions
+    :param score_limit: maximum number of questions scored by the prediction stages
+    :param trace_memory: whether to also measure peak Python allocations per stage (slower)
+    :param isolate: whether to run each scale in its own process
+    :return: machine-readable results, with the environment they were measured in
+    """
+    results = []
+    for n in scales:
+        if isolate:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                results.extend(executor.submit(run_scale, n, seed, score_limit, trace_memory).result())
+        else:
+            results.extend(run_scale(n, seed, score_limit, trace_memory))
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def _measure(n: int, stage: str, items: int, function: Callable[[], Any], trace_memory: bool) -> dict:
+    """Times one stage and reports its throughput and memory use.
+
+    The OS only reports the maximum RSS of the whole process since it started, so "cumulative_max_rss_kb" is that
+    high-water mark after the stage (including every earlier stage), and "max_rss_growth_kb" is how much the stage
+    raised it. The peak of the stage's own Python allocations is "peak_traced_kb", when memory is traced.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    max_rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = {"scale": n, "stage": stage, "items": items, "seconds": seconds,
+              "items_per_second": items / seconds if seconds else None,
+              "cumulative_max_rss_kb": max_rss, "max_rss_growth_kb": max_rss - max_rss_before}
+    if trace_memory:
+        result["peak_traced_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="numbers of questions")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic questions")
+    parser.add_argument("--score-limit", type=int, default=100_000, help="questions scored by the prediction stages")
+    parser.add_argument("--trace-memory", action="store_true", help="also measure peak allocations per stage")
+    parser.add_argument("--output", default="-", help="file to write the JSON results to, - for stdout")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.scales, args.seed, args.score_limit, args.trace_memory)
+    for result in report["results"]:
+        print(f"{result['scale']:>9} {result['stage']:<14} {result['items_per_second'] or 0:>12.0f} items/s "
+              f"{result['cumulative_max_rss_kb']:>10} KB cumulative max RSS (+{result['max_rss_growth_kb']} KB)",
+              file=sys.stderr)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
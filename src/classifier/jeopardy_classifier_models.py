@@ -1,5 +1,8 @@
-from classifier_models import *
-import json
+from __future__ import annotations
+from naive_bayes import *
+from jeopardy_feature_extractors import *
+from array import array
+from itertools import chain, islice
 
 
 __author__ = "Connor Rogstad"
@@ -8,6 +11,8 @@ __credits__ = ["Connor Rogstad"]
 __license__ = "MIT"
 __email__ = ["crogstad@westmont.edu"]
 
+ROUNDS = ["Jeopardy!", "Double Jeopardy!", "Final Jeopardy!", "Tiebreaker"]  # class order used by JeopardyClassifier
+
 
 class JeopardyFeature(Feature):
     """JeopardyFeature child class of Feature used specifically for the 200k_questions.json file
@@ -29,6 +34,8 @@ class JeopardyFeatureSet(FeatureSet):
         _clas (str | None): optional attribute set as the pre-defined classification of this object
     """
 
+    FEATURE_VERSION = 1  # bump whenever `build` changes, so that cached feature sets are rebuilt
+
     def __init__(self, features: set[Feature], known_clas=None):
         super().__init__(features, known_clas)
 
@@ -48,136 +55,161 @@ class JeopardyFeatureSet(FeatureSet):
         :param known_clas: pre-defined classification of the source object ("Jeopardy!","Double Jeopardy!",
         "Final Jeopardy!" or "Tiebreaker")
         :param kwargs: any additional data needed to preprocess the `source_object` into a feature set
+            extractors: config of the feature extractors to run, `DEFAULT_EXTRACTORS` by default (see
+            `jeopardy_feature_extractors.compile_plan`)
+            text_vectorizer: a `jeopardy_text_features.HashingVectorizer` that adds hashed question and answer text
+            features
         :return: an instance of `FeatureSet` built based on the `source_object` passed in
         """
+        plan = compile_plan(kwargs.get("extractors", DEFAULT_EXTRACTORS), kwargs.get("text_vectorizer"))
+        return FeatureSet(plan.extract_one(source_object), known_clas)
 
-        category = source_object["category"]  # String of the question's category
-        question_text = source_object["question"]  # String of the question's text
-        value = source_object["value"]  # String $ amount for the questions value
-        answer = source_object["answer"]  # String of the question's answer
-
-        source_set = set()
-
-        # Feature for the Category of Question
-        source_set.add(Feature("Category of Question", category))
-
-        # Feature for Length of Question (is it > or < 80)
-        if len(question_text) > 80:
-            source_set.add(Feature("Amount of characters is >80", True))
-        else:
-            source_set.add(Feature("Amount of characters is <80", True))
-
-        # Feature for the value of the question
-        if value is not None:
-            value_int = value[1:]  # get rid of $
-            value_int = value_int.replace(",", "")
-            value_int = int(value_int)
-            source_set.add(Feature("Value of Question", value_int))
+    @classmethod
+    def feature_config(cls, **kwargs) -> str:
+        """Identifies the features that `build` makes with the given kwargs, e.g. to record in a saved classifier how
+        its training feature sets were built (see `NaiveBayesClassifier.check_feature_config`).
 
-        return FeatureSet(source_set, known_clas)
+        :param kwargs: same as `build`
+        :return: the version of `build` and the extractors it runs, with every setting that changes their output
+        """
+        plan = compile_plan(kwargs.get("extractors", DEFAULT_EXTRACTORS), kwargs.get("text_vectorizer"))
+        return f"{cls.__qualname__} v{cls.FEATURE_VERSION} {plan!r}"
 
+    @classmethod
+    def build_batch(cls, source_objects: Iterable[Any], known_clas=None, label_key: str = None,
+                    **kwargs) -> list[FeatureSet]:
+        """Same as `build` for every source object of a batch, but runs the compiled extraction plan once over the
+        whole batch, so each extractor makes a single pass over the columns it reads.
+
+        :param source_objects: jeopardy questions in json format
+        :param known_clas: pre-defined classification shared by every source object
+        :param label_key: key of the source objects' own classification (e.g. "round"), overrides `known_clas`
+        :param kwargs: same as `build`
+        :return: the feature sets, in the order of `source_objects`
+        """
+        source_objects = list(source_objects)
+        plan = compile_plan(kwargs.get("extractors", DEFAULT_EXTRACTORS), kwargs.get("text_vectorizer"))
+        clases = ([source_object[label_key] for source_object in source_objects] if label_key is not None
+                  else [known_clas] * len(source_objects))
+        return [FeatureSet(features, clas) for features, clas in zip(plan.extract(source_objects), clases)]
 
-class JeopardyClassifier(AbstractClassifier):
-    """Abstract definition for an object classifier."""
+    @classmethod
+    def build_compact(cls, source_object: Any, known_clas=None, vocabulary: FeatureVocabulary = None,
+                      **kwargs) -> CompactFeatureSet:
+        """Same as `build`, but interns the extracted features straight into `vocabulary` and returns their ids as a
+        `CompactFeatureSet`, without building an intermediate `FeatureSet`.
 
-    def __init__(self, probability_dict: dict, proportions_list: list):
-        self.probability_dict = probability_dict
-        self.proportions_list = proportions_list
+        Ids are only meaningful within one vocabulary, so there is no default: every feature set that a classifier is
+        trained on or scores must be built with the vocabulary of that classifier (or of its feature cache).
 
-    def get_probability_dict(self) -> dict:
-        return self.probability_dict
+        :param source_object: a single jeopardy question in json format
+        :param known_clas: pre-defined classification of the source object
+        :param vocabulary: vocabulary to intern the features into
+        :param kwargs: any additional data needed to preprocess the `source_object` into a feature set
+        :return: the compact feature set built based on the `source_object` passed in
+        """
+        if vocabulary is None:
+            raise ValueError("build_compact needs the vocabulary to intern the features into")
+        plan = compile_plan(kwargs.get("extractors", DEFAULT_EXTRACTORS), kwargs.get("text_vectorizer"))
+        features = chain.from_iterable(extractor.extract_one(source_object) for extractor in plan.extractors)
+        return CompactFeatureSet(vocabulary.encode(features), vocabulary, known_clas)
 
-    def get_proportions_list(self) -> list:
-        return self.proportions_list
+    @classmethod
+    def build_many(cls, source_objects: Iterable[Any], known_clas=None, label_key: str = None, workers: int = 1,
+                   chunksize: int = 1000, vocabulary: FeatureVocabulary = None, parallel=None,
+                   **kwargs) -> list[FeatureSet]:
+        """Builds a feature set for every source object, fanning the `build` calls out across a joblib process pool.
+
+        Source objects are sent to the workers in chunks of `chunksize`. The workers send back each feature set as
+        plain (name, value) tuples, which are cheap to pickle. Those are interned into `vocabulary` when one is
+        given, producing `CompactFeatureSet`s; otherwise equal features are rebuilt here as one shared `Feature`
+        instance. In-process without a vocabulary, the chunks are simply built with `build_batch`. Callers that build
+        many batches pass the same `parallel` to every call, so that its worker pool is started only once.
+
+        :param source_objects: jeopardy questions in json format
+        :param known_clas: pre-defined classification shared by every source object
+        :param label_key: key of the source objects' own classification (e.g. "round"), overrides `known_clas`
+        :param workers: number of worker processes, as joblib's `n_jobs` (-1 for one per core, 1 to stay in-process)
+        :param chunksize: number of source objects built per worker task
+        :param vocabulary: vocabulary to intern the features into, if compact feature sets are wanted
+        :param parallel: a `joblib.Parallel` to run the worker tasks on instead of a new one with `workers` jobs,
+            e.g. one entered with `with Parallel(n_jobs=workers) as parallel:` around several calls
+        :param kwargs: any additional data passed on to `build`
+        :return: the feature sets, in the order of `source_objects`
+        """
+        chunks = _chunks(source_objects, chunksize)
+        in_process = workers == 1 and parallel is None
+        if in_process and vocabulary is None:
+            return [feature_set for chunk in chunks
+                    for feature_set in cls.build_batch(chunk, known_clas, label_key, **kwargs)]
+        if in_process:
+            compact_chunks = (_build_chunk(cls, chunk, known_clas, label_key, kwargs) for chunk in chunks)
+        else:
+            from joblib import Parallel, delayed
+            parallel = parallel if parallel is not None else Parallel(n_jobs=workers)
+            compact_chunks = parallel(delayed(_build_chunk)(cls, chunk, known_clas, label_key, kwargs)
+                                      for chunk in chunks)
+
+        feature_sets = []
+        if vocabulary is not None:
+            intern_pair = vocabulary.intern_pair
+            for compact_chunk in compact_chunks:
+                for pairs, clas in compact_chunk:
+                    ids = array("i", sorted({intern_pair(*pair) for pair in pairs}))
+                    feature_sets.append(CompactFeatureSet(ids, vocabulary, clas))
+            return feature_sets
+
+        shared_features = {}
+        for compact_chunk in compact_chunks:
+            for pairs, clas in compact_chunk:
+                features = {shared_features.get(pair) or shared_features.setdefault(pair, Feature(*pair))
+                            for pair in pairs}
+                feature_sets.append(FeatureSet(features, clas))
+        return feature_sets
+
+
+class JeopardyClassifier(NaiveBayesClassifier):
+    """Naive Bayes classifier that predicts which round a jeopardy question is from, with the classes in the order
+    of `ROUNDS`."""
+
+    LABELS = ROUNDS
+    FILE_MAGIC = b"JCLF"
 
     def gamma(self, a_feature_set: FeatureSet) -> str:
         """Given a single feature set representing an object to be classified, returns the most probable class
         for the object based on the training this classifier received (via a call to `train` class method).
 
         :param a_feature_set: a single feature set representing an object to be classified
-        :return: name of the class with the highest probability for the object
-        """
-
-        gamma_jeopardy = self.proportions_list[0]  # p hat of c
-        gamma_double_jeopardy = self.proportions_list[1]  # p hat of c
-        gamma_final_jeopardy = self.proportions_list[2]  # p hat of c
-        gamma_tiebreaker = self.proportions_list[3]  # p hat of c
-
-        for feature in a_feature_set.feat:
-            if self.probability_dict.get(feature, 0) != 0:  # if the feature is in the dictionary
-                gamma_jeopardy *= self.probability_dict[feature][0]  # further compute gamma for jeopardy
-                gamma_double_jeopardy *= self.probability_dict[feature][1]  # further compute gamma for double_jeopardy
-                gamma_final_jeopardy *= self.probability_dict[feature][2]  # further compute gamma for final_jeopardy
-                gamma_tiebreaker *= self.probability_dict[feature][3]  # further compute gamma for tiebreaker
-
-        all_gammas = [gamma_jeopardy, gamma_double_jeopardy, gamma_final_jeopardy, gamma_tiebreaker]
-        if max(all_gammas) == all_gammas[0]:
-            return "Jeopardy!, gamma = " + str(all_gammas[0])
-        elif max(all_gammas) == all_gammas[1]:
-            return "Double Jeopardy!, gamma = " + str(all_gammas[1])
-        elif max(all_gammas) == all_gammas[2]:
-            return "Final Jeopardy!, gamma = " + str(all_gammas[2])
-        else:
-            return "Tiebreaker, gamma = " + str(all_gammas[3])
-
-    @classmethod
-    def train(cls, training_set: Iterable[FeatureSet]) -> AbstractClassifier:
-        """Method that builds a Classifier instance with its training (supervised learning) already completed. That is,
-        the `AbstractClassifier` instance returned as the result of invoking this method must support `gamma` and
-        `present_features` method calls immediately without needing any other method invocations prior to them.
-
-        :param training_set: An iterable collection of `FeatureSet` to use for training the classifier
-            A SET OF FEATURE SETS (their classifications will be known!)
-            An Iterable([FeatureSet]) representation of the Training Set!!!
-        :return: an instance of `AbstractClassifier` with its training already completed
+        :return: name of the class with the highest probability for the object, followed by its gamma
         """
 
-        all_features = {}
-        # all_features will be a dict with the feature as its key, and a list of 4 elements as its value
-        # the list will represent the predictability of their respective classes:
-        # (jeopardy, double_jeopardy, final_jeopardy, tiebreaker)
-        # Each num will be the number of that class the feature helped predict /
-        # The total number of that class that the feature could have helped predict
-
-        jeopardy_round_tally = 0
-        double_jeopardy_round_tally = 0
-        final_jeopardy_round_tally = 0
-        tiebreaker_tally = 0
-
-        for feature_set in training_set:
-            for feature in feature_set.feat:
-
-                if all_features.get(feature, 0) == 0:
-                    all_features[feature] = [0, 0, 0, 0]
-
-                if feature_set.clas == "Jeopardy!":
-                    all_features[feature][0] += 1
-                elif feature_set.clas == "Double Jeopardy!":
-                    all_features[feature][1] += 1
-                elif feature_set.clas == "Final Jeopardy!":
-                    all_features[feature][2] += 1
-                else:
-                    all_features[feature][3] += 1
-
-            if feature_set.clas == "Jeopardy!":
-                jeopardy_round_tally += 1
-            elif feature_set.clas == "Double Jeopardy!":
-                double_jeopardy_round_tally += 1
-            elif feature_set.clas == "Final Jeopardy!":
-                final_jeopardy_round_tally += 1
-            else:
-                tiebreaker_tally += 1
-
-        # divide each # of jeopardy, double_jeopardy, final_jeopardy, or tiebreaker questions with a specific feature by
-        # the total number of those class questions respectively
-        for feature in all_features.keys():
-            all_features[feature][0] /= jeopardy_round_tally
-            all_features[feature][1] /= double_jeopardy_round_tally
-            all_features[feature][2] /= final_jeopardy_round_tally
-            all_features[feature][3] /= tiebreaker_tally
-
-        total_tally = len(training_set)
-        prop_list = [jeopardy_round_tally / total_tally, double_jeopardy_round_tally / total_tally,
-                     final_jeopardy_round_tally / total_tally, tiebreaker_tally / total_tally]
-
-        return JeopardyClassifier(all_features, prop_list)
+        cache = self.prediction_cache
+        key = ("gamma", frozenset(a_feature_set.feat)) if cache is not None else None
+        gammas = cache.get(key) if cache is not None else None
+        if gammas is None:
+            gammas = self.proportions_list  # p hat of c
+            for feature in a_feature_set.feat:
+                probabilities = self.probability_dict.get(feature)
+                if probabilities is not None:  # if the feature is in the dictionary
+                    gammas = [gamma * probability for gamma, probability in zip(gammas, probabilities)]
+            if cache is not None:
+                cache.put(key, tuple(gammas))
+
+        # ties, within the same relative `TIE_TOLERANCE` as `gamma_batch` allows its log gammas, go to the earlier round
+        top = max(gammas)
+        best = next(index for index, gamma in enumerate(gammas) if gamma >= top * (1 - TIE_TOLERANCE))
+        return self.labels[best] + ", gamma = " + str(gammas[best])
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterable[list]:
+    """Splits an iterable into lists of at most `size` items without materializing it."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _build_chunk(feature_set_cls: type, source_objects: list, known_clas, label_key: str,
+                 kwargs: dict) -> list[tuple[tuple[tuple[str, Any], ...], Any]]:
+    """Worker task of `JeopardyFeatureSet.build_many`: builds a chunk of feature sets in their compact form."""
+    return [(tuple((feature.name, feature.value) for feature in feature_set.feat), feature_set.clas)
+            for feature_set in feature_set_cls.build_batch(source_objects, known_clas, label_key, **kwargs)]
@@ -1,13 +1,26 @@
-"""Query driver for the jeopardy_classifier_models using 200k_questions.json
+"""Command line driver for the jeopardy_classifier_models, e.g.
+`python jeopardy_classifier_models_runner.py train 200k_questions.json model.jcm`
+`python jeopardy_classifier_models_runner.py predict model.jcm archive.jsonl predictions.jsonl --workers -1`
+`python jeopardy_classifier_models_runner.py evaluate 200k_questions.json --folds 5`
+`python jeopardy_classifier_models_runner.py convert 200k_questions.json questions.jqs`
+`python jeopardy_classifier_models_runner.py backtest questions.jqs --start 2000-01-01 --window-days 365`
+`python jeopardy_classifier_models_runner.py features model.jcm --top-n 20`
 """
-import importlib.resources
-import sys
+import contextlib
+import datetime
+import os
 import json
 import random
 
+import click
+from itertools import islice
 from jeopardy_classifier_models import *
-import re
-import string
+from jeopardy_data import *
+from jeopardy_dataset_store import STORE_MAGIC, QuestionStore
+from jeopardy_evaluation import *
+from jeopardy_feature_cache import *
+from jeopardy_text_features import *
+from profiling import Profiler, current_profiler
 
 __author__ = "Connor Rogstad"
 __copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
@@ -15,61 +28,217 @@ __credits__ = ["Connor Rogstad"]
 __license__ = "MIT"
 __email__ = ["crogstad@westmont.edu"]
 
-
-def main() -> None:
-
-    file_path = '/home/crogstad/200k_questions.json'
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-
-    # get all questions
-    all_questions = data
-
-    # Get the correct classes for the questions
-    all_jeopardy_questions = [question for question in all_questions if question["round"] == "Jeopardy!"]
-    all_double_jeopardy_questions = [question for question in all_questions if question["round"] == "Double Jeopardy!"]
-    all_final_jeopardy_questions = [question for question in all_questions if question["round"] == "Final Jeopardy!"]
-    all_tiebreaker_questions = [question for question in all_questions if question["round"] == "Tiebreaker"]
-
-    # build all the feature sets
-    all_jeopardy_feature_sets = [JeopardyFeatureSet.build(question, "Jeopardy!")
-                                 for question in all_jeopardy_questions]
-    all_double_jeopardy_feature_sets = [JeopardyFeatureSet.build(question, "Double Jeopardy!")
-                                        for question in all_double_jeopardy_questions]
-    all_final_jeopardy_feature_sets = [JeopardyFeatureSet.build(question, "Final Jeopardy!")
-                                       for question in all_final_jeopardy_questions]
-    all_tiebreaker_feature_sets = [JeopardyFeatureSet.build(question, "Tiebreaker")
-                                   for question in all_tiebreaker_questions]
-
-    # combine them
-    all_feature_sets = (all_jeopardy_feature_sets + all_double_jeopardy_feature_sets
-                        + all_final_jeopardy_feature_sets + all_tiebreaker_feature_sets)
-    print("LENGTH OF TOTAL", len(all_feature_sets))
-
-    random.shuffle(all_feature_sets)  # shuffle them so they are not all the same class in a row
-
-    train_jeopardy_feature_sets = all_feature_sets[:173544]  # 80% for training
-    test_jeopardy_feature_sets = all_feature_sets[173544:]  # 20% for testing
-
-    our_jeopardy_classifier = JeopardyClassifier.train(train_jeopardy_feature_sets)  # create our classifier
-
-    i = 0
-    while i < 10:  # change this to however many we want to see
-        print("Actual class: " + test_jeopardy_feature_sets[i].clas + " | Predicted class: "
-              + our_jeopardy_classifier.gamma(test_jeopardy_feature_sets[i]))
-        i += 1
-
-    print("\nAccuracy = " + str(accuracy(test_jeopardy_feature_sets, 1000, our_jeopardy_classifier)) + "\n")
-
-
-def accuracy(list_of_sets: list[FeatureSet], amount: int, classifier: AbstractClassifier) -> float:
-    i = 0
-    accuracy_tally = 0
-    while i < amount:  # change this to however many we want to see
-        if list_of_sets[i].clas in classifier.gamma(list_of_sets[i]):
-            accuracy_tally += 1
-        i += 1
-    return accuracy_tally / amount
+_text_ngrams_option = click.option("--text-ngrams", type=int, default=0, show_default=True,
+                                   help="Largest n-gram of the hashed question and answer text features, 0 for none. "
+                                        "Must be the same when training and predicting.")
+_extractors_option = click.option("--extractors", default=",".join(DEFAULT_EXTRACTORS), show_default=True,
+                                  callback=lambda context, parameter, value: _parse_extractors(value),
+                                  help=f"Comma separated feature extractors to run, of: {', '.join(EXTRACTORS)}. "
+                                       "Must be the same when training and predicting.")
+_workers_option = click.option("--workers", type=int, default=1, show_default=True,
+                               help="Worker processes for feature extraction, -1 for one per core.")
+
+
+@click.group()
+@click.option("--profile", "profile_path", type=click.Path(dir_okay=False, writable=True),
+              help="Write the time, throughput and cache hit rates of every pipeline stage to this JSON file.")
+@click.option("--trace-memory", is_flag=True, help="With --profile, also measure peak allocations per stage (slower).")
+@click.pass_context
+def main(context: click.Context, profile_path: str, trace_memory: bool) -> None:
+    """Train, apply and evaluate the Jeopardy round classifier."""
+    if profile_path is not None:
+        profiler = Profiler(trace_memory)
+        context.call_on_close(lambda: profiler.save(profile_path))  # runs after the profiler below is deactivated
+        context.with_resource(profiler)
+
+
+@main.command()
+@click.argument("data_path", type=click.Path(exists=True, dir_okay=False))
+@click.argument("model_path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--test-fraction", type=float, default=0.2, show_default=True,
+              help="Fraction of the questions held out to report accuracy on.")
+@click.option("--smoothing", type=float, default=1.0, show_default=True, help="Additive smoothing alpha.")
+@click.option("--event-model", type=click.Choice(EVENT_MODELS), default="bernoulli", show_default=True,
+              help="Naive Bayes event model; multinomial suits the many features added by --text-ngrams.")
+@click.option("--seed", type=int, default=None, help="Seed of the train/test split.")
+@click.option("--show", type=int, default=10, show_default=True, help="Held out predictions to print.")
+@_text_ngrams_option
+@_extractors_option
+@_workers_option
+def train(data_path: str, model_path: str, test_fraction: float, smoothing: float, event_model: str, seed: int,
+          show: int, text_ngrams: int, extractors: tuple[str, ...], workers: int) -> None:
+    """Trains a classifier on the questions in DATA_PATH and saves it to MODEL_PATH."""
+    feature_sets = _load_feature_sets(data_path, text_ngrams, extractors, workers)
+
+    test_feature_sets = []
+    train_feature_sets = split_stream(feature_sets, test_fraction, test_feature_sets, random.Random(seed))
+    classifier = JeopardyClassifier.train(train_feature_sets, smoothing, vocabulary=feature_sets.vocabulary,
+                                          model=event_model)
+    classifier.feature_config = JeopardyFeatureSet.feature_config(**_build_kwargs(text_ngrams, extractors))
+    classifier.save(model_path)
+    click.echo(f"Trained on {sum(classifier.class_tallies)} questions, saved to {model_path}")
+
+    for feature_set, prediction in zip(test_feature_sets, classifier.predict_many(test_feature_sets[:show])):
+        click.echo(f"Actual class: {feature_set.clas} | Predicted class: {prediction.label}, "
+                   f"log gamma = {prediction.log_score}")
+    if test_feature_sets:
+        click.echo(f"\nAccuracy = {accuracy(test_feature_sets, len(test_feature_sets), classifier)} "
+                   f"over {len(test_feature_sets)} held out questions")
+
+
+@main.command()
+@click.argument("model_path", type=click.Path(exists=True, dir_okay=False))
+@click.argument("input_path", type=click.Path(exists=True, dir_okay=False))
+@click.argument("output_path", type=click.Path(dir_okay=False, writable=True, allow_dash=True), default="-")
+@click.option("--chunk-size", type=int, default=10_000, show_default=True,
+              help="Questions read, built and scored at a time; bounds memory use.")
+@click.option("--posteriors", is_flag=True, help="Also write the normalized posterior of every round.")
+@click.option("--prediction-cache", "cache_size", type=int, default=0, show_default=True,
+              help="Remember the scores of this many recent feature sets, which pays off when questions repeat "
+                   "(e.g. without --text-ngrams); 0 to score every question from scratch.")
+@_text_ngrams_option
+@_extractors_option
+@_workers_option
+def predict(model_path: str, input_path: str, output_path: str, chunk_size: int, posteriors: bool, cache_size: int,
+            text_ngrams: int, extractors: tuple[str, ...], workers: int) -> None:
+    """Writes the predicted round of every question in INPUT_PATH (JSON or JSON Lines) to OUTPUT_PATH as JSON Lines,
+    in input order, streaming the input so that only one chunk of questions is in memory at a time."""
+    from tqdm import tqdm
+
+    profiler = current_profiler()
+    with profiler.stage("load model"):
+        classifier = JeopardyClassifier.load(model_path).use_prediction_cache(cache_size)
+    build_kwargs = _build_kwargs(text_ngrams, extractors)
+    _check_feature_config(classifier, build_kwargs)
+    questions = iter_questions(input_path)
+    if workers != 1:
+        from joblib import Parallel
+        pool = Parallel(n_jobs=workers)  # started once and reused for every chunk
+    else:
+        pool = contextlib.nullcontext()
+    with click.open_file(output_path, 'w') as output, tqdm(unit=" questions", disable=None) as progress, \
+            pool as parallel:
+        while chunk := list(islice(questions, chunk_size)):
+            with profiler.stage("build", len(chunk)):
+                feature_sets = JeopardyFeatureSet.build_many(chunk, parallel=parallel, **build_kwargs)
+            predictions = classifier.predict_many(feature_sets, posteriors)
+            with profiler.stage("write", len(chunk)):
+                for prediction in predictions:
+                    record = {"label": prediction.label, "log_score": prediction.log_score}
+                    if posteriors:
+                        record["posteriors"] = dict(zip(classifier.labels, prediction.posteriors))
+                    output.write(json.dumps(record) + "\n")
+            progress.update(len(chunk))
+    if workers == 1 and "text_vectorizer" in build_kwargs:  # worker processes keep their own caches
+        cache_info = build_kwargs["text_vectorizer"].buckets.cache_info()
+        profiler.cache("text buckets", cache_info.hits, cache_info.misses)
+
+
+@main.command("evaluate")
+@click.argument("data_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--model", "model_path", type=click.Path(exists=True, dir_okay=False),
+              help="Score this saved classifier on every question instead of cross-validating.")
+@click.option("--folds", type=int, default=5, show_default=True, help="Number of cross-validation folds.")
+@click.option("--smoothing", type=float, default=1.0, show_default=True, help="Additive smoothing alpha.")
+@click.option("--seed", type=int, default=None, help="Seed of the fold assignment.")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON.")
+@_text_ngrams_option
+@_extractors_option
+@_workers_option
+def evaluate_command(data_path: str, model_path: str, folds: int, smoothing: float, seed: int, as_json: bool,
+                     text_ngrams: int, extractors: tuple[str, ...], workers: int) -> None:
+    """Reports accuracy, per-class precision, recall and f1 on the questions in DATA_PATH, by stratified k-fold
+    cross-validation or, with --model, of a saved classifier."""
+    if model_path is not None:
+        classifier = JeopardyClassifier.load(model_path)
+        _check_feature_config(classifier, _build_kwargs(text_ngrams, extractors))
+    feature_sets = _load_feature_sets(data_path, text_ngrams, extractors, workers)
+    if model_path is not None:
+        report = evaluate(classifier, feature_sets)
+    else:
+        report = cross_validate(feature_sets, folds, workers, smoothing, seed)
+    click.echo(json.dumps(report.to_dict(), indent=2) if as_json else str(report))
+
+
+@main.command()
+@click.argument("data_path", type=click.Path(exists=True, dir_okay=False))
+@click.argument("store_path", type=click.Path(dir_okay=False, writable=True))
+def convert(data_path: str, store_path: str) -> None:
+    """Converts the questions in DATA_PATH into a columnar question store at STORE_PATH."""
+    store = QuestionStore.convert(data_path, store_path)
+    click.echo(f"Stored {len(store)} questions in {store_path}: "
+               + ", ".join(f"{len(store.by_round(name))} {name}" for name in store.rounds))
+
+
+@main.command()
+@click.argument("data_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--start", required=True, help="Air date (YYYY-MM-DD) of the first scored question.")
+@click.option("--window-days", type=int, default=365, show_default=True, help="Length of every test window.")
+@click.option("--end", default=None, help="Air date after the last window, defaults to after the last question.")
+@click.option("--smoothing", type=float, default=1.0, show_default=True, help="Additive smoothing alpha.")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON.")
+@_text_ngrams_option
+@_extractors_option
+def backtest(data_path: str, start: str, window_days: int, end: str, smoothing: float, as_json: bool,
+             text_ngrams: int, extractors: tuple[str, ...]) -> None:
+    """Walk-forward backtest over air dates on DATA_PATH, a question store written by `convert` or a dataset file:
+    trains on every show before --start, scores the next window, adds it to the training counts, and repeats."""
+    with open(data_path, 'rb') as file:
+        is_store = file.read(len(STORE_MAGIC)) == STORE_MAGIC
+    store = QuestionStore.load(data_path) if is_store else QuestionStore.from_questions(iter_questions(data_path))
+    report = walk_forward(store, start, datetime.timedelta(window_days), end, smoothing,
+                          **_build_kwargs(text_ngrams, extractors))
+    click.echo(json.dumps(report.to_dict(), indent=2) if as_json else str(report))
+
+
+@main.command()
+@click.argument("model_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--top-n", type=int, default=10, show_default=True, help="Features to list per round.")
+def features(model_path: str, top_n: int) -> None:
+    """Lists the features of the classifier saved at MODEL_PATH that are most predictive of each round."""
+    for label, top_features in JeopardyClassifier.load(model_path).present_features(top_n).items():
+        click.echo(f"Most predictive features of {label}:")
+        for feature, ratio in top_features:
+            click.echo(f"{ratio:>10.4f}  {feature}")
+
+
+def accuracy(list_of_sets: list[FeatureSet], amount: int, classifier: JeopardyClassifier) -> float:
+    predictions = classifier.predict_many(list_of_sets[:amount])  # change amount to however many we want to see
+    accuracy_tally = sum(prediction.label == feature_set.clas
+                         for prediction, feature_set in zip(predictions, list_of_sets))
+    return accuracy_tally / len(predictions) if predictions else 0.0
+
+
+def _build_kwargs(text_ngrams: int, extractors: tuple[str, ...] = DEFAULT_EXTRACTORS) -> dict:
+    build_kwargs = {"text_vectorizer": HashingVectorizer(ngram_range=(1, text_ngrams))} if text_ngrams else {}
+    if extractors != DEFAULT_EXTRACTORS:  # left out otherwise, so feature caches of the default config stay valid
+        build_kwargs["extractors"] = extractors
+    return build_kwargs
+
+
+def _check_feature_config(classifier: JeopardyClassifier, build_kwargs: dict) -> None:
+    """Refuses to score with a classifier that was trained on features built with other options."""
+    try:
+        classifier.check_feature_config(JeopardyFeatureSet.feature_config(**build_kwargs))
+    except ValueError as error:
+        raise click.UsageError(f"{error}; pass the --extractors and --text-ngrams the model was trained with")
+
+
+def _parse_extractors(value: str) -> tuple[str, ...]:
+    extractors = tuple(name.strip() for name in value.split(",") if name.strip())
+    unknown = [name for name in extractors if name not in EXTRACTORS]
+    if unknown:
+        raise click.BadParameter(f"unknown feature extractors {', '.join(unknown)}, expected some of "
+                                 f"{', '.join(EXTRACTORS)}")
+    return extractors
+
+
+def _load_feature_sets(data_path: str, text_ngrams: int, extractors: tuple[str, ...],
+                       workers: int) -> CachedFeatureSets:
+    """Reads the feature sets of a dataset file from the feature cache next to it, extracting them on a miss."""
+    feature_cache = FeatureCache(os.path.join(os.path.dirname(os.path.abspath(data_path)), ".jeopardy_feature_cache"),
+                                 **_build_kwargs(text_ngrams, extractors))
+    return feature_cache.load(data_path, workers)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,153 @@
+"""Streaming ingestion of the 200k_questions.json dataset (or any JSON / JSON Lines file in the same schema)
+"""
+from jeopardy_classifier_models import *
+from itertools import islice
+from profiling import current_profiler
+from typing import Iterator
+import json
+import os
+import random
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+def iter_questions(file_path: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Lazily yields the questions stored in `file_path` one at a time.
+
+    The file is either a single JSON array of questions (the format of 200k_questions.json), which is decoded
+    incrementally `chunk_size` characters at a time, or a JSON Lines file with one question per line. Either way
+    only the question being decoded and one chunk of the file are held in memory. Decoding is timed per question as
+    the "parse" stage only when a profiler is active, so unprofiled reads pay nothing for it.
+
+    :param file_path: path of the JSON or JSON Lines file to read
+    :param chunk_size: number of characters to read from the file at a time
+    :return: an iterator over the questions as dicts
+    """
+    profiler = current_profiler()
+    with open(file_path, 'r') as file:
+        buffer = file.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            yield from _iter_json_lines(buffer, file, profiler)
+            return
+
+        decoder = json.JSONDecoder()
+        position = 1  # skip the opening [
+        at_eof = False
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                return
+
+            if profiler.enabled:
+                with profiler.stage("parse") as stage:
+                    question, end = _decode(decoder, buffer, position, at_eof)
+                    stage.add(end is not None)
+            else:
+                question, end = _decode(decoder, buffer, position, at_eof)
+
+            if end is not None:
+                yield question
+                position = end
+            else:
+                more = file.read(chunk_size)
+                at_eof = not more
+                buffer = buffer[position:] + more  # drop everything that has already been decoded
+                position = 0
+                if at_eof and not buffer.strip():
+                    raise ValueError(f"{file_path} ends before its JSON array is closed")
+
+
+def _decode(decoder: json.JSONDecoder, buffer: str, position: int, at_eof: bool) -> tuple[Any, int | None]:
+    """Decodes the value at `position` of `buffer`, returning it and where it ends, or (None, None) if the buffer
+    ends before the value does and more of the file has to be read first."""
+    try:
+        value, end = decoder.raw_decode(buffer, position)
+    except json.JSONDecodeError:
+        if at_eof:
+            raise
+        return None, None
+    if end < len(buffer) or at_eof:  # a value ending the buffer (e.g. a number) may be cut off
+        return value, end
+    return None, None
+
+
+def _iter_json_lines(buffer: str, file, profiler) -> Iterator[dict]:
+    """Yields one question per non-blank line, starting with the already read `buffer`."""
+    first_lines = buffer.splitlines(keepends=True)
+    if first_lines and not first_lines[-1].endswith("\n"):
+        first_lines[-1] += file.readline()  # finish the line the first chunk cut through
+    for lines in (first_lines, file):
+        for line in lines:
+            if not line.strip():
+                continue
+            if profiler.enabled:
+                with profiler.stage("parse", 1):
+                    question = json.loads(line)
+            else:
+                question = json.loads(line)
+            yield question
+
+
+def iter_feature_sets(questions: Iterable[dict], rounds: Iterable[str] = ROUNDS, workers: int = 1,
+                      chunksize: int = 1000, **kwargs) -> Iterator[FeatureSet]:
+    """Lazily builds a `JeopardyFeatureSet` for every question of one of the given rounds, labeled with its round.
+
+    The questions are read `workers * chunksize` at a time, so memory stays bounded by that batch size, and each
+    batch is built column-at-a-time with `JeopardyFeatureSet.build_batch`, or in parallel with
+    `JeopardyFeatureSet.build_many` when there is more than one worker, all batches on one pool of worker processes.
+
+    :param questions: questions in the 200k_questions.json schema, e.g. from `iter_questions`
+    :param rounds: rounds to keep, questions of any other round are skipped
+    :param workers: number of worker processes, as joblib's `n_jobs`
+    :param chunksize: number of questions built per worker task
+    :param kwargs: any additional data passed on to `JeopardyFeatureSet.build`, e.g. `extractors`
+    :return: an iterator over the feature sets
+    """
+    rounds = set(rounds)
+    questions = (question for question in questions if question["round"] in rounds)
+    profiler = current_profiler()
+    if workers == 1:
+        while batch := list(islice(questions, chunksize)):
+            with profiler.stage("build", len(batch)):
+                feature_sets = JeopardyFeatureSet.build_batch(batch, label_key="round", **kwargs)
+            yield from feature_sets
+        if "text_vectorizer" in kwargs:
+            cache_info = kwargs["text_vectorizer"].buckets.cache_info()
+            profiler.cache("text buckets", cache_info.hits, cache_info.misses)
+        return
+
+    from joblib import Parallel
+    batch_size = chunksize * (workers if workers > 0 else os.cpu_count() or 1)
+    with Parallel(n_jobs=workers) as parallel:  # the workers are started once and reused for every batch
+        while batch := list(islice(questions, batch_size)):
+            with profiler.stage("build", len(batch)):
+                feature_sets = JeopardyFeatureSet.build_many(batch, label_key="round", chunksize=chunksize,
+                                                             parallel=parallel, **kwargs)
+            yield from feature_sets
+
+
+def split_stream(feature_sets: Iterable[FeatureSet], test_fraction: float, test_sink: list,
+                 rng: random.Random = None) -> Iterator[FeatureSet]:
+    """Randomly splits a stream of feature sets into a training stream and a test list in a single pass.
+
+    Each feature set is appended to `test_sink` with probability `test_fraction` and yielded otherwise, so the
+    returned iterator can be passed straight to `JeopardyClassifier.train` without materializing the training set.
+
+    :param feature_sets: the feature sets to split
+    :param test_fraction: probability of a feature set being held out for testing
+    :param test_sink: list that receives the held out feature sets
+    :param rng: random number generator to use, defaults to the `random` module's
+    :return: an iterator over the feature sets kept for training
+    """
+    draw = (rng or random).random
+    for feature_set in feature_sets:
+        if draw() < test_fraction:
+            test_sink.append(feature_set)
+        else:
+            yield feature_set
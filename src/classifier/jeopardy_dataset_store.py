@@ -0,0 +1,234 @@
+"""Columnar, memory-mappable store of jeopardy questions, converted once from 200k_questions.json (or any JSON / JSON
+Lines file in the same schema), with indexes for slicing it by round, air date or show without re-parsing.
+"""
+from __future__ import annotations
+from jeopardy_data import *
+from section_file import read_sections, write_sections
+from bisect import bisect_left, bisect_right
+import datetime
+import heapq
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+STORE_MAGIC = b"JQST"  # first bytes of a question store file
+STORE_FORMAT_VERSION = 3
+FIELDS = ("category", "air_date", "question", "value", "answer", "round", "show_number")
+NO_SHOW_NUMBER = -1  # show number of a question without one
+
+
+class QuestionStore:
+    """Read-only columns of every question of a dataset, plus the indexes behind its filtered views.
+
+    Category, round and value strings are dictionary encoded (code -1 stands for None), show numbers and air dates
+    (as proleptic Gregorian ordinals, 0 for none) are integer columns, and the question and answer texts are UTF-8
+    encoded one after another into a single blob: the text of row r's question spans `text_offsets[2r]` to
+    `text_offsets[2r + 1]`, and its answer from there to `text_offsets[2r + 2]`. A missing show number is stored as
+    `NO_SHOW_NUMBER`, and one that is not a plain number (e.g. "0123" or "special") as -2 - its dictionary code, so
+    both come back unchanged and neither is in the range of any show.
+
+    Attributes:
+        _dictionaries (dict[str, list[str]]): distinct strings of every dictionary encoded column (and the show
+            numbers that are not plain numbers), indexed by code
+        _columns (dict[str, memoryview]): every column and index by name, see `from_questions`
+    """
+
+    def __init__(self, dictionaries: dict[str, list[str]], columns: dict[str, Any]):
+        self._dictionaries = dictionaries
+        self._columns = {name: memoryview(values) for name, values in columns.items()}  # slices are zero-copy
+
+    @classmethod
+    def from_questions(cls, questions: Iterable[dict]) -> QuestionStore:
+        """Encodes questions into columns in a single pass, then builds the round, air date and show indexes.
+
+        :param questions: questions in the 200k_questions.json schema, e.g. from `jeopardy_data.iter_questions`
+        :return: the store, held in memory
+        """
+        codes = {"category": {}, "round": {}, "value": {}}
+        show_codes = {}
+        columns = {"category_codes": array("i"), "round_codes": array("b"), "value_codes": array("i"),
+                   "show_numbers": array("i"), "air_dates": array("i"), "text": array("B"),
+                   "text_offsets": array("q", [0])}
+        text, text_offsets = columns["text"], columns["text_offsets"]
+        for question in questions:
+            for field, field_codes in codes.items():
+                value = question.get(field)
+                code = -1 if value is None else field_codes.setdefault(value, len(field_codes))
+                columns[f"{field}_codes"].append(code)
+            columns["show_numbers"].append(_show_number(question.get("show_number"), show_codes))
+            air_date = question.get("air_date")
+            columns["air_dates"].append(datetime.date.fromisoformat(air_date).toordinal() if air_date else 0)
+            for field in ("question", "answer"):
+                text.frombytes((question.get(field) or "").encode())
+                text_offsets.append(len(text))
+
+        # indexes: rows grouped by round, and rows ordered by air date and by show number (ties in row order)
+        n_rounds = len(codes["round"])
+        round_rows = [array("i") for _ in range(n_rounds + 1)]  # the last group holds rows without a round
+        for row, code in enumerate(columns["round_codes"]):
+            round_rows[code].append(row)
+        columns["round_offsets"] = array("q", [0])
+        columns["round_rows"] = array("i")
+        for rows in round_rows:
+            columns["round_rows"].extend(rows)
+            columns["round_offsets"].append(len(columns["round_rows"]))
+        n_rows = len(columns["round_codes"])
+        columns["date_order"] = array("i", sorted(range(n_rows), key=columns["air_dates"].__getitem__))
+        columns["show_order"] = array("i", sorted(range(n_rows), key=columns["show_numbers"].__getitem__))
+        dictionaries = {field: list(field_codes) for field, field_codes in codes.items()}
+        return cls({**dictionaries, "show_number": list(show_codes)}, columns)
+
+    @classmethod
+    def convert(cls, file_path: str, store_path: str) -> QuestionStore:
+        """Converts a dataset file into a store file, streaming its questions, and returns the memory-mapped store.
+
+        :param file_path: path of a dataset file readable by `jeopardy_data.iter_questions`
+        :param store_path: path of the store file to write
+        :return: the converted store
+        """
+        cls.from_questions(iter_questions(file_path)).save(store_path)
+        return cls.load(store_path)
+
+    @classmethod
+    def load(cls, file_path: str, memory_map: bool = True) -> QuestionStore:
+        """Reads a store written by `save`, memory-mapping its columns by default (see `section_file`)."""
+        header, sections = read_sections(file_path, STORE_MAGIC, STORE_FORMAT_VERSION, memory_map)
+        return cls(header["dictionaries"], sections)
+
+    def save(self, file_path: str) -> None:
+        write_sections(file_path, STORE_MAGIC, STORE_FORMAT_VERSION, {"dictionaries": self._dictionaries},
+                       self._columns)
+
+    @property
+    def rounds(self) -> list[str]:
+        return list(self._dictionaries["round"])
+
+    def __len__(self) -> int:
+        return len(self._columns["round_codes"])
+
+    def value(self, row: int, field: str) -> Any:
+        """Returns the decoded `field` of the question in `row`, as it appears in the source file."""
+        columns = self._columns
+        if field == "show_number":
+            show_number = columns["show_numbers"][row]
+            if show_number >= 0:
+                return str(show_number)
+            return self._dictionaries["show_number"][-2 - show_number] if show_number != NO_SHOW_NUMBER else None
+        if field in self._dictionaries:
+            code = columns[f"{field}_codes"][row]
+            return self._dictionaries[field][code] if code >= 0 else None
+        if field == "question" or field == "answer":
+            start = 2 * row + (field == "answer")
+            return bytes(columns["text"][columns["text_offsets"][start]:columns["text_offsets"][start + 1]]).decode()
+        if field == "air_date":
+            ordinal = columns["air_dates"][row]
+            return datetime.date.fromordinal(ordinal).isoformat() if ordinal else None
+        raise KeyError(field)
+
+    def question(self, row: int) -> dict:
+        """Returns the question in `row` as a dict in the 200k_questions.json schema."""
+        return {field: self.value(row, field) for field in FIELDS}
+
+    def view(self) -> QuestionView:
+        """Returns a view of every question, in file order."""
+        return QuestionView(self, range(len(self)))
+
+    def by_round(self, *rounds: str) -> QuestionView:
+        """Returns a view of the questions of the given rounds, in file order. A single round is a zero-copy slice
+        of the round index."""
+        round_index = {name: code for code, name in enumerate(self._dictionaries["round"])}
+        offsets, round_rows = self._columns["round_offsets"], self._columns["round_rows"]
+        groups = [round_rows[offsets[round_index[name]]:offsets[round_index[name] + 1]]
+                  for name in dict.fromkeys(rounds) if name in round_index]
+        if len(groups) == 1:
+            return QuestionView(self, groups[0])
+        return QuestionView(self, array("i", heapq.merge(*groups)))
+
+    def between(self, start: str | datetime.date = None, end: str | datetime.date = None) -> QuestionView:
+        """Returns a view of the questions aired from `start` (inclusive) until `end` (exclusive), in air date order,
+        as a zero-copy slice of the air date index found by binary search. Questions without an air date are never
+        in the view, even without bounds.
+
+        :param start: first air date, as an ISO date string or a date, or None for no lower bound
+        :param end: air date after the last one, as an ISO date string or a date, or None for no upper bound
+        :return: the view
+        """
+        date_order, air_dates = self._columns["date_order"], self._columns["air_dates"]
+        low = bisect_left(date_order, _ordinal(start) if start is not None else 1, key=air_dates.__getitem__)
+        high = bisect_left(date_order, _ordinal(end), key=air_dates.__getitem__) if end is not None else len(self)
+        return QuestionView(self, date_order[low:max(low, high)])
+
+    def by_show(self, first: int | str, last: int | str = None) -> QuestionView:
+        """Returns a view of the questions of shows `first` to `last` (both inclusive, `first` alone by default), in
+        show number order, as a zero-copy slice of the show index found by binary search."""
+        show_order, show_numbers = self._columns["show_order"], self._columns["show_numbers"]
+        low = bisect_left(show_order, max(int(first), 0), key=show_numbers.__getitem__)
+        high = bisect_right(show_order, int(last if last is not None else first), key=show_numbers.__getitem__)
+        return QuestionView(self, show_order[low:max(low, high)])
+
+
+class QuestionView:
+    """Read-only selection of the rows of a `QuestionStore`. Views never copy the store's columns: iterating one
+    decodes each selected question on demand, and filtering one scans only its own rows.
+
+    Attributes:
+        store (QuestionStore): the store the rows belong to
+        rows (Sequence[int]): the selected row numbers, in view order
+    """
+
+    def __init__(self, store: QuestionStore, rows):
+        self.store = store
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: int) -> dict:
+        return self.store.question(self.rows[index])
+
+    def __iter__(self) -> Iterator[dict]:
+        question = self.store.question
+        for row in self.rows:
+            yield question(row)
+
+    def column(self, field: str) -> list:
+        """Returns the decoded `field` of every question in the view, without decoding the other fields."""
+        value = self.store.value
+        return [value(row, field) for row in self.rows]
+
+    def by_round(self, *rounds: str) -> QuestionView:
+        round_index = {name: code for code, name in enumerate(self.store.rounds)}
+        codes = {round_index[name] for name in rounds if name in round_index}
+        round_codes = self.store._columns["round_codes"]
+        return QuestionView(self.store, array("i", (row for row in self.rows if round_codes[row] in codes)))
+
+    def between(self, start: str | datetime.date = None, end: str | datetime.date = None) -> QuestionView:
+        low = _ordinal(start) if start is not None else 1
+        high = _ordinal(end) if end is not None else datetime.date.max.toordinal() + 1
+        air_dates = self.store._columns["air_dates"]
+        return QuestionView(self.store, array("i", (row for row in self.rows if low <= air_dates[row] < high)))
+
+    def by_show(self, first: int | str, last: int | str = None) -> QuestionView:
+        low, high = max(int(first), 0), int(last if last is not None else first)
+        show_numbers = self.store._columns["show_numbers"]
+        return QuestionView(self.store, array("i", (row for row in self.rows if low <= show_numbers[row] <= high)))
+
+
+def _show_number(show_number: Any, show_codes: dict[str, int]) -> int:
+    """Returns the show number column value of `show_number`, dictionary encoding it into `show_codes` unless it is
+    missing or a plain number that fits the column."""
+    if show_number is None:
+        return NO_SHOW_NUMBER
+    show_number = str(show_number)
+    if show_number.isascii() and show_number.isdigit() and (show_number == "0" or show_number[0] != "0") \
+            and int(show_number) < 1 << 31:
+        return int(show_number)
+    return -2 - show_codes.setdefault(show_number, len(show_codes))
+
+
+def _ordinal(date: str | datetime.date) -> int:
+    return (datetime.date.fromisoformat(date) if isinstance(date, str) else date).toordinal()
@@ -0,0 +1,299 @@
+"""Evaluation harness for the JeopardyClassifier: stratified k-fold cross-validation and walk-forward backtesting
+over air dates, with per-class metrics
+"""
+from __future__ import annotations
+from jeopardy_classifier_models import *
+from jeopardy_data import iter_feature_sets
+from jeopardy_dataset_store import QuestionStore
+from array import array
+from typing import Sequence
+import datetime
+import random
+import time
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class EvaluationReport:
+    """Outcome of evaluating a classifier: a confusion matrix plus how long each stage of the evaluation took.
+
+    Attributes:
+        labels (list[str]): names of the classes, in the order of the confusion matrix
+        confusion (list[list[int]]): number of test feature sets of each actual class (row) predicted as each class
+            (column)
+        timings (dict[str, float]): wall time in seconds of every stage of the evaluation
+        fold_accuracies (list[float | None]): accuracy on every fold, for cross-validation, None for an empty fold
+    """
+
+    def __init__(self, labels: list[str], confusion: list[list[int]], timings: dict[str, float] = None,
+                 fold_accuracies: list[float | None] = None):
+        self.labels = labels
+        self.confusion = confusion
+        self.timings = timings if timings is not None else {}
+        self.fold_accuracies = fold_accuracies if fold_accuracies is not None else []
+
+    @property
+    def total(self) -> int:
+        return sum(map(sum, self.confusion))
+
+    @property
+    def accuracy(self) -> float:
+        correct = sum(self.confusion[index][index] for index in range(len(self.labels)))
+        return correct / self.total if self.total else 0.0
+
+    def precision(self) -> dict[str, float]:
+        """Fraction of the feature sets predicted as each class that actually belong to it."""
+        predicted = [sum(column) for column in zip(*self.confusion)]
+        return {label: _ratio(self.confusion[index][index], predicted[index])
+                for index, label in enumerate(self.labels)}
+
+    def recall(self) -> dict[str, float]:
+        """Fraction of the feature sets of each class that were predicted as it."""
+        return {label: _ratio(self.confusion[index][index], sum(self.confusion[index]))
+                for index, label in enumerate(self.labels)}
+
+    def f1(self) -> dict[str, float]:
+        """Harmonic mean of the precision and recall of each class."""
+        precision, recall = self.precision(), self.recall()
+        return {label: _ratio(2 * precision[label] * recall[label], precision[label] + recall[label])
+                for label in self.labels}
+
+    def to_dict(self) -> dict:
+        """Returns the report as plain, JSON serializable data."""
+        return {"labels": self.labels, "confusion": self.confusion, "accuracy": self.accuracy,
+                "precision": self.precision(), "recall": self.recall(), "f1": self.f1(),
+                "fold_accuracies": self.fold_accuracies, "timings": self.timings}
+
+    def __str__(self) -> str:
+        precision, recall, f1 = self.precision(), self.recall(), self.f1()
+        lines = [f"Accuracy = {self.accuracy:.4f} over {self.total} questions",
+                 f"{'class':<18}{'precision':>10}{'recall':>10}{'f1':>10}   confusion (predicted as {self.labels})"]
+        for label, row in zip(self.labels, self.confusion):
+            lines.append(f"{label:<18}{precision[label]:>10.4f}{recall[label]:>10.4f}{f1[label]:>10.4f}   {row}")
+        lines.append("Timings: " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in self.timings.items()))
+        return "\n".join(lines)
+
+
+class BacktestReport(EvaluationReport):
+    """`EvaluationReport` of a walk-forward backtest, over the questions of every test window combined.
+
+    Attributes:
+        windows (list[dict]): start and end air date, number of training and test questions and accuracy of every
+            test window, in order
+    """
+
+    def __init__(self, labels: list[str], confusion: list[list[int]], timings: dict[str, float] = None,
+                 windows: list[dict] = None):
+        super().__init__(labels, confusion, timings, [window["accuracy"] for window in windows or []])
+        self.windows = windows if windows is not None else []
+
+    def to_dict(self) -> dict:
+        return {**super().to_dict(), "windows": self.windows}
+
+    def __str__(self) -> str:
+        lines = [f"{'window':<25}{'trained on':>12}{'tested on':>12}{'accuracy':>10}"]
+        for window in self.windows:
+            lines.append(f"{window['start'] + ' to ' + window['end']:<25}{window['train_questions']:>12}"
+                         f"{window['test_questions']:>12}{window['accuracy']:>10.4f}")
+        return "\n".join(lines) + "\n" + super().__str__()
+
+
+def stratified_folds(labels: Sequence[str], k: int, rng: random.Random = None) -> list[list[int]]:
+    """Splits the indices of `labels` into `k` folds in which every class is represented in the same proportion.
+
+    :param labels: class of every item
+    :param k: number of folds
+    :param rng: random number generator used to shuffle each class, defaults to the `random` module's
+    :return: the indices of the items in each fold
+    """
+    by_label = {}
+    for index, label in enumerate(labels):
+        by_label.setdefault(label, []).append(index)
+
+    folds = [[] for _ in range(k)]
+    next_fold = 0
+    for indices in by_label.values():
+        (rng or random).shuffle(indices)
+        for index in indices:  # deal each class out round-robin, continuing where the previous class stopped
+            folds[next_fold].append(index)
+            next_fold = (next_fold + 1) % k
+    return [sorted(fold) for fold in folds]
+
+
+def evaluate(classifier: JeopardyClassifier, test_set: Iterable[FeatureSet]) -> EvaluationReport:
+    """Scores a trained classifier on labeled test feature sets.
+
+    :param classifier: the classifier to evaluate
+    :param test_set: feature sets whose classes are known
+    :return: the report, with the time spent predicting
+    """
+    start = time.perf_counter()
+    confusion = _confusion(classifier, test_set)
+    return EvaluationReport(list(ROUNDS), confusion, {"predict": time.perf_counter() - start})
+
+
+def cross_validate(feature_sets: Sequence[FeatureSet], k: int = 5, workers: int = 1, smoothing: float = 1.0,
+                   seed: int = None) -> EvaluationReport:
+    """Runs stratified k-fold cross-validation of the JeopardyClassifier over all the given feature sets.
+
+    Every feature set is counted once, into a single count table of all the folds. The classifier for each fold
+    starts from a copy of those totals and takes back the counts of the held out fold, so no features are rebuilt and
+    only the held out fold is recounted. Folds are trained and scored in parallel across a joblib process pool when
+    `workers` is not 1. Each task is then sent the totals and the indices of its fold; feature sets loaded from a
+    feature cache file are read by the workers from the file itself rather than pickled.
+
+    :param feature_sets: labeled feature sets, e.g. a `CachedFeatureSets`
+    :param k: number of folds
+    :param workers: number of worker processes, as joblib's `n_jobs` (1 to stay in-process)
+    :param smoothing: additive smoothing alpha of the fold classifiers
+    :param seed: seed of the random fold assignment
+    :return: the report over all folds, with per-fold accuracies (None for empty folds) and the time spent in each
+        stage
+    """
+    timings = {}
+    start = time.perf_counter()
+    folds = stratified_folds([feature_set.clas for feature_set in feature_sets], k, random.Random(seed))
+    timings["assign folds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vocabulary = getattr(feature_sets, "vocabulary", None)  # share the vocabulary of compact feature sets
+    vocabulary = vocabulary if vocabulary is not None else FeatureVocabulary()
+    totals = CountTable(ROUNDS, vocabulary).add_all(feature_sets)
+    timings["count"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_evaluate_fold(vocabulary, [feature_sets[index] for index in fold], totals, smoothing)
+                   for fold in folds]
+    else:
+        from joblib import Parallel, delayed
+        cache_path = getattr(feature_sets, "path", None)
+        totals = (totals.feature_counts, totals.class_counts)  # the vocabulary is sent at most once per task
+        if cache_path is not None:
+            tasks = (delayed(_evaluate_cached_fold)(cache_path, array("i", fold), totals, smoothing) for fold in folds)
+        else:
+            tasks = (delayed(_evaluate_fold)(vocabulary, [feature_sets[index] for index in fold], totals, smoothing)
+                     for fold in folds)
+        results = Parallel(n_jobs=workers)(tasks)
+    timings["train and score folds"] = time.perf_counter() - start
+    timings["train (sum over folds)"] = sum(result[1] for result in results)
+    timings["predict (sum over folds)"] = sum(result[2] for result in results)
+
+    confusion = [[0] * len(ROUNDS) for _ in ROUNDS]
+    fold_accuracies = []
+    for fold_confusion, _, _ in results:
+        for row, fold_row in zip(confusion, fold_confusion):
+            row[:] = [count + fold_count for count, fold_count in zip(row, fold_row)]
+        fold_report = EvaluationReport(list(ROUNDS), fold_confusion)
+        fold_accuracies.append(fold_report.accuracy if fold_report.total else None)
+    return EvaluationReport(list(ROUNDS), confusion, timings, fold_accuracies)
+
+
+def walk_forward(store: QuestionStore, start: str | datetime.date, window: datetime.timedelta = datetime.timedelta(365),
+                 end: str | datetime.date = None, smoothing: float = 1.0, **kwargs) -> BacktestReport:
+    """Backtests the JeopardyClassifier the way it would have been used over time: trains on every question aired
+    before `start`, scores the questions of the next `window`, then adds that window to the training counts with
+    `partial_fit` and moves on to the next one, until `end`.
+
+    The questions of each window are read from the store's air date index, and every question is built into a
+    feature set once, then reused for training once its window has been scored. The classifier is never retrained
+    from scratch. Windows without any question (e.g. between seasons) are skipped and left out of the report.
+
+    :param store: the questions, e.g. `QuestionStore.load("questions.jqs")`
+    :param start: air date of the first question scored, as an ISO date string or a date
+    :param window: length of every test window
+    :param end: air date after the last window, defaults to the day after the last question
+    :param smoothing: additive smoothing alpha of the classifier
+    :param kwargs: any additional data passed on to `JeopardyFeatureSet.build`
+    :return: the report over all windows, with per-window accuracies and the time spent in each stage
+    """
+    start = datetime.date.fromisoformat(start) if isinstance(start, str) else start
+    if end is None:
+        last_aired = store.between(start)
+        end = datetime.date.fromisoformat(last_aired[-1]["air_date"]) + datetime.timedelta(1) if last_aired else start
+    end = datetime.date.fromisoformat(end) if isinstance(end, str) else end
+
+    timings = {"build": 0.0, "train": 0.0, "predict": 0.0}
+    timer = time.perf_counter()
+    training_set = list(iter_feature_sets(store.between(None, start), **kwargs))
+    timings["build"] += time.perf_counter() - timer
+    timer = time.perf_counter()
+    classifier = JeopardyClassifier.train(training_set, smoothing)
+    timings["train"] += time.perf_counter() - timer
+    n_trained = len(training_set)
+    del training_set
+
+    confusion = [[0] * len(ROUNDS) for _ in ROUNDS]
+    windows = []
+    while start < end:
+        window_end = min(start + window, end)
+        timer = time.perf_counter()
+        test_set = list(iter_feature_sets(store.between(start, window_end), **kwargs))
+        timings["build"] += time.perf_counter() - timer
+        if not test_set:  # no show aired in the window, there is nothing to score or learn from
+            start = window_end
+            continue
+
+        timer = time.perf_counter()
+        window_confusion = _confusion(classifier, test_set)
+        timings["predict"] += time.perf_counter() - timer
+        for row, window_row in zip(confusion, window_confusion):
+            row[:] = [count + window_count for count, window_count in zip(row, window_row)]
+        windows.append({"start": start.isoformat(), "end": window_end.isoformat(), "train_questions": n_trained,
+                        "test_questions": len(test_set),
+                        "accuracy": EvaluationReport(list(ROUNDS), window_confusion).accuracy})
+
+        timer = time.perf_counter()
+        classifier.partial_fit(test_set)
+        timings["train"] += time.perf_counter() - timer
+        n_trained += len(test_set)
+        start = window_end
+    return BacktestReport(list(ROUNDS), confusion, timings, windows)
+
+
+def _evaluate_fold(vocabulary: FeatureVocabulary, test_set: list[FeatureSet],
+                   totals: CountTable | tuple[array, array], smoothing: float) -> tuple[list[list[int]], float, float]:
+    """Task of `cross_validate`: takes the held out fold back out of a copy of the totals and scores it.
+
+    :param vocabulary: vocabulary whose feature ids index the totals
+    :param test_set: the held out feature sets
+    :param totals: counts of every fold, as a table or as its (feature counts, class counts) arrays
+    :param smoothing: additive smoothing alpha of the classifier
+    :return: the confusion matrix of the fold, and the seconds spent training and predicting
+    """
+    start = time.perf_counter()
+    feature_counts, class_counts = ((totals.feature_counts, totals.class_counts) if isinstance(totals, CountTable)
+                                    else totals)
+    counts = CountTable(ROUNDS, vocabulary, array("q", feature_counts), array("q", class_counts))
+    classifier = JeopardyClassifier.from_counts(counts.add_all(test_set, -1), smoothing)
+    trained = time.perf_counter()
+    confusion = _confusion(classifier, test_set)
+    return confusion, trained - start, time.perf_counter() - trained
+
+
+def _evaluate_cached_fold(cache_path: str, fold: array, totals: tuple[array, array],
+                          smoothing: float) -> tuple[list[list[int]], float, float]:
+    """Worker task of `cross_validate` for feature sets loaded from a feature cache: maps the cache file in the worker
+    and evaluates the fold with `_evaluate_fold`."""
+    from jeopardy_feature_cache import CachedFeatureSets
+    cached = CachedFeatureSets.load(cache_path)
+    return _evaluate_fold(cached.vocabulary, [cached[index] for index in fold], totals, smoothing)
+
+
+def _confusion(classifier: JeopardyClassifier, test_set: Iterable[FeatureSet]) -> list[list[int]]:
+    """Confusion matrix of the classifier's predictions on labeled feature sets."""
+    label_index = {label: index for index, label in enumerate(ROUNDS)}
+    confusion = [[0] * len(ROUNDS) for _ in ROUNDS]
+    test_set = list(test_set)
+    for feature_set, prediction in zip(test_set, classifier.predict_many(test_set)):
+        confusion[label_index[feature_set.clas]][prediction.index] += 1
+    return confusion
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    return numerator / denominator if denominator else 0.0
@@ -0,0 +1,160 @@
+"""On-disk cache of the feature sets extracted from a dataset file, keyed by the file's contents and the feature
+extraction config, so that experiments which only change the split or the classifier skip parsing and extraction.
+"""
+from __future__ import annotations
+from jeopardy_data import *
+from mapped_vocabulary import MappedVocabulary, vocabulary_sections
+from section_file import read_sections, write_sections
+import hashlib
+import json
+import os
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+CACHE_MAGIC = b"JFSC"  # first bytes of a feature cache file
+CACHE_FORMAT_VERSION = 2
+
+
+class CachedFeatureSets:
+    """Columnar, read-only collection of compact feature sets, as stored in a feature cache file.
+
+    Attributes:
+        _vocabulary (FeatureVocabulary): vocabulary the feature ids refer to
+        _labels (list[str]): names of the classes, indexed by the codes in `_label_codes`
+        _offsets (array[int]): start of every feature set's ids in `_ids`, plus the total number of ids
+        _ids (array[int]): sorted feature ids of all the feature sets, one after another
+        _label_codes (array[int]): class of every feature set, as an index into `_labels`
+        path (str | None): file the feature sets were loaded from, so that worker processes can map it themselves
+    """
+
+    def __init__(self, vocabulary: FeatureVocabulary, labels: list[str], offsets, ids, label_codes,
+                 path: str = None):
+        self._vocabulary = vocabulary
+        self._labels = labels
+        self._offsets = offsets
+        self._ids = ids
+        self._label_codes = label_codes
+        self.path = path
+
+    @classmethod
+    def from_feature_sets(cls, feature_sets: Iterable[FeatureSet], labels: list[str]) -> CachedFeatureSets:
+        """Encodes feature sets, whose classes must all be in `labels`, into a new vocabulary in a single pass."""
+        vocabulary = FeatureVocabulary()
+        label_index = {label: code for code, label in enumerate(labels)}
+        offsets, ids, label_codes = array("q", [0]), array("i"), array("b")
+        for feature_set in feature_sets:
+            ids.extend(vocabulary.encode(feature_set.feat))
+            offsets.append(len(ids))
+            label_codes.append(label_index[feature_set.clas])
+        return cls(vocabulary, list(labels), offsets, ids, label_codes)
+
+    @classmethod
+    def load(cls, file_path: str, memory_map: bool = True) -> CachedFeatureSets:
+        """Reads feature sets written by `save`, memory-mapping their columns and vocabulary by default (see
+        `section_file` and `mapped_vocabulary`)."""
+        header, sections = read_sections(file_path, CACHE_MAGIC, CACHE_FORMAT_VERSION, memory_map)
+        return cls(MappedVocabulary.from_sections(sections), header["labels"], sections["offsets"], sections["ids"],
+                   sections["label_codes"], file_path)
+
+    def save(self, file_path: str) -> None:
+        """Writes the feature sets to `file_path`. Feature values must be one of `mapped_vocabulary.VALUE_TYPES`."""
+        write_sections(file_path, CACHE_MAGIC, CACHE_FORMAT_VERSION, {"labels": self._labels},
+                       {**vocabulary_sections(self._vocabulary), "offsets": self._offsets, "ids": self._ids,
+                        "label_codes": self._label_codes})
+
+    @property
+    def vocabulary(self) -> FeatureVocabulary:
+        return self._vocabulary
+
+    @property
+    def labels(self) -> list[str]:
+        return self._labels
+
+    def __len__(self) -> int:
+        return len(self._label_codes)
+
+    def __getitem__(self, index: int) -> CompactFeatureSet:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("feature set index out of range")
+        ids = self._ids[self._offsets[index]:self._offsets[index + 1]]
+        return CompactFeatureSet(ids, self._vocabulary, self._labels[self._label_codes[index]])
+
+    def __iter__(self) -> Iterator[CompactFeatureSet]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+class FeatureCache:
+    """Directory of cached feature sets. Each dataset file is cached under a key made of a hash of its contents and a
+    hash of the feature extraction config, so a cache entry is rebuilt whenever either of them changes.
+
+    Attributes:
+        _cache_dir (str): directory holding the cache files
+        _config (dict): feature extraction config, part of every cache key
+        _rounds (list[str]): rounds whose questions are cached
+        _build_kwargs (dict): additional data passed on to `JeopardyFeatureSet.build`
+        _hits (int): number of `load` calls answered from the cache
+        _misses (int): number of `load` calls that had to extract the feature sets
+    """
+
+    def __init__(self, cache_dir: str, rounds: Iterable[str] = ROUNDS, **build_kwargs):
+        self._cache_dir = cache_dir
+        self._rounds = list(rounds)
+        self._build_kwargs = build_kwargs
+        self._hits = self._misses = 0
+        self._config = {
+            "feature_set": f"{JeopardyFeatureSet.__module__}.{JeopardyFeatureSet.__qualname__}",
+            "feature_version": JeopardyFeatureSet.FEATURE_VERSION,
+            "format_version": CACHE_FORMAT_VERSION,  # entries of older formats are rebuilt rather than misread
+            "rounds": self._rounds,
+            "build_kwargs": build_kwargs,
+        }
+
+    def key(self, file_path: str) -> str:
+        """Returns the cache key of a dataset file: its content hash followed by the config hash."""
+        content_hash = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            while chunk := file.read(1 << 20):
+                content_hash.update(chunk)
+        config_hash = hashlib.sha256(json.dumps(self._config, sort_keys=True, default=repr).encode())
+        return f"{content_hash.hexdigest()[:32]}-{config_hash.hexdigest()[:16]}"
+
+    def path(self, file_path: str) -> str:
+        """Returns the path of the cache file of a dataset file."""
+        return os.path.join(self._cache_dir, self.key(file_path) + ".jfc")
+
+    def load(self, file_path: str, workers: int = 1, memory_map: bool = True) -> CachedFeatureSets:
+        """Returns the feature sets of every question in a dataset file, reading them from the cache if it has them
+        and otherwise extracting them (in parallel with `workers` processes) and adding them to the cache.
+
+        :param file_path: path of a dataset file readable by `jeopardy_data.iter_questions`
+        :param workers: number of worker processes used for extraction on a cache miss, as joblib's `n_jobs`
+        :param memory_map: whether to memory-map the cached columns instead of reading them into memory
+        :return: the feature sets, labeled with their rounds
+        """
+        profiler = current_profiler()
+        cache_path = self.path(file_path)
+        if os.path.exists(cache_path):
+            self._hits += 1
+        else:
+            self._misses += 1
+            feature_sets = iter_feature_sets(iter_questions(file_path), self._rounds, workers, **self._build_kwargs)
+            os.makedirs(self._cache_dir, exist_ok=True)
+            partial_path = f"{cache_path}.{os.getpid()}.tmp"
+            with profiler.stage("extract features") as stage:
+                extracted = CachedFeatureSets.from_feature_sets(feature_sets, ROUNDS)
+                stage.add(len(extracted))
+                extracted.save(partial_path)
+            os.replace(partial_path, cache_path)  # never leave a half written entry behind
+        profiler.cache("feature cache", self._hits, self._misses)
+        with profiler.stage("load feature cache") as stage:
+            cached = CachedFeatureSets.load(cache_path, memory_map)
+            stage.add(len(cached))
+        return cached
@@ -0,0 +1,279 @@
+"""Registry of pluggable feature extractors for jeopardy questions, and the extraction plans they are compiled into.
+
+An extractor builds one family of features (category, value, length, air date, text...) for a whole batch of
+questions at once, from columns of the question fields it needs. A plan reads every needed field of a batch once,
+runs each enabled extractor over its columns, then merges their features per question, so adding a family of
+features adds one pass over a column rather than work inside a per-question loop. New families are added with
+`register_extractor` and enabled by name, e.g. `JeopardyFeatureSet.build(question, extractors=("category", "date"))`.
+"""
+from __future__ import annotations
+from jeopardy_text_features import *
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from itertools import chain
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+EXTRACTORS: dict[str, type[FeatureExtractor]] = {}  # registered extractor classes by name
+DEFAULT_EXTRACTORS = ("category", "length", "value")  # the features `JeopardyFeatureSet.build` has always built
+
+
+def register_extractor(name: str):
+    """Class decorator that registers a `FeatureExtractor` subclass under `name`, so that configs can enable it."""
+    def register(extractor_cls: type[FeatureExtractor]) -> type[FeatureExtractor]:
+        EXTRACTORS[name] = extractor_cls
+        return extractor_cls
+    return register
+
+
+class FeatureExtractor(ABC):
+    """Builds one family of features for a batch of questions, a column at a time.
+
+    Attributes:
+        fields (tuple[str, ...]): question fields the extractor reads, which every question must have
+        optional_fields (tuple[str, ...]): question fields the extractor reads, which may be missing (None)
+    """
+
+    fields: tuple[str, ...] = ()
+    optional_fields: tuple[str, ...] = ()
+
+    @abstractmethod
+    def extract(self, columns: dict[str, list]) -> Iterable[Iterable[Feature]]:
+        """Returns the features of every question of a batch.
+
+        :param columns: the value of every field the extractor reads, for every question of the batch, by field
+        :return: the features of each question, in batch order
+        """
+        pass
+
+    def extract_one(self, source_object: dict) -> Iterable[Feature]:
+        """Returns the features of a single question. Runs `extract` over a batch of one by default, extractors
+        override it where a batch of one costs noticeably more than a direct lookup.
+
+        :param source_object: a single jeopardy question in json format
+        :return: the features of the question
+        """
+        columns = {field: [source_object[field]] for field in self.fields}
+        columns.update((field, [source_object.get(field)]) for field in self.optional_fields)
+        return self.extract(columns)[0]
+
+    def __repr__(self) -> str:
+        # identifies the extraction config in feature cache keys, so it lists every setting that changes output
+        options = ", ".join(f"{name}={value!r}" for name, value in vars(self).items() if not name.startswith("_"))
+        return f"{type(self).__name__}({options})"
+
+
+class _MemoizedExtractor(FeatureExtractor):
+    """Extractor whose features only depend on the value of a single field, so they are built once per distinct
+    value and the same `Feature` instances are shared by every question with that value. Only the features of the
+    `MEMO_SIZE` most recently seen values are kept, so a field with unbounded distinct values (e.g. categories over
+    a stream of questions) does not grow the memo without bound.
+
+    Attributes:
+        MEMO_SIZE (int): number of distinct values whose features are remembered
+    """
+
+    MEMO_SIZE: int = 1 << 16
+
+    def __init__(self):
+        self._setup()
+
+    def _setup(self) -> None:
+        self._memo = lru_cache(maxsize=self.MEMO_SIZE)(self._features_of)
+
+    def extract(self, columns: dict[str, list]) -> list[tuple[Feature, ...]]:
+        return list(map(self._memo, columns[(self.fields or self.optional_fields)[0]]))
+
+    def extract_one(self, source_object: dict) -> tuple[Feature, ...]:
+        return self._memo(source_object[self.fields[0]] if self.fields
+                          else source_object.get(self.optional_fields[0]))
+
+    @abstractmethod
+    def _features_of(self, value: Any) -> tuple[Feature, ...]:
+        pass
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_memo"]  # do not ship the memo to worker processes, it is rebuilt on the other side
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._setup()
+
+
+@register_extractor("category")
+class CategoryExtractor(_MemoizedExtractor):
+    """The category of the question."""
+
+    fields = ("category",)
+
+    def _features_of(self, category: str) -> tuple[Feature, ...]:
+        return (Feature("Category of Question", category),)
+
+
+@register_extractor("length")
+class LengthExtractor(FeatureExtractor):
+    """Whether the question text is longer than `threshold` characters.
+
+    Attributes:
+        threshold (int): length in characters that separates long questions from short ones
+    """
+
+    fields = ("question",)
+
+    def __init__(self, threshold: int = 80):
+        self.threshold = threshold
+        self._long = (Feature(f"Amount of characters is >{threshold}", True),)
+        self._short = (Feature(f"Amount of characters is <{threshold}", True),)
+
+    def extract(self, columns: dict[str, list]) -> list[tuple[Feature, ...]]:
+        threshold, long, short = self.threshold, self._long, self._short
+        return [long if len(text) > threshold else short for text in columns["question"]]
+
+    def extract_one(self, source_object: dict) -> tuple[Feature, ...]:
+        return self._long if len(source_object["question"]) > self.threshold else self._short
+
+
+@register_extractor("value")
+class ValueExtractor(_MemoizedExtractor):
+    """The dollar value of the question, parsed from strings like "$1,200"; none for questions without one."""
+
+    fields = ("value",)
+
+    def _features_of(self, value: str | None) -> tuple[Feature, ...]:
+        if value is None:
+            return ()
+        return (Feature("Value of Question", int(value[1:].replace(",", ""))),)  # get rid of $ and ,
+
+
+@register_extractor("date")
+class AirDateExtractor(_MemoizedExtractor):
+    """The year or decade the question aired in; none for questions without an air date.
+
+    Attributes:
+        granularity (str): "year" or "decade"
+    """
+
+    optional_fields = ("air_date",)
+
+    def __init__(self, granularity: str = "year"):
+        super().__init__()
+        if granularity not in ("year", "decade"):
+            raise ValueError(f"unknown granularity {granularity!r}, expected 'year' or 'decade'")
+        self.granularity = granularity
+
+    def _features_of(self, air_date: str | None) -> tuple[Feature, ...]:
+        if not air_date:
+            return ()
+        year = int(air_date[:4])
+        if self.granularity == "decade":
+            return (Feature("Air decade", year - year % 10),)
+        return (Feature("Air year", year),)
+
+
+@register_extractor("text")
+class TextExtractor(FeatureExtractor):
+    """Hashed question and answer text features (see `jeopardy_text_features.HashingVectorizer`).
+
+    Attributes:
+        vectorizer (HashingVectorizer): tokenizes and hashes the text fields
+    """
+
+    def __init__(self, vectorizer: HashingVectorizer = None, **options):
+        self.vectorizer = vectorizer if vectorizer is not None else HashingVectorizer(**options)
+        self.optional_fields = self.vectorizer.fields
+
+    def extract(self, columns: dict[str, list]) -> Iterable[Iterable[Feature]]:
+        per_field = [self.vectorizer.column_features(field, columns[field]) for field in self.vectorizer.fields]
+        return [chain.from_iterable(row) for row in zip(*per_field)]
+
+    def extract_one(self, source_object: dict) -> set[Feature]:
+        return self.vectorizer.features(source_object)
+
+    def __repr__(self) -> str:
+        return f"TextExtractor({self.vectorizer!r})"
+
+
+class ExtractionPlan:
+    """Fused extraction of the features of a fixed list of extractors over batches of questions.
+
+    Attributes:
+        extractors (tuple[FeatureExtractor, ...]): the enabled extractors, in config order
+        fields (tuple[str, ...]): every field some extractor requires, read once per batch
+        optional_fields (tuple[str, ...]): every other field some extractor reads, read once per batch
+    """
+
+    def __init__(self, extractors: Iterable[FeatureExtractor]):
+        self.extractors = tuple(extractors)
+        self.fields = tuple(dict.fromkeys(field for extractor in self.extractors for field in extractor.fields))
+        self.optional_fields = tuple(field for field in dict.fromkeys(
+            field for extractor in self.extractors for field in extractor.optional_fields) if field not in self.fields)
+
+    def extract(self, source_objects: list[dict]) -> list[set[Feature]]:
+        """Returns the features of every question of a batch, in order.
+
+        :param source_objects: jeopardy questions in json format
+        :return: one set of features per question
+        """
+        if not self.extractors:  # zip() of no extractors would yield no rows at all
+            return [set() for _ in source_objects]
+        columns = {field: [source_object[field] for source_object in source_objects] for field in self.fields}
+        for field in self.optional_fields:
+            columns[field] = [source_object.get(field) for source_object in source_objects]
+        per_extractor = [extractor.extract(columns) for extractor in self.extractors]
+        return [set(chain.from_iterable(row)) for row in zip(*per_extractor)]
+
+    def extract_one(self, source_object: dict) -> set[Feature]:
+        """Returns the features of a single question, without the column setup `extract` does for a batch."""
+        features = set()
+        for extractor in self.extractors:
+            features.update(extractor.extract_one(source_object))
+        return features
+
+    def __repr__(self) -> str:
+        return f"ExtractionPlan({', '.join(map(repr, self.extractors))})"
+
+
+def compile_plan(extractors: Iterable = DEFAULT_EXTRACTORS,
+                 text_vectorizer: HashingVectorizer = None) -> ExtractionPlan:
+    """Returns the extraction plan of a config. The extractors of a config are compiled once and then reused, along
+    with their memos, by every plan of that config. A plan with a `text_vectorizer` is assembled around them on every
+    call instead of being cached, so that no vectorizer is kept alive by the cache.
+
+    :param extractors: names of registered extractors to enable, in order, each optionally paired with a dict of
+        options for it, e.g. `["category", ("length", {"threshold": 100}), ("date", {"granularity": "decade"})]`
+    :param text_vectorizer: if given, also enables the "text" extractor with this vectorizer
+    :return: the plan
+    """
+    try:
+        plan = _compile_plan(extractors)
+    except TypeError:  # unhashable config, e.g. a list or option dicts
+        plan = _compile_plan(tuple(_config_key(entry) for entry in extractors))
+    if text_vectorizer is None:
+        return plan
+    return ExtractionPlan((*plan.extractors, TextExtractor(text_vectorizer)))
+
+
+@lru_cache(maxsize=64)
+def _compile_plan(extractors: tuple) -> ExtractionPlan:
+    compiled = []
+    for entry in extractors:
+        name, options = (entry, ()) if isinstance(entry, str) else entry
+        if name not in EXTRACTORS:
+            raise ValueError(f"unknown feature extractor {name!r}, expected one of {sorted(EXTRACTORS)}")
+        compiled.append(EXTRACTORS[name](**dict(options)))
+    return ExtractionPlan(compiled)
+
+
+def _config_key(entry) -> str | tuple[str, tuple]:
+    """Hashable form of one entry of an extractor config."""
+    if isinstance(entry, str):
+        return entry
+    name, options = entry
+    return name, tuple(sorted(dict(options).items()))
@@ -0,0 +1,251 @@
+"""Long-running local prediction service for a saved JeopardyClassifier, e.g.
+`python jeopardy_prediction_server.py model.jcm --port 8080`, then
+`curl -d '{"category": "HISTORY", "question": "...", "value": "$200", "answer": "..."}' localhost:8080/predict`
+
+Concurrent requests are coalesced into micro-batches that are scored with a single `predict_many` call.
+"""
+from jeopardy_classifier_models import *
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Content Too Large",
+            500: "Internal Server Error"}
+MAX_BODY_BYTES = 1 << 24
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collects feature sets submitted by concurrent requests and scores them together.
+
+    A batch is scored as soon as it holds `max_batch_size` feature sets, or `max_wait` seconds after its first feature
+    set arrived, whichever comes first, so a lone request waits at most `max_wait` while a burst of requests is scored
+    in a few large batches.
+
+    Attributes:
+        classifier (JeopardyClassifier): the classifier used for scoring
+        max_batch_size (int): largest number of feature sets scored at once
+        max_wait (float): longest time in seconds a feature set waits for its batch to fill up
+        posteriors (bool): whether predictions include normalized posteriors
+        batches (int): number of batches scored so far
+        items (int): number of feature sets scored so far
+    """
+
+    def __init__(self, classifier: JeopardyClassifier, max_batch_size: int = 64, max_wait: float = 0.002,
+                 posteriors: bool = True):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.posteriors = posteriors
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._worker = None
+
+    async def start(self) -> None:
+        """Starts the background task that forms and scores batches; must be called from the running event loop."""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancels the background task."""
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+    async def submit(self, feature_set: FeatureSet) -> Prediction:
+        """Queues a feature set for the next batch and returns its prediction once that batch has been scored."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((feature_set, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+
+            try:
+                predictions = self.classifier.predict_many([feature_set for feature_set, _ in batch], self.posteriors)
+            except Exception as error:  # fail the batch's requests, not the server
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():  # the client may have gone away
+                    future.set_result(prediction)
+
+
+class PredictionServer:
+    """Minimal HTTP/1.1 server (standard library only) answering with the predicted round of posted questions.
+
+    Endpoints:
+        POST /predict: body is one question, or a JSON list of questions, in the 200k_questions.json schema ("round"
+            is not needed); answers with one prediction object, or a list of them
+        GET /health: answers with the number of batches and questions scored so far
+
+    Attributes:
+        batcher (MicroBatcher): scores the questions of all connections together
+        build_kwargs (dict): additional data passed on to `JeopardyFeatureSet.build`, which must match the training;
+            a ValueError is raised if the classifier records that it was trained with features built otherwise
+    """
+
+    def __init__(self, classifier: JeopardyClassifier, max_batch_size: int = 64, max_wait: float = 0.002,
+                 **build_kwargs):
+        classifier.check_feature_config(JeopardyFeatureSet.feature_config(**build_kwargs))
+        self.batcher = MicroBatcher(classifier, max_batch_size, max_wait)
+        self.build_kwargs = build_kwargs
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080, unix_socket: str = None) -> asyncio.Server:
+        """Starts listening on a TCP port, or on a Unix socket if one is given, and returns the asyncio server."""
+        await self.batcher.start()
+        if unix_socket is not None:
+            self._server = await asyncio.start_unix_server(self._handle, unix_socket)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def predict(self, question: dict) -> dict:
+        """Predicts the round of a single question through the micro-batcher."""
+        prediction = await self.batcher.submit(JeopardyFeatureSet.build(question, None, **self.build_kwargs))
+        result = {"label": prediction.label, "index": prediction.index, "log_score": prediction.log_score}
+        if prediction.posteriors is not None:
+            result["posteriors"] = dict(zip(self.batcher.classifier.labels, prediction.posteriors))
+        return result
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves the requests of one connection, keeping it alive between requests unless asked not to."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await _respond(writer, 413, {"error": "request body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, response = await self._route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                await _respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # malformed request or the client went away
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[int, Any]:
+        if path == "/health":
+            return 200, {"status": "ok", "batches": self.batcher.batches, "questions": self.batcher.items}
+        if path != "/predict":
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "POST a question to /predict"}
+        try:
+            payload = json.loads(body)
+            if isinstance(payload, list):
+                return 200, list(await asyncio.gather(*(self.predict(question) for question in payload)))
+            return 200, await self.predict(payload)
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return 400, {"error": f"invalid question: {error!r}"}
+        except Exception as error:  # answer the request, keep serving the others
+            logger.exception("failed to predict %s", path)
+            return 500, {"error": f"internal error: {error!r}"}
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+    body = json.dumps(payload).encode()
+    writer.write((f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                 .encode("latin-1") + body)
+    await writer.drain()
+
+
+async def serve(model_path: str, host: str = "127.0.0.1", port: int = 8080, unix_socket: str = None,
+                max_batch_size: int = 64, max_wait: float = 0.002, prediction_cache: int = 0, **build_kwargs) -> None:
+    """Loads a classifier saved with `JeopardyClassifier.save` once and serves predictions until cancelled, caching
+    the scores of the `prediction_cache` most recent feature sets (see `use_prediction_cache`)."""
+    start = time.perf_counter()
+    classifier = JeopardyClassifier.load(model_path).use_prediction_cache(prediction_cache)
+    server = PredictionServer(classifier, max_batch_size, max_wait, **build_kwargs)
+    listener = await server.start(host, port, unix_socket)
+    print(f"Loaded {model_path} in {time.perf_counter() - start:.3f}s, serving on "
+          f"{unix_socket or ', '.join(str(socket.getsockname()) for socket in listener.sockets)}")
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve round predictions of a saved JeopardyClassifier.")
+    parser.add_argument("model_path", help="classifier saved with JeopardyClassifier.save")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix-socket", help="listen on this Unix socket instead of a TCP port")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="largest number of questions scored at once")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="longest wait for a batch to fill up")
+    parser.add_argument("--prediction-cache", type=int, default=0,
+                        help="number of recently scored feature sets whose scores are remembered, 0 for none")
+    parser.add_argument("--text-ngrams", type=int, default=0,
+                        help="largest n-gram of the hashed text features the model was trained with, 0 for none")
+    parser.add_argument("--extractors", default=",".join(DEFAULT_EXTRACTORS),
+                        help="comma separated feature extractors the model was trained with")
+    args = parser.parse_args()
+
+    import click
+    from jeopardy_classifier_models_runner import _build_kwargs, _parse_extractors  # same options as the runner
+    try:
+        build_kwargs = _build_kwargs(args.text_ngrams, _parse_extractors(args.extractors))
+    except click.BadParameter as error:
+        parser.error(error.format_message())
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(serve(args.model_path, args.host, args.port, args.unix_socket, args.max_batch_size,
+                          args.max_wait_ms / 1000, args.prediction_cache, **build_kwargs))
+    except KeyboardInterrupt:
+        pass
+    except ValueError as error:  # raised before serving, when the model was trained with other features
+        parser.error(str(error))
+
+
+if __name__ == '__main__':
+    main()
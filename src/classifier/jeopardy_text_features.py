@@ -0,0 +1,122 @@
+"""Text features for jeopardy questions: tokenized question and answer text mapped onto a fixed number of hashed
+features, so that no token vocabulary ever has to be held in memory.
+"""
+from classifier_models import *
+from functools import lru_cache
+from itertools import chain
+import re
+import zlib
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+class HashingVectorizer:
+    """Tokenizes the text fields of questions into (optionally stemmed) word n-grams and hashes every n-gram into one
+    of `n_features` buckets, each of which becomes a `Feature` named after its field.
+
+    Hashing uses CRC-32 rather than `hash`, so buckets are the same in every process and across runs, and the bucket
+    sets of recently seen texts are kept in an LRU cache, so repeated texts (e.g. common answers) are tokenized once.
+    Stems of recently seen words are cached the same way, so neither cache grows past `cache_size` entries.
+
+    Attributes:
+        n_features (int): number of hash buckets per field
+        ngram_range (tuple[int, int]): smallest and largest n-gram length
+        stem (bool): whether to stem tokens with nltk's Porter stemmer
+        fields (tuple[str, ...]): question fields to vectorize
+        cache_size (int): number of texts whose buckets are cached, and of words whose stems are cached
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, ngram_range: tuple[int, int] = (1, 1), stem: bool = False,
+                 fields: Iterable[str] = ("question", "answer"), cache_size: int = 1 << 16):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.stem = stem
+        self.fields = tuple(fields)
+        self.cache_size = cache_size
+        self._feature_names = {field: f"{field.capitalize()} text hash" for field in self.fields}
+        self._setup()
+
+    def _setup(self) -> None:
+        self.buckets = lru_cache(maxsize=self.cache_size)(self._buckets)
+        if self.stem:
+            from nltk.stem.porter import PorterStemmer
+            self._stem = lru_cache(maxsize=self.cache_size)(PorterStemmer().stem)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()  # the caches and the stemmer are rebuilt on the other side
+        for attribute in ("buckets", "_stem"):
+            state.pop(attribute, None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._setup()
+
+    def __repr__(self) -> str:
+        # also identifies the extraction config in feature cache keys, so it lists every setting that changes output
+        return (f"HashingVectorizer(n_features={self.n_features}, ngram_range={self.ngram_range}, stem={self.stem}, "
+                f"fields={self.fields})")
+
+    def tokens(self, text: str) -> list[str]:
+        """Returns the lowercased, optionally stemmed word tokens of `text`."""
+        words = _TOKEN.findall(text.lower())
+        if self.stem:
+            stem = self._stem
+            words = [stem(word) for word in words]
+        return words
+
+    def ngrams(self, text: str) -> list[str]:
+        """Returns every n-gram of the tokens of `text` within `ngram_range`, with tokens joined by spaces."""
+        words = self.tokens(text)
+        low, high = self.ngram_range
+        return [" ".join(words[start:start + n]) for n in range(low, high + 1) for start in range(len(words) - n + 1)]
+
+    def _buckets(self, text: str) -> frozenset[int]:
+        """Uncached `buckets`: the hash buckets of the n-grams of `text`."""
+        return frozenset(zlib.crc32(ngram.encode()) % self.n_features for ngram in self.ngrams(text))
+
+    def features(self, source_object: dict) -> set[Feature]:
+        """Returns the hashed text features of a single question.
+
+        :param source_object: a single jeopardy question in json format
+        :return: one feature per hash bucket hit by each vectorized field
+        """
+        features = set()
+        for field in self.fields:
+            text = source_object.get(field)
+            if text:
+                name = self._feature_names[field]
+                features.update(Feature(name, bucket) for bucket in self.buckets(text))
+        return features
+
+    def transform(self, source_objects: Iterable[dict]) -> list[set[Feature]]:
+        """Returns the hashed text features of a batch of questions, a field at a time (see `column_features`).
+
+        :param source_objects: jeopardy questions in json format
+        :return: the features of each question, in order
+        """
+        source_objects = list(source_objects)
+        per_field = [self.column_features(field, [source_object.get(field) for source_object in source_objects])
+                     for field in self.fields]
+        if not per_field:
+            return [set() for _ in source_objects]
+        return [set(chain.from_iterable(row)) for row in zip(*per_field)]
+
+    def column_features(self, field: str, texts: Iterable[str | None]) -> list[list[Feature]]:
+        """Returns the hashed text features of one field of a batch of questions, tokenizing each distinct text of the
+        batch once and sharing one `Feature` instance per bucket across the batch.
+
+        :param field: one of `fields`
+        :param texts: the value of `field` for every question of the batch
+        :return: the features of each question's text, in order
+        """
+        name, buckets, shared = self._feature_names[field], self.buckets, {}
+        return [[shared.get(bucket) or shared.setdefault(bucket, Feature(name, bucket)) for bucket in buckets(text)]
+                if text else [] for text in texts]
@@ -0,0 +1,151 @@
+"""Feature vocabularies stored as sections of a `section_file`, so that a saved model or feature cache can be loaded
+without decoding its vocabulary: features are looked up in the mapped sections and only decoded when used.
+"""
+from __future__ import annotations
+from classifier_models import *
+from bisect import bisect_left
+import hashlib
+import json
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+VALUE_TYPES = (str, int, float, type(None))  # feature values that can be saved (bool is an int)
+
+
+def vocabulary_sections(features: Iterable[Feature]) -> dict[str, array | bytes]:
+    """Encodes features, in id order, into the sections that `MappedVocabulary` reads.
+
+    Every feature is stored as the UTF-8 JSON of its [name, value] pair, so values must be one of `VALUE_TYPES`, which
+    JSON gives back unchanged; a feature with any other value (e.g. a tuple, which would come back as a list) raises a
+    TypeError instead of being saved as something else.
+
+    :param features: the features, ordered by id
+    :return: the sections by name, to be written with `section_file.write_sections`
+    """
+    keys = bytearray()
+    offsets = array("q", [0])
+    hashes = []
+    for feature in features:
+        if not isinstance(feature.name, str) or not isinstance(feature.value, VALUE_TYPES):
+            raise TypeError(f"cannot save feature {feature!r}: names must be str and values one of "
+                            f"{', '.join(value_type.__name__ for value_type in VALUE_TYPES)}")
+        key = json.dumps([feature.name, feature.value]).encode()
+        keys += key
+        offsets.append(len(keys))
+        hashes.append(_stable_hash(feature.name, feature.value, key))
+    order = sorted(range(len(hashes)), key=hashes.__getitem__)
+    return {"feature_keys": bytes(keys), "feature_key_offsets": offsets,
+            "feature_hashes": array("Q", map(hashes.__getitem__, order)), "feature_hash_order": array("i", order)}
+
+
+class MappedVocabulary(FeatureVocabulary):
+    """`FeatureVocabulary` over the sections written by `vocabulary_sections`, typically memory-mapped.
+
+    Loading costs nothing per feature: a feature is decoded the first time its id is used, and looked up by a binary
+    search of the stored hashes the first time it is asked for, after which both are remembered. Features interned
+    beyond the stored ones (e.g. by `partial_fit`) get the next ids, as in any vocabulary.
+
+    Attributes:
+        _keys (memoryview | bytes): the JSON [name, value] pair of every stored feature, one after another
+        _key_offsets (array[int]): start of every stored feature's pair in `_keys`, plus the total length
+        _hashes (array[int]): stable hashes of the stored features, sorted
+        _hash_order (array[int]): id of the stored feature of each hash in `_hashes`
+        _n_stored (int): number of stored features, which take ids 0 to `_n_stored` - 1
+        _decoded (dict[int, Feature]): stored features decoded so far, by id
+        _ids (dict[tuple[str, Any], int]): id of every feature looked up or interned so far
+        _features (list[Feature]): features interned beyond the stored ones, by id - `_n_stored`
+    """
+
+    def __init__(self, keys, key_offsets, hashes, hash_order):
+        super().__init__()
+        self._keys = keys
+        self._key_offsets = key_offsets
+        self._hashes = hashes
+        self._hash_order = hash_order
+        self._n_stored = len(key_offsets) - 1
+        self._decoded: dict[int, Feature] = {}
+
+    @classmethod
+    def from_sections(cls, sections: dict) -> MappedVocabulary:
+        """Returns the vocabulary stored in the sections read by `section_file.read_sections`."""
+        return cls(sections["feature_keys"], sections["feature_key_offsets"], sections["feature_hashes"],
+                   sections["feature_hash_order"])
+
+    def __reduce__(self):
+        # memory-mapped sections cannot be pickled, so they are copied
+        return type(self), (bytes(self._keys), array("q", self._key_offsets), array("Q", self._hashes),
+                            array("i", self._hash_order)), self._features
+
+    def __setstate__(self, features: list[Feature]) -> None:
+        for feature in features:
+            self.intern(feature)
+
+    def __len__(self) -> int:
+        return self._n_stored + len(self._features)
+
+    def __iter__(self):
+        return map(self.feature, range(len(self)))
+
+    def __contains__(self, feature: Feature) -> bool:
+        return self.get_id(feature) is not None
+
+    def intern_pair(self, name: str, value: Any = None, feature: Feature = None) -> int:
+        feature_id = self._find(name, value)
+        if feature_id is None:
+            feature_id = self._ids[name, value] = len(self)
+            self._features.append(feature if feature is not None else Feature(name, value))
+        return feature_id
+
+    def get_id(self, feature: Feature) -> int | None:
+        return self._find(feature.name, feature.value)
+
+    def feature(self, feature_id: int) -> Feature:
+        if feature_id >= self._n_stored:
+            return self._features[feature_id - self._n_stored]
+        feature = self._decoded.get(feature_id)
+        if feature is None:
+            if feature_id < 0:
+                raise IndexError("feature id out of range")
+            start, end = self._key_offsets[feature_id], self._key_offsets[feature_id + 1]
+            feature = self._decoded[feature_id] = Feature(*json.loads(bytes(self._keys[start:end])))
+        return feature
+
+    def _find(self, name: str, value: Any) -> int | None:
+        """Id of the feature with the given name and value, or None if it is neither stored nor interned."""
+        key = (name, value)
+        feature_id = self._ids.get(key)
+        if feature_id is not None:
+            return feature_id
+        try:
+            target = _stable_hash(name, value)
+        except TypeError:  # not JSON serializable, so not stored
+            return None
+        hashes = self._hashes
+        index = bisect_left(hashes, target)
+        while index < len(hashes) and hashes[index] == target:
+            stored = self.feature(self._hash_order[index])
+            if stored.name == name and stored.value == value:
+                feature_id = self._ids[key] = self._hash_order[index]
+                return feature_id
+            index += 1
+        return None
+
+
+def _stable_hash(name: str, value: Any, key: bytes = None) -> int:
+    """64-bit hash of a feature that is the same in every process, and equal for features that compare equal.
+
+    :param name: name of the feature
+    :param value: value of the feature
+    :param key: the feature's JSON [name, value] pair, if already encoded
+    """
+    if isinstance(value, bool) or isinstance(value, float) and value.is_integer():
+        value, key = int(value), None  # True == 1 == 1.0
+    if key is None:
+        key = json.dumps([name, value]).encode()
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
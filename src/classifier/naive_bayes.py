@@ -0,0 +1,994 @@
+"""Naive Bayes classification over the abstract types of `classifier_models`: per-class training counts, the
+compiled log-probability tables used for scoring, and the binary model file format."""
+
+from __future__ import annotations
+from classifier_models import *
+from array import array
+from collections import OrderedDict
+from collections import Counter
+from itertools import accumulate, chain, compress, islice, repeat
+from operator import add, mul, sub
+import heapq
+from profiling import Profiler, current_profiler
+from mapped_vocabulary import MappedVocabulary, vocabulary_sections
+from section_file import read_sections, write_sections
+import math
+from typing import Iterable, NamedTuple, Sequence
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+EVENT_MODELS = ("bernoulli", "multinomial")  # supported `NaiveBayesClassifier` event models
+_GAMMA_TABLE = (0.0, "gamma")  # key of the table `NaiveBayesClassifier.gamma` scores with
+TIE_TOLERANCE = 1e-9  # log gammas (or relative gammas) closer than this tie, so rounding cannot break the tie
+MODEL_FORMAT_VERSION = 3
+
+
+class CountTable:
+    """Raw per-class training counts of a classifier, which can be updated one feature set at a time and merged with
+    the counts of other shards of the training data.
+
+    Attributes:
+        _labels (list[str]): names of the classes, in the order of the counts
+        _label_index (dict[str, int]): position of every class in `_labels`
+        _vocabulary (FeatureVocabulary): vocabulary whose feature ids index the rows of `_feature_counts`
+        _feature_counts (array[int]): flat row-major matrix with, for every feature id, the number of training
+            feature sets of each class that contain the feature
+        _class_counts (array[int]): number of training feature sets of each class
+    """
+
+    def __init__(self, labels: Iterable[str], vocabulary: FeatureVocabulary = None, feature_counts=None,
+                 class_counts=None):
+        self._labels: list[str] = list(labels)
+        self._label_index: dict[str, int] = {label: index for index, label in enumerate(self._labels)}
+        self._vocabulary: FeatureVocabulary = vocabulary if vocabulary is not None else FeatureVocabulary()
+        self._feature_counts: array = feature_counts if feature_counts is not None else array("q")
+        self._class_counts: array = (class_counts if class_counts is not None
+                                     else array("q", bytes(8 * len(self._labels))))
+
+    @property
+    def labels(self) -> list[str]:
+        return self._labels
+
+    @property
+    def vocabulary(self) -> FeatureVocabulary:
+        return self._vocabulary
+
+    @property
+    def label_index(self) -> dict[str, int]:
+        return self._label_index
+
+    @property
+    def class_counts(self) -> array:
+        return self._class_counts
+
+    @property
+    def feature_counts(self) -> array:
+        return self._feature_counts
+
+    @property
+    def total(self) -> int:
+        return sum(self._class_counts)
+
+    def detach(self) -> CountTable:
+        """Copies counts that are read-only views (e.g. of a memory-mapped model file) into private arrays, so that
+        they can be updated. Returns this table."""
+        if not isinstance(self._feature_counts, array):
+            self._feature_counts = array("q", self._feature_counts)
+        if not isinstance(self._class_counts, array):
+            self._class_counts = array("q", self._class_counts)
+        return self
+
+    def add(self, feature_set: FeatureSet, count: int = 1, new_rows: list[int] = None) -> None:
+        """Counts a single training feature set, whose `clas` must be one of the table's labels. A label the table
+        does not know raises a ValueError rather than being counted as some other class.
+
+        :param feature_set: the feature set
+        :param count: how many times to count it, -1 to take back a feature set that was counted before
+        :param new_rows: if given, receives the ids of the features that had not been counted for any class before
+        """
+        clas = self._label_index.get(feature_set.clas)
+        if clas is None:
+            raise ValueError(f"{feature_set.clas!r} is not one of the classes {self._labels}")
+
+        if isinstance(feature_set, CompactFeatureSet) and feature_set.vocabulary is self._vocabulary:
+            ids = feature_set.ids
+        else:
+            intern = self._vocabulary.intern
+            ids = [intern(feature) for feature in feature_set.feat]
+
+        n_classes = len(self._labels)
+        counts = self._feature_counts
+        if ids and max(ids) * n_classes >= len(counts):
+            self._grow()
+        if new_rows is not None:
+            new_rows.extend(feature_id for feature_id in ids
+                            if not any(counts[feature_id * n_classes:(feature_id + 1) * n_classes]))
+        for feature_id in ids:
+            counts[feature_id * n_classes + clas] += count
+        self._class_counts[clas] += count
+
+    def add_all(self, feature_sets: Iterable[FeatureSet], count: int = 1, new_rows: list[int] = None) -> CountTable:
+        """Counts every training feature set (`count` times, see `add`) in a single pass and returns this table."""
+        for feature_set in feature_sets:
+            self.add(feature_set, count, new_rows)
+        return self
+
+    def merge(self, other: CountTable) -> CountTable:
+        """Adds the counts of `other` to this table and returns this table. The classes of `other` must be a subset
+        of this table's; if the tables use different vocabularies, the features of `other` are interned into this
+        table's vocabulary.
+
+        :param other: counts of another shard of the training data
+        :return: this table
+        """
+        missing = [label for label in other.labels if label not in self._label_index]
+        if missing:
+            raise ValueError(f"cannot merge counts of unknown classes {missing}")
+        columns = [self._label_index[label] for label in other.labels]
+        n_classes, n_other_classes = len(self._labels), len(other.labels)
+
+        if other.vocabulary is self._vocabulary:
+            rows = range(len(other.feature_counts) // n_other_classes)
+        else:
+            rows = [self._vocabulary.intern(other.vocabulary.feature(feature_id))
+                    for feature_id in range(len(other.feature_counts) // n_other_classes)]
+        self._grow()
+
+        counts, other_counts = self._feature_counts, other.feature_counts
+        for other_row, row in enumerate(rows):
+            for other_column, column in enumerate(columns):
+                counts[row * n_classes + column] += other_counts[other_row * n_other_classes + other_column]
+        for other_column, column in enumerate(columns):
+            self._class_counts[column] += other.class_counts[other_column]
+        return self
+
+    def proportions(self) -> list[float]:
+        """Returns the fraction of the training feature sets that belong to each class."""
+        total = self.total
+        return [count / total if total else 0.0 for count in self._class_counts]
+
+    def probability_dict(self) -> dict[Feature, list[float]]:
+        """Returns, for every counted feature, the fraction of each class's training feature sets containing it."""
+        n_classes = len(self._labels)
+        probabilities = {}
+        for feature_id in range(len(self._feature_counts) // n_classes):
+            row = self._feature_counts[feature_id * n_classes:(feature_id + 1) * n_classes]
+            if any(row):
+                probabilities[self._vocabulary.feature(feature_id)] = [
+                    count / class_count if class_count else 0.0 for count, class_count in zip(row, self._class_counts)]
+        return probabilities
+
+    def top_features(self, k: int = 10, smoothing: float = 1.0) -> list[list[tuple[float, Feature]]]:
+        """Ranks the counted features of every class by log-likelihood ratio, log P(feature | class) minus
+        log P(feature | any other class), with both probabilities estimated (as by the "bernoulli" event model) from
+        how many feature sets in and out of the class have the feature, additively smoothed by `smoothing`.
+
+        All classes are ranked in a single pass over the feature count matrix, keeping each class's best `k`
+        features in a heap, so the cost grows linearly with the vocabulary rather than with a sort of it.
+
+        :param k: number of features to return per class
+        :param smoothing: additive smoothing alpha, so that a feature seen with only one class is not infinitely
+            predictive of it
+        :return: for every class, in the order of `labels`, up to `k` (log-likelihood ratio, feature) pairs, best first
+        """
+        n_classes = len(self._labels)
+        total = sum(self._class_counts)
+        log_in = [math.log(class_count + 2 * smoothing) if class_count + 2 * smoothing > 0 else None
+                  for class_count in self._class_counts]
+        log_out = [math.log(total - class_count + 2 * smoothing) if total - class_count + 2 * smoothing > 0 else None
+                   for class_count in self._class_counts]
+        heaps: list[list[tuple[float, int]]] = [[] for _ in range(n_classes)]
+        feature_counts = self._feature_counts
+        for feature_id in range(len(feature_counts) // n_classes):
+            base = feature_id * n_classes
+            row = feature_counts[base:base + n_classes]
+            row_total = sum(row)
+            if not row_total:
+                continue
+            for clas, count in enumerate(row):
+                if log_in[clas] is None or log_out[clas] is None:
+                    continue
+                ratio = (_log(count + smoothing) - log_in[clas]) - (_log(row_total - count + smoothing) - log_out[clas])
+                heap = heaps[clas]
+                if len(heap) < k:
+                    heapq.heappush(heap, (ratio, feature_id))
+                elif ratio > heap[0][0]:
+                    heapq.heapreplace(heap, (ratio, feature_id))
+        return [[(ratio, self._vocabulary.feature(feature_id)) for ratio, feature_id in sorted(heap, reverse=True)]
+                for heap in heaps]
+
+    def log_priors(self) -> array:
+        """Returns the log of `proportions` as an `array("d")`."""
+        return array("d", (_log(proportion) for proportion in self.proportions()))
+
+    def scoring_table(self, smoothing: float = 0.0, model: str = "bernoulli") -> ScoringTable:
+        """Compiles the counts into the `ScoringTable` of an event model.
+
+        The "bernoulli" event model estimates the probability of a feature being present in a feature set of the
+        class, additively smoothed as (count + smoothing) / (class count + 2 * smoothing). The "multinomial" model
+        estimates the probability of a feature occurrence of the class being this feature, smoothed as
+        (count + smoothing) / (occurrences in the class + smoothing * number of counted features). Feature sets are
+        sets, so a feature occurs at most once per feature set: the counts are presence counts, not term frequencies,
+        and both models see the same counts, they only normalize them differently (see `_denominators`).
+
+        The "multinomial" table scores the features present in a feature set with their log probabilities. The
+        "bernoulli" table also accounts for every counted feature the feature set does not have, with the log of
+        1 - P(feature | class), at the cost of the present features only (see `ScoringTable`). The "gamma" table is
+        the unsmoothed Bernoulli probabilities of the present features only, which `NaiveBayesClassifier.gamma` has
+        always multiplied.
+
+        Each class's column only depends on that class's counts, its denominator (see `_denominators`) and
+        which features were counted at all. A weight only depends on the count of its feature, so each column is
+        built from the few distinct counts of the class rather than computing a weight per feature.
+
+        :param smoothing: additive smoothing alpha
+        :param model: event model, one of `EVENT_MODELS`, or "gamma"
+        :return: the table
+        """
+        counted = self._counted_rows()
+        columns = [self._column(clas, smoothing, model, counted) for clas in range(len(self._labels))]
+        return _assemble(self._vocabulary, columns, self.log_priors())
+
+    def updated_table(self, table: ScoringTable, smoothing: float, model: str, class_counts_before: array,
+                      new_rows: Sequence[int]) -> ScoringTable:
+        """Brings a table compiled by `scoring_table` up to date with counts added since, recompiling only what the
+        added counts changed.
+
+        A class that gained training feature sets has a new denominator, which changes every weight of its column,
+        so its column is recompiled. The column of any other class only changes in the rows of features that had
+        never been counted before, which all have a count of 0 in it; those rows get the weight of a count of 0 and
+        the bias moves by the new prior. Multinomial denominators also count the counted features, so with
+        smoothing a new feature recompiles every column.
+
+        :param table: the table compiled before the counts were added
+        :param smoothing: additive smoothing alpha the table was compiled with
+        :param model: event model the table was compiled for, as for `scoring_table`
+        :param class_counts_before: `class_counts` when the table was compiled
+        :param new_rows: ids of the features that were counted for the first time since (see `add`)
+        :return: the up to date table
+        """
+        n_classes = len(self._labels)
+        n_rows = len(self._feature_counts) // n_classes
+        rebuilt = {clas for clas, (before, after) in enumerate(zip(class_counts_before, self._class_counts))
+                   if before != after or not after}
+        if model == "multinomial" and smoothing and new_rows:
+            rebuilt = range(n_classes)
+        counted = self._counted_rows() if rebuilt else None
+        denominators = self._denominators(smoothing, model)
+        total_before, log_priors = sum(class_counts_before), self.log_priors()
+
+        columns = []
+        for clas in range(n_classes):
+            if clas in rebuilt:
+                columns.append(self._column(clas, smoothing, model, counted))
+                continue
+            column = array("d", table.columns[clas])  # may be a read-only view of a model file
+            column.frombytes(bytes(8 * (n_rows - len(column))))
+            weight, log_absent, _ = _weight(0, smoothing, denominators[clas], model)
+            for feature_id in new_rows:
+                column[feature_id] = weight
+            log_prior_before = _log(class_counts_before[clas] / total_before)
+            log_absent_sum = table.bias[clas] - log_prior_before + log_absent * len(new_rows)
+            certain = table.certain[clas] if table.certain is not None else array("i")
+            columns.append((column, log_absent_sum, certain))
+        return _assemble(self._vocabulary, columns, log_priors)
+
+    def _counted_rows(self) -> array:
+        """Whether each feature id was counted for any class, as an `array("b")` of 0s and 1s."""
+        n_classes = len(self._labels)
+        per_class = [self._feature_counts[clas::n_classes] for clas in range(n_classes)]
+        return array("b", map(bool, map(any, zip(*per_class))))
+
+    def _denominators(self, smoothing: float, model: str) -> list[float]:
+        """Per-class denominator of the probabilities of an event model (see `scoring_table`)."""
+        if model == "multinomial":
+            n_classes = len(self._labels)
+            n_counted = sum(self._counted_rows()) if smoothing else 0
+            return [sum(self._feature_counts[clas::n_classes]) + smoothing * n_counted for clas in range(n_classes)]
+        if model not in EVENT_MODELS and model != "gamma":
+            raise ValueError(f"unknown event model {model!r}, expected one of {EVENT_MODELS}")
+        return [class_count + 2 * smoothing for class_count in self._class_counts]
+
+    def _column(self, clas: int, smoothing: float, model: str, counted: array) -> tuple[array, float, array]:
+        """Compiles the column of one class: the weight of every feature id (0 for features that were never counted),
+        the sum of log(1 - P(feature | class)) over the counted features, and the ids of the features the class
+        cannot lack (see `ScoringTable`)."""
+        denominator = self._denominators(smoothing, model)[clas]
+        # the count of every feature, or -1 for features never counted, whose weight is 0
+        keys = list(map(sub, map(mul, map(add, self._feature_counts[clas::len(self._labels)], repeat(1)), counted),
+                        repeat(1)))
+        frequencies = Counter(keys)
+        weights = {key: _weight(key, smoothing, denominator, model) if key >= 0 else (0.0, 0.0, False)
+                   for key in frequencies}
+        column = array("d", map({key: weight for key, (weight, _, _) in weights.items()}.__getitem__, keys))
+        log_absent_sum = sum(weights[key][1] * frequency for key, frequency in frequencies.items())
+        certain_keys = {key for key, (_, _, certain) in weights.items() if certain}
+        certain = array("i", compress(range(len(keys)), map(certain_keys.__contains__, keys)) if certain_keys else ())
+        return column, log_absent_sum, certain
+
+    def _grow(self) -> None:
+        """Extends the count matrix with zero rows up to the current size of the vocabulary."""
+        missing = len(self._vocabulary) * len(self._labels) - len(self._feature_counts)
+        if missing > 0:
+            self._feature_counts.frombytes(bytes(8 * missing))
+
+
+class ScoringTable(NamedTuple):
+    """Compiled form of a naive Bayes model: the log gamma of a class for a feature set is its `bias` plus the weight
+    in the class's column of `columns` of every feature the feature set has, so scoring costs one lookup per class
+    and present feature whatever the size of the vocabulary.
+
+    The weights are stored column by column, so that scoring a class is a single `sum(map(column.__getitem__, ids))`
+    over the feature ids of a feature set, and a batch is scored one class at a time (see `_score_batch`).
+
+    For the "bernoulli" event model, the weight of a feature is log P(feature | class) - log(1 - P(feature | class))
+    and the bias is the log prior plus the sum of log(1 - P(feature | class)) over every feature, so that the absent
+    features are accounted for without being visited. A feature that every training feature set of a class has (only
+    possible without smoothing) cannot be absent from that class; such features are listed in `certain` instead, and
+    a feature set that lacks one of them rules the class out.
+
+    Attributes:
+        vocabulary (FeatureVocabulary): vocabulary whose feature ids index the columns
+        columns (tuple[array[float], ...]): for every class, the weight of every feature id
+        bias (array[float]): log gamma of each class for a feature set without any known feature
+        certain (tuple[array[int], ...] | None): for every class, the ids of the features it cannot lack, or None if
+            there are none
+    """
+
+    vocabulary: FeatureVocabulary
+    columns: tuple[array, ...]
+    bias: array
+    certain: tuple[array, ...] | None = None
+
+    @classmethod
+    def from_matrix(cls, vocabulary: FeatureVocabulary, weights: array, bias: array) -> ScoringTable:
+        """Builds a table from a flat, row-major matrix with one weight per class for every feature id."""
+        n_classes = len(bias)
+        return cls(vocabulary, tuple(weights[clas::n_classes] for clas in range(n_classes)), bias)
+
+    @classmethod
+    def bernoulli(cls, vocabulary: FeatureVocabulary, probability_rows: Iterable[list[float | None] | None],
+                  log_priors: array) -> ScoringTable:
+        """Builds the table of a Bernoulli model.
+
+        :param vocabulary: vocabulary whose feature ids index `probability_rows`
+        :param probability_rows: P(feature | class) for every class, for every feature id in order, with None for
+            classes without training feature sets and for the whole row of features that were never counted
+        :param log_priors: log prior of every class
+        :return: the table
+        """
+        n_classes = len(log_priors)
+        bias = list(log_priors)
+        certain = [array("i") for _ in range(n_classes)]
+        columns = [array("d") for _ in range(n_classes)]
+        for feature_id, probabilities in enumerate(probability_rows):
+            if probabilities is None:
+                for column in columns:
+                    column.append(0.0)
+                continue
+            for clas, probability in enumerate(probabilities):
+                if probability is None:  # the class's log prior already rules it out
+                    columns[clas].append(0.0)
+                elif probability >= 1.0:
+                    certain[clas].append(feature_id)
+                    columns[clas].append(0.0)
+                elif probability <= 0.0:
+                    columns[clas].append(-math.inf)
+                else:
+                    log_absent = math.log1p(-probability)
+                    bias[clas] += log_absent
+                    columns[clas].append(math.log(probability) - log_absent)
+        return cls(vocabulary, tuple(columns), array("d", bias), tuple(certain) if any(certain) else None)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+
+class PredictionCache:
+    """Bounded, least recently used cache of the per-class log gammas of feature set signatures.
+
+    The signature of a `CompactFeatureSet` in the model's own vocabulary is the sorted tuple of its feature ids; that
+    of any other feature set is the frozenset of its features, which reuses the hashes its set already holds rather
+    than looking every feature up in the vocabulary.
+
+    Attributes:
+        max_size (int): number of entries kept, the least recently used entry is evicted beyond it
+        hits (int): number of lookups answered from the cache since it was created
+        misses (int): number of lookups that were not
+    """
+
+    def __init__(self, max_size: int = 1 << 16):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, ...]] = OrderedDict()
+
+    def get(self, key: tuple) -> tuple[float, ...] | None:
+        """Returns the log gammas cached under `key` and marks them as recently used, or None if there are none."""
+        log_gammas = self._entries.get(key)
+        if log_gammas is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return log_gammas
+
+    def put(self, key: tuple, log_gammas: tuple[float, ...]) -> None:
+        self._entries[key] = log_gammas
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self, table_key: tuple = None) -> None:
+        """Drops every entry, or only the entries of one compiled table; the hit and miss statistics are kept.
+
+        :param table_key: first item of the keys to drop, e.g. the (smoothing, model) of a recompiled table
+        """
+        if table_key is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == table_key]:
+            del self._entries[key]
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Prediction(NamedTuple):
+    """Compact result of classifying a single feature set.
+
+    Attributes:
+        index (int): position of the predicted class in the classifier's class order
+        label (str): name of the predicted class
+        log_score (float): natural log of the predicted class's (unnormalized) score
+        posteriors (tuple[float, ...] | None): normalized probability of every class, if requested
+    """
+
+    index: int
+    label: str
+    log_score: float
+    posteriors: tuple[float, ...] | None = None
+
+
+class NaiveBayesClassifier(AbstractClassifier):
+    """Naive Bayes classifier over any number of classes, driven by a label -> index map.
+
+    Training accumulates per-class counts in a `CountTable`, so the cost of each training feature set is one class
+    index lookup plus one array increment per feature, whatever the number of classes. The counts are kept, so that
+    the classifier can keep learning (`partial_fit`) and be combined with classifiers trained on other shards
+    (`merge`). Probabilities and the log-probability matrix used for scoring are derived from them lazily.
+
+    A classifier can also be built directly from a probability dict, in which case it cannot be updated.
+
+    Attributes:
+        LABELS (list[str]): default classes of the subclass, used when `train` is not given any
+        CACHE_SIZE (int): default size of the prediction cache, 0 to score every feature set from scratch (see
+            `use_prediction_cache`)
+        FILE_MAGIC (bytes): first bytes of a file written by `save`, which `load` checks
+        labels (list[str]): names of the classes, in the order of every per-class list and matrix row
+        counts (CountTable | None): raw training counts
+        smoothing (float): additive (Laplace) smoothing alpha used by `predict` and `predict_many`
+        model (str): event model used by `predict` and `predict_many`, one of `EVENT_MODELS`
+        prediction_cache (PredictionCache | None): log gammas of recently scored feature set signatures, cleared
+            whenever the model changes, None when disabled
+        feature_config (str | None): identifies how the training feature sets were built, saved with the model so
+            that feature sets built another way can be refused (see `check_feature_config`), None if unknown
+    """
+
+    LABELS: list[str] = []
+    CACHE_SIZE: int = 0
+    FILE_MAGIC: bytes = b"NBCF"
+
+    def __init__(self, probability_dict: dict = None, proportions_list: list = None, class_tallies: list = None,
+                 smoothing: float = 1.0, counts: CountTable = None, model: str = "bernoulli",
+                 labels: list[str] = None):
+        if model not in EVENT_MODELS:
+            raise ValueError(f"unknown event model {model!r}, expected one of {EVENT_MODELS}")
+        self._probability_dict = probability_dict
+        self._proportions_list = proportions_list
+        self._class_tallies = class_tallies  # training feature sets per class, needed to smooth `probability_dict`
+        self.counts = counts  # raw training counts, when present the three attributes above are derived from them
+        self.labels = list(labels if labels is not None else counts.labels if counts is not None else self.LABELS)
+        self.smoothing = smoothing
+        self.model = model
+        self._log_tables = {}  # (smoothing, model) -> (vocabulary, log-probability matrix, log priors), see `compile`
+        self.prediction_cache = PredictionCache(self.CACHE_SIZE) if self.CACHE_SIZE else None
+        self.feature_config: str | None = None
+
+    def use_prediction_cache(self, max_size: int = 1 << 16) -> NaiveBayesClassifier:
+        """Caches the log gammas of the `max_size` most recently scored feature set signatures, or disables the cache
+        if `max_size` is 0. Every score then also pays for building the signature of its feature set, so the cache
+        only pays off when the same feature sets come back often, e.g. repeated questions without text features.
+
+        :param max_size: number of signatures to keep
+        :return: this classifier
+        """
+        self.prediction_cache = PredictionCache(max_size) if max_size else None
+        return self
+
+    @classmethod
+    def from_counts(cls, counts: CountTable, smoothing: float = 1.0, model: str = "bernoulli") -> NaiveBayesClassifier:
+        """Builds a classifier from raw training counts, which it keeps so that it can keep learning through
+        `partial_fit` and `merge`.
+
+        :param counts: per-class training counts, whose labels become the classifier's classes
+        :param smoothing: additive smoothing alpha used by `predict` and `predict_many`
+        :param model: event model used by `predict` and `predict_many`
+        :return: the classifier
+        """
+        return cls(smoothing=smoothing, counts=counts, model=model)
+
+    @classmethod
+    def train(cls, training_set: Iterable[FeatureSet], smoothing: float = 1.0, vocabulary: FeatureVocabulary = None,
+              labels: Iterable[str] = None, model: str = "bernoulli") -> NaiveBayesClassifier:
+        """Method that builds a Classifier instance with its training (supervised learning) already completed. That is,
+        the `AbstractClassifier` instance returned as the result of invoking this method must support `gamma` and
+        `present_features` method calls immediately without needing any other method invocations prior to them.
+
+        :param training_set: An iterable collection of `FeatureSet` to use for training the classifier, whose
+            classifications must be known. It is only iterated once, so it may be a generator.
+        :param smoothing: additive smoothing alpha used by `predict` and `predict_many`
+        :param vocabulary: vocabulary to count the features in, e.g. the one shared by compact training feature sets
+        :param labels: names of the classes, defaults to the class's `LABELS`
+        :param model: event model used by `predict` and `predict_many`, one of `EVENT_MODELS`
+        :return: an instance of `AbstractClassifier` with its training already completed
+        """
+        labels = list(labels if labels is not None else cls.LABELS)
+        if not labels:
+            raise ValueError(f"{cls.__name__}.train needs the labels of the classes")
+        with current_profiler().stage("train") as stage:
+            counts = CountTable(labels, vocabulary).add_all(training_set)
+            stage.add(int(sum(counts.class_counts)))
+        return cls.from_counts(counts, smoothing, model)
+
+    @property
+    def probability_dict(self) -> dict:
+        if self._probability_dict is None:
+            with current_profiler().stage("probability_dict"):
+                self._probability_dict = self.counts.probability_dict()
+        return self._probability_dict
+
+    @property
+    def proportions_list(self) -> list:
+        if self._proportions_list is None:
+            self._proportions_list = self.counts.proportions()
+        return self._proportions_list
+
+    @property
+    def class_tallies(self) -> list:
+        if self._class_tallies is None and self.counts is not None:
+            self._class_tallies = self.counts.class_counts.tolist()
+        return self._class_tallies
+
+    def get_probability_dict(self) -> dict:
+        return self.probability_dict
+
+    def get_proportions_list(self) -> list:
+        return self.proportions_list
+
+    def partial_fit(self, feature_sets: Iterable[FeatureSet]) -> NaiveBayesClassifier:
+        """Updates the training counts with more labeled feature sets, at a cost proportional to their number of
+        features. Every compiled table is brought up to date with `CountTable.updated_table`, which only recompiles
+        the columns of the classes the feature sets belong to; the probabilities are recomputed lazily.
+
+        :param feature_sets: additional training feature sets, whose classifications must be among `labels` (a
+            ValueError is raised otherwise)
+        :return: this classifier
+        """
+        counts = self._require_counts().detach()
+        class_counts_before = array("q", counts.class_counts)
+        new_rows = []
+        with current_profiler().stage("partial_fit") as stage:
+            counts.add_all(feature_sets, new_rows=new_rows)
+            stage.add(int(sum(counts.class_counts) - sum(class_counts_before)))
+        tables = self._log_tables
+        self._invalidate()
+        with current_profiler().stage("compile"):
+            self._log_tables = {key: counts.updated_table(table, *key, class_counts_before, new_rows)
+                                for key, table in tables.items()}
+        return self
+
+    def merge(self, other: NaiveBayesClassifier) -> NaiveBayesClassifier:
+        """Adds the training counts of a classifier trained on another shard of the data to this classifier, so that
+        it becomes the classifier that would have been trained on both shards.
+
+        :param other: a classifier built with counts, e.g. by `train` in another worker process
+        :return: this classifier
+        """
+        with current_profiler().stage("merge"):
+            self._require_counts().detach().merge(other._require_counts())
+        self._invalidate()
+        return self
+
+    def save(self, file_path: str) -> None:
+        """Writes the classifier to a compact binary file that `load` can memory-map.
+
+        The file (see `section_file`) holds a small JSON header with the classes, the smoothing, the event model and
+        the `feature_config`, followed by raw sections with the vocabulary (see `mapped_vocabulary`), the class
+        counts, the feature count matrix, and the `ScoringTable` compiled with `smoothing`. Feature values must be one
+        of `mapped_vocabulary.VALUE_TYPES`, a TypeError is raised otherwise.
+
+        :param file_path: path of the file to write
+        """
+        counts = self._require_counts()
+        vocabulary, columns, bias, certain = self._table(self.smoothing, self.model)
+        n_rows = len(counts.feature_counts) // len(counts.labels)
+        certain = certain or [array("i") for _ in counts.labels]
+        weights = array("d")
+        for column in columns:
+            weights.extend(column[:n_rows])
+        header = {
+            "labels": counts.labels,
+            "smoothing": self.smoothing,
+            "model": self.model,
+            "feature_config": self.feature_config,
+        }
+        write_sections(file_path, self.FILE_MAGIC, MODEL_FORMAT_VERSION, header, {
+            **vocabulary_sections(islice(vocabulary, n_rows)),
+            "class_counts": counts.class_counts,
+            "feature_counts": counts.feature_counts,
+            "weights": weights,
+            "bias": bias,
+            "certain_offsets": array("q", accumulate(map(len, certain), initial=0)),
+            "certain": array("i", chain.from_iterable(certain)),
+        })
+
+    @classmethod
+    def load(cls, file_path: str, memory_map: bool = True) -> NaiveBayesClassifier:
+        """Reads a classifier written by `save`.
+
+        By default the sections are not read at all but memory-mapped read-only, so loading only costs parsing the
+        header and every process that loads the same file shares one copy of the model's pages. The vocabulary is a
+        `MappedVocabulary`, which decodes features as they are used. The counts are copied into private memory the
+        first time the classifier is updated with `partial_fit` or `merge`.
+
+        :param file_path: path of the file to read
+        :param memory_map: whether to memory-map the numeric sections instead of reading them into memory
+        :return: the classifier
+        """
+        header, sections = read_sections(file_path, cls.FILE_MAGIC, MODEL_FORMAT_VERSION, memory_map)
+        vocabulary = MappedVocabulary.from_sections(sections)
+        counts = CountTable(header["labels"], vocabulary, sections["feature_counts"], sections["class_counts"])
+        classifier = cls.from_counts(counts, header["smoothing"], header.get("model", "bernoulli"))
+        classifier.feature_config = header.get("feature_config")
+        n_rows, weights, offsets = len(vocabulary), sections["weights"], sections["certain_offsets"]
+        columns = tuple(weights[clas * n_rows:(clas + 1) * n_rows] for clas in range(len(counts.labels)))
+        certain = tuple(sections["certain"][offsets[clas]:offsets[clas + 1]] for clas in range(len(offsets) - 1))
+        classifier._log_tables[classifier.smoothing, classifier.model] = ScoringTable(
+            vocabulary, columns, sections["bias"], certain if offsets[-1] else None)
+        return classifier
+
+    def check_feature_config(self, feature_config: str) -> None:
+        """Raises a ValueError unless the feature sets to be scored, built as `feature_config` describes, are built
+        the way the training feature sets were. A classifier whose `feature_config` is unknown accepts any.
+
+        :param feature_config: identifies how the feature sets to be scored are built
+        """
+        if self.feature_config is not None and feature_config != self.feature_config:
+            raise ValueError(f"the classifier was trained on features built by {self.feature_config}, "
+                             f"not {feature_config}")
+
+    def present_features(self, top_n: int = 1, smoothing: float = None) -> dict[str, list[tuple[Feature, float]]]:
+        """Returns, for every class, the `top_n` features that are most predictive of it, best first, as ranked by
+        `CountTable.top_features`: by how much more likely a feature set of the class is to have the feature than a
+        feature set of any other class, in log-likelihood ratio.
+
+        Classifiers built from a probability dict rank from the counts implied by `probability_dict` and
+        `class_tallies`.
+
+        :param top_n: how many of the top features to return per class; must be 1 or greater
+        :param smoothing: additive smoothing alpha of the ratios, defaults to the classifier's `smoothing` (or 1.0 if
+            that is 0, as unsmoothed ratios are infinite for every feature seen with a single class)
+        :return: the top features of every class and their log-likelihood ratios, by class name
+        """
+        if top_n < 1:
+            raise ValueError(f"top_n must be 1 or greater, not {top_n}")
+        if smoothing is None:
+            smoothing = self.smoothing or 1.0
+        with current_profiler().stage("present_features"):
+            ranked = (self.counts if self.counts is not None else self._implied_counts()).top_features(top_n, smoothing)
+
+        return {label: [(feature, ratio) for ratio, feature in features]
+                for label, features in zip(self.labels, ranked)}
+
+    def _implied_counts(self) -> CountTable:
+        """Training counts implied by `probability_dict` and `class_tallies`, for classifiers built without counts."""
+        if self.class_tallies is None:
+            raise ValueError(f"this {type(self).__name__} has neither training counts nor class tallies")
+        feature_counts = array("q", (round(probability * tally) for probabilities in self.probability_dict.values()
+                                     for probability, tally in zip(probabilities, self.class_tallies)))
+        return CountTable(self.labels, FeatureVocabulary(self.probability_dict), feature_counts,
+                          array("q", (round(tally) for tally in self.class_tallies)))
+
+    def _require_counts(self) -> CountTable:
+        if self.counts is None:
+            raise ValueError(f"this {type(self).__name__} was built from probabilities and has no training counts")
+        return self.counts
+
+    def _invalidate(self) -> None:
+        """Drops everything derived from the training counts after they change."""
+        self._probability_dict = self._proportions_list = self._class_tallies = None
+        self._log_tables = {}
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+
+    def compile(self, smoothing: float = 0.0, model: str = None) -> ScoringTable:
+        """Precompiles the model into the `ScoringTable` used by the log-space scoring methods.
+
+        Classifiers with training counts compile `CountTable.scoring_table` for the event model. Classifiers built
+        from a probability dict compile its Bernoulli probabilities; with a non-zero `smoothing` alpha and
+        `class_tallies`, each probability p of a class with n training feature sets becomes
+        (p * n + alpha) / (n + 2 * alpha), so a feature never seen with a class no longer rules that class out. Their
+        "multinomial" tables are compiled from the counts implied by `probability_dict` and `class_tallies`.
+
+        This is done lazily on the first scoring call; call it again if `probability_dict` is modified afterwards.
+        Compiling also drops the table of `gamma` and `gamma_batch`, which is then rebuilt on their next call.
+
+        :param smoothing: additive smoothing alpha
+        :param model: event model, one of `EVENT_MODELS`, defaults to the classifier's `model`
+        :return: the compiled table
+        """
+        if model is None:
+            model = self.model
+        if model not in EVENT_MODELS:
+            raise ValueError(f"unknown event model {model!r}, expected one of {EVENT_MODELS}")
+        self._log_tables.pop(_GAMMA_TABLE, None)
+        if self.prediction_cache is not None:  # they may have been computed from an older table
+            for table_key in ((smoothing, model), _GAMMA_TABLE, "gamma"):  # "gamma": `JeopardyClassifier.gamma`
+                self.prediction_cache.clear(table_key)
+        with current_profiler().stage("compile"):
+            self._log_tables[smoothing, model] = table = self._compile(smoothing, model)
+        return table
+
+    def _table(self, smoothing: float, model: str) -> ScoringTable:
+        """The compiled table of a smoothing alpha and event model, compiling it on first use."""
+        return self._log_tables.get((smoothing, model)) or self.compile(smoothing, model)
+
+    def _compile(self, smoothing: float, model: str) -> ScoringTable:
+        """Uninstrumented `compile`."""
+        counts = self.counts
+        if counts is None and model != "bernoulli":
+            counts = self._implied_counts()
+        if counts is not None:
+            return counts.scoring_table(smoothing, model)
+
+        tallies = self.class_tallies if smoothing and self.class_tallies else None
+        rows = (probabilities if tallies is None else
+                [(probability * tally + smoothing) / (tally + 2 * smoothing)
+                 for probability, tally in zip(probabilities, tallies)]
+                for probabilities in self.probability_dict.values())
+        log_priors = array("d", (_log(proportion) for proportion in self.proportions_list))
+        return ScoringTable.bernoulli(FeatureVocabulary(self.probability_dict), rows, log_priors)
+
+    def _gamma_table(self) -> ScoringTable:
+        """The table `gamma` scores with: the unsmoothed log probabilities of the features present in a feature set
+        on top of the log priors, whatever the event model, as in the probability products `gamma` has always used.
+        """
+        table = self._log_tables.get(_GAMMA_TABLE)
+        if table is None:
+            with current_profiler().stage("compile"):
+                if self.counts is not None:
+                    table = self.counts.scoring_table(*_GAMMA_TABLE)
+                else:
+                    table = ScoringTable.from_matrix(
+                        FeatureVocabulary(self.probability_dict),
+                        array("d", (_log(probability) for probabilities in self.probability_dict.values()
+                                    for probability in probabilities)),
+                        array("d", (_log(proportion) for proportion in self.proportions_list)))
+            self._log_tables[_GAMMA_TABLE] = table
+        return table
+
+    def log_gammas(self, a_feature_set: FeatureSet, smoothing: float = None) -> list[float]:
+        """Returns the log gamma of every class for a single feature set, in the order of `labels`.
+
+        :param a_feature_set: a single feature set representing an object to be classified
+        :param smoothing: smoothing alpha to score with, defaults to the classifier's `smoothing`
+        :return: one log gamma per class
+        """
+        if smoothing is None:
+            smoothing = self.smoothing
+        table = self._table(smoothing, self.model)
+        return list(self._cached_log_gammas(a_feature_set, (smoothing, self.model), table))
+
+    def gamma(self, a_feature_set: FeatureSet) -> str:
+        """Given a single feature set representing an object to be classified, returns the most probable class
+        for the object based on the training this classifier received (via a call to `train` class method).
+
+        :param a_feature_set: a single feature set representing an object to be classified
+        :return: name of the class with the highest (unsmoothed) probability for the object
+        """
+        log_gammas = self._cached_log_gammas(a_feature_set, _GAMMA_TABLE, self._gamma_table())
+        return self.labels[_argmax(log_gammas)]
+
+    def gamma_batch(self, feature_sets: Iterable[FeatureSet]) -> tuple[list[str], array]:
+        """Batch version of `gamma`. Scores the whole batch against a precompiled table of log probabilities one
+        class at a time, by summing the log probabilities of each feature set's known features onto the class's log
+        prior (see `_score_batch`).
+
+        :param feature_sets: feature sets representing the objects to be classified
+        :return: the most probable class of each feature set, and the matching log gamma values as an `array("d")`
+        """
+        table = self._gamma_table()
+
+        labels = []
+        scores = array("d")
+        profiler = current_profiler()
+        with profiler.stage("gamma_batch") as stage:
+            for log_gammas in self._batch_log_gammas(feature_sets, _GAMMA_TABLE, table):
+                best = _argmax(log_gammas)
+                labels.append(self.labels[best])
+                scores.append(log_gammas[best])
+            stage.add(len(labels))
+        self._report_cache(profiler)
+        return labels, scores
+
+    def predict(self, a_feature_set: FeatureSet, posteriors: bool = False) -> Prediction:
+        """Smoothed, log-space counterpart of `gamma` that returns a `Prediction`.
+
+        :param a_feature_set: a single feature set representing an object to be classified
+        :param posteriors: whether to also compute the normalized posterior probability of every class
+        :return: the prediction for the feature set
+        """
+        key = (self.smoothing, self.model)
+        table = self._table(*key)
+        return _prediction(self._cached_log_gammas(a_feature_set, key, table), posteriors, self.labels)
+
+    def predict_many(self, feature_sets: Iterable[FeatureSet], posteriors: bool = False) -> list[Prediction]:
+        """Returns the `predict` result for each of the given feature sets, compiling the model only once.
+
+        :param feature_sets: feature sets representing the objects to be classified
+        :param posteriors: whether to also compute the normalized posterior probability of every class
+        :return: one prediction per feature set, in the order of `feature_sets`
+        """
+        key = (self.smoothing, self.model)
+        table = self._table(*key)
+        profiler = current_profiler()
+        with profiler.stage("predict_many") as stage:
+            predictions = [_prediction(log_gammas, posteriors, self.labels)
+                           for log_gammas in self._batch_log_gammas(feature_sets, key, table)]
+            stage.add(len(predictions))
+        self._report_cache(profiler)
+        return predictions
+
+    def _cached_log_gammas(self, a_feature_set: FeatureSet, table_key: tuple[float, str],
+                           table: ScoringTable) -> tuple[float, ...]:
+        """Log gammas of a feature set, from the prediction cache when its signature was scored recently."""
+        cache = self.prediction_cache
+        if cache is not None:
+            key = (table_key, _cache_signature(a_feature_set, table.vocabulary))
+            log_gammas = cache.get(key)
+            if log_gammas is not None:
+                return log_gammas
+        log_gammas = _score(_rows(a_feature_set, table.vocabulary, table.n_rows), table)
+        if cache is not None:
+            cache.put(key, log_gammas)
+        return log_gammas
+
+    def _batch_log_gammas(self, feature_sets: Iterable[FeatureSet], table_key: tuple[float, str],
+                          table: ScoringTable) -> list[tuple[float, ...]]:
+        """Log gammas of a batch of feature sets, from the prediction cache for the signatures it holds and from
+        `_score_batch` for all the others, each distinct signature of the batch being scored only once."""
+        feature_sets = list(feature_sets)
+        vocabulary, n_rows, cache = table.vocabulary, table.n_rows, self.prediction_cache
+        if cache is None:
+            return _score_batch([_rows(feature_set, vocabulary, n_rows) for feature_set in feature_sets], table)
+
+        keys = [(table_key, _cache_signature(feature_set, vocabulary)) for feature_set in feature_sets]
+        first = {}  # index of the first feature set of every distinct signature
+        for index, key in enumerate(keys):
+            first.setdefault(key, index)
+        cache.hits += len(keys) - len(first)  # repeats within the batch are answered like cache hits
+        log_gammas = {key: cache.get(key) for key in first}
+        missing = [key for key, cached in log_gammas.items() if cached is None]
+        scored = _score_batch([_rows(feature_sets[first[key]], vocabulary, n_rows) for key in missing], table)
+        for key, scores in zip(missing, scored):
+            log_gammas[key] = scores
+            cache.put(key, scores)
+        return [log_gammas[key] for key in keys]
+
+    def _report_cache(self, profiler: Profiler) -> None:
+        if self.prediction_cache is not None:
+            profiler.cache("predictions", self.prediction_cache.hits, self.prediction_cache.misses)
+
+
+def _log(probability: float) -> float:
+    """Natural log that maps a probability of zero to negative infinity instead of raising."""
+    return math.log(probability) if probability > 0 else -math.inf
+
+
+def _weight(count: int, smoothing: float, denominator: float, model: str) -> tuple[float, float, bool]:
+    """Weight in a class's column of a feature counted `count` times in the class, the log(1 - P(feature | class))
+    it adds to the class's bias, and whether the class cannot lack the feature (see `ScoringTable`)."""
+    if model != "bernoulli":
+        return _log((count + smoothing) / denominator) if denominator else -math.inf, 0.0, False
+    if not denominator:  # the class's log prior already rules it out
+        return 0.0, 0.0, False
+    probability = (count + smoothing) / denominator
+    if probability >= 1.0:
+        return 0.0, 0.0, True
+    if probability <= 0.0:
+        return -math.inf, 0.0, False
+    log_absent = math.log1p(-probability)
+    return math.log(probability) - log_absent, log_absent, False
+
+
+def _assemble(vocabulary: FeatureVocabulary, columns: list[tuple[array, float, array]],
+              log_priors: array) -> ScoringTable:
+    """Builds a `ScoringTable` from the compiled column, sum of log(1 - P(feature | class)) and certain features of
+    every class (see `CountTable._column`)."""
+    certain = tuple(certain for _, _, certain in columns)
+    return ScoringTable(vocabulary, tuple(column for column, _, _ in columns),
+                        array("d", (log_prior + log_absent_sum for log_prior, (_, log_absent_sum, _)
+                                    in zip(log_priors, columns))),
+                        certain if any(certain) else None)
+
+
+def _cache_signature(a_feature_set: FeatureSet, vocabulary: FeatureVocabulary) -> tuple[int, ...] | frozenset:
+    """Hashable signature of `a_feature_set` that keys the `PredictionCache` of a model using `vocabulary`."""
+    if isinstance(a_feature_set, CompactFeatureSet) and a_feature_set.vocabulary is vocabulary:
+        return tuple(a_feature_set.ids)  # sorted, so equal sets have equal signatures
+    return frozenset(a_feature_set.feat)
+
+
+def _rows(a_feature_set: FeatureSet, vocabulary: FeatureVocabulary, n_rows: int) -> Sequence[int]:
+    """Ids of the features of `a_feature_set` that are among the first `n_rows` of `vocabulary`."""
+    if isinstance(a_feature_set, CompactFeatureSet) and a_feature_set.vocabulary is vocabulary:
+        ids = a_feature_set.ids  # already row numbers, no need to hash the features
+        return ids if not ids or ids[-1] < n_rows else [row for row in ids if row < n_rows]
+    get_id = vocabulary.get_id
+    return [row for row in map(get_id, a_feature_set.feat) if row is not None and row < n_rows]
+
+
+def _score(rows: Sequence[int], table: ScoringTable) -> tuple[float, ...]:
+    """Sums the weights of the given rows onto the bias of every class, ruling out every class with a certain feature
+    that is not among the rows."""
+    log_gammas = tuple(bias + sum(map(column.__getitem__, rows)) for bias, column in zip(table.bias, table.columns))
+    return log_gammas if table.certain is None else _rule_out(log_gammas, rows, table.certain)
+
+
+def _score_batch(batch_rows: list[Sequence[int]], table: ScoringTable) -> list[tuple[float, ...]]:
+    """`_score` of every row list of a batch. Makes one pass over the whole batch per class, so the only Python
+    level work per feature set and class is one `sum(map(...))` over its rows, with no per-row tuple or slice."""
+    per_class = [[bias + sum(map(lookup, rows)) for rows in batch_rows]
+                 for bias, lookup in zip(table.bias, (column.__getitem__ for column in table.columns))]
+    log_gammas = list(zip(*per_class))
+    if table.certain is not None:
+        log_gammas = [_rule_out(scores, rows, table.certain) for scores, rows in zip(log_gammas, batch_rows)]
+    return log_gammas
+
+
+def _rule_out(log_gammas: tuple[float, ...], rows: Sequence[int], certain: tuple[array, ...]) -> tuple[float, ...]:
+    """Sets the log gamma of every class with a certain feature that is not among the rows to negative infinity."""
+    present = set(rows)
+    return tuple(log_gamma if all(row in present for row in certain_rows) else -math.inf
+                 for log_gamma, certain_rows in zip(log_gammas, certain))
+
+
+def _argmax(log_gammas: list[float]) -> int:
+    """Index of the highest log gamma; ties, within `TIE_TOLERANCE`, go to the earlier class."""
+    top = max(log_gammas)
+    return next(index for index, log_gamma in enumerate(log_gammas) if log_gamma >= top - TIE_TOLERANCE)
+
+
+def _prediction(log_gammas: list[float], posteriors: bool, labels: list[str]) -> Prediction:
+    """Builds a `Prediction` from per-class log gammas, normalizing them into posteriors if requested."""
+    best = _argmax(log_gammas)
+    normalized = None
+    if posteriors:
+        top = log_gammas[best]
+        if top == -math.inf:  # every class was ruled out, nothing to prefer
+            normalized = tuple(1 / len(log_gammas) for _ in log_gammas)
+        else:
+            weights = [math.exp(log_gamma - top) for log_gamma in log_gammas]
+            total = sum(weights)
+            normalized = tuple(weight / total for weight in weights)
+    return Prediction(best, labels[best], log_gammas[best], normalized)
@@ -0,0 +1,204 @@
+"""Opt-in, per-stage instrumentation of the classifier pipeline: wall time, call and item counts, throughput, peak
+memory, counters and cache hit rates, exportable as JSON.
+
+Instrumented code asks `current_profiler()` for the active profiler and reports to it; unless a `Profiler` is active
+that is a shared no-op profiler, so instrumentation costs one context variable lookup per instrumented call.
+
+    with Profiler(trace_memory=True) as profiler:
+        classifier = JeopardyClassifier.train(feature_sets)
+        classifier.predict_many(test_sets)
+    profiler.save("profile.json")
+"""
+from __future__ import annotations
+from contextvars import ContextVar
+import json
+import resource
+import time
+import tracemalloc
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class StageStats:
+    """Accumulated measurements of every run of one stage.
+
+    Attributes:
+        calls (int): number of times the stage ran
+        items (int): number of items (questions, feature sets...) processed over all runs
+        seconds (float): total wall time over all runs
+        peak_kb (int | None): highest Python allocation peak of a run, when memory is traced
+    """
+
+    __slots__ = ("calls", "items", "seconds", "peak_kb")
+
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+        self.seconds = 0.0
+        self.peak_kb = None
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "items": self.items, "seconds": self.seconds,
+                "items_per_second": self.items / self.seconds if self.items and self.seconds else None,
+                "peak_traced_kb": self.peak_kb}
+
+
+class Profiler:
+    """Collects per-stage measurements while it is active, i.e. inside its `with` block.
+
+    Attributes:
+        trace_memory (bool): whether to measure the peak Python allocations of every stage with tracemalloc, which
+            slows everything down noticeably
+        stages (dict[str, StageStats]): measurements of every stage, in the order the stages first ran
+        counters (dict[str, int]): named event counts
+        caches (dict[str, tuple[int, int]]): latest (hits, misses) reported by every cache
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: dict[str, StageStats] = {}
+        self.counters: dict[str, int] = {}
+        self.caches: dict[str, tuple[int, int]] = {}
+        self._open_stages: list[_Stage] = []
+        self._tokens = []
+        self._started_tracing = False
+
+    def __enter__(self) -> Profiler:
+        self._tokens.append(_active_profiler.set(self))
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active_profiler.reset(self._tokens.pop())
+        if self._started_tracing and not self._tokens:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def stage(self, name: str, items: int = 0) -> _Stage:
+        """Returns a context manager that measures one run of the stage `name`. Items processed by the run can be
+        given upfront or added inside the `with` block, e.g. `with profiler.stage("train") as stage: stage.add(n)`.
+        """
+        return _Stage(self, name, items)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Adds `n` to the counter `name`."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def cache(self, name: str, hits: int, misses: int) -> None:
+        """Records the current hit and miss totals of the cache `name`, replacing earlier totals."""
+        self.caches[name] = (hits, misses)
+
+    def to_dict(self) -> dict:
+        """Returns every measurement as plain, JSON serializable data."""
+        return {
+            "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+            "counters": dict(self.counters),
+            "caches": {name: {"hits": hits, "misses": misses,
+                              "hit_rate": hits / (hits + misses) if hits + misses else None}
+                       for name, (hits, misses) in self.caches.items()},
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def save(self, file_path: str) -> None:
+        """Writes `to_dict` to `file_path` as JSON."""
+        with open(file_path, 'w') as file:
+            file.write(self.to_json())
+
+    def __str__(self) -> str:
+        lines = [f"{'stage':<28}{'calls':>8}{'items':>12}{'seconds':>10}{'items/s':>12}"]
+        for name, stats in self.stages.items():
+            rate = stats.to_dict()["items_per_second"]
+            lines.append(f"{name:<28}{stats.calls:>8}{stats.items:>12}{stats.seconds:>10.3f}"
+                         f"{rate or 0:>12.0f}" + (f"  peak {stats.peak_kb} KB" if stats.peak_kb is not None else ""))
+        lines.extend(f"{name}: {count}" for name, count in self.counters.items())
+        lines.extend(f"{name}: {hits} hits, {misses} misses" for name, (hits, misses) in self.caches.items())
+        return "\n".join(lines)
+
+
+class NullProfiler(Profiler):
+    """Profiler that records nothing, active whenever no other profiler is."""
+
+    enabled = False
+
+    def stage(self, name: str, items: int = 0) -> _NullStage:
+        return _NULL_STAGE
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+    def cache(self, name: str, hits: int, misses: int) -> None:
+        pass
+
+
+class _Stage:
+    """One run of a stage; see `Profiler.stage`."""
+
+    __slots__ = ("_profiler", "_name", "_items", "_start", "_peak")
+
+    def __init__(self, profiler: Profiler, name: str, items: int):
+        self._profiler = profiler
+        self._name = name
+        self._items = items
+        self._peak = 0
+
+    def add(self, items: int) -> None:
+        self._items += items
+
+    def __enter__(self) -> _Stage:
+        if self._profiler.trace_memory and tracemalloc.is_tracing():
+            open_stages = self._profiler._open_stages
+            peak = tracemalloc.get_traced_memory()[1]
+            for stage in open_stages:  # keep the enclosing stages' peaks before restarting the peak for this one
+                stage._peak = max(stage._peak, peak)
+            tracemalloc.reset_peak()
+            open_stages.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        seconds = time.perf_counter() - self._start
+        stats = self._profiler.stages.get(self._name) or self._profiler.stages.setdefault(self._name, StageStats())
+        stats.calls += 1
+        stats.items += self._items
+        stats.seconds += seconds
+        if self in self._profiler._open_stages:
+            self._profiler._open_stages.remove(self)
+            peak_kb = max(self._peak, tracemalloc.get_traced_memory()[1]) // 1024
+            stats.peak_kb = max(stats.peak_kb or 0, peak_kb)
+
+
+class _NullStage:
+    """Stage of the `NullProfiler`, which measures nothing."""
+
+    __slots__ = ()
+
+    def add(self, items: int) -> None:
+        pass
+
+    def __enter__(self) -> _NullStage:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+NULL_PROFILER = NullProfiler()
+_active_profiler: ContextVar[Profiler] = ContextVar("active_profiler", default=NULL_PROFILER)
+
+
+def current_profiler() -> Profiler:
+    """Returns the innermost active `Profiler`, or the no-op `NULL_PROFILER` if there is none."""
+    return _active_profiler.get()
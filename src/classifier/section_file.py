@@ -0,0 +1,79 @@
+"""Binary file format shared by the saved models, feature caches and columnar datasets: a JSON header followed by
+8-byte aligned sections of raw native numbers, which can be memory-mapped and read without copying.
+"""
+from array import array
+from typing import Any
+import json
+import mmap
+import struct
+import sys
+
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+_PREFIX = struct.Struct("<4sIQ")  # magic, format version, byte length of the JSON header
+
+
+def write_sections(file_path: str, magic: bytes, version: int, header: dict, sections: dict[str, Any]) -> None:
+    """Writes a section file.
+
+    :param file_path: path of the file to write
+    :param magic: four bytes identifying the kind of file
+    :param version: format version of the file
+    :param header: JSON serializable metadata stored with the sections
+    :param sections: numeric sections by name, as arrays or memoryviews of a single typecode
+    """
+    layout = {}
+    position = 0
+    for name, values in sections.items():
+        values = memoryview(values)
+        layout[name] = [values.format, position, len(values)]
+        position += values.nbytes
+        position += -position % 8
+    header = json.dumps({**header, "byteorder": sys.byteorder, "sections": layout}).encode()
+
+    with open(file_path, 'wb') as file:
+        file.write(_PREFIX.pack(magic, version, len(header)))
+        file.write(header)
+        for values in sections.values():
+            file.write(bytes(-file.tell() % 8))  # align every section
+            file.write(memoryview(values).cast("B"))
+
+
+def read_sections(file_path: str, magic: bytes, version: int, memory_map: bool = True) -> tuple[dict, dict[str, Any]]:
+    """Reads a section file written by `write_sections`.
+
+    When `memory_map` is set, the sections are read-only memoryviews of a memory mapping of the file, so reading them
+    costs nothing up front and every process that maps the same file shares one copy of its pages. Otherwise they
+    are private arrays.
+
+    :param file_path: path of the file to read
+    :param magic: four bytes the file must start with
+    :param version: format version the file must have
+    :param memory_map: whether to memory-map the sections instead of reading them into memory
+    :return: the header and the sections by name
+    """
+    with open(file_path, 'rb') as file:
+        file_magic, file_version, header_length = _PREFIX.unpack(file.read(_PREFIX.size))
+        if file_magic != magic or file_version != version:
+            raise ValueError(f"{file_path} is not a version {version} {magic.decode()} file")
+        header = json.loads(file.read(header_length))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{file_path} was written on a {header['byteorder']} endian machine")
+        data_start = _PREFIX.size + header_length
+        data_start += -data_start % 8
+        if memory_map:
+            data = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))[data_start:]
+        else:
+            file.seek(data_start)
+            data = memoryview(file.read())
+
+    sections = {}
+    for name, (typecode, offset, length) in header.pop("sections").items():
+        values = data[offset:offset + length * array(typecode).itemsize].cast(typecode)
+        sections[name] = values if memory_map else array(typecode, values)
+    return header, sections
@@ -0,0 +1,32 @@
+import unittest
+from src.classifier.jeopardy_benchmarks import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class JeopardyBenchmarksTest(unittest.TestCase):
+
+    def test_synthetic_questions_are_reproducible(self):
+        questions = list(synthetic_questions(50, seed=4))
+
+        self.assertEqual(questions, list(synthetic_questions(50, seed=4)))
+        self.assertNotEqual(questions, list(synthetic_questions(50, seed=5)))
+        for question in questions:
+            self.assertIn(question["round"], ROUNDS)
+            JeopardyFeatureSet.build(question, question["round"])  # must be in the dataset's schema
+
+    def test_run_benchmarks(self):
+        report = run_benchmarks([200], score_limit=50, trace_memory=True, isolate=False)
+
+        self.assertEqual([result["stage"] for result in report["results"]],
+                         ["build", "build_compact", "train", "gamma", "gamma_batch", "predict", "predict_many"])
+        self.assertEqual(report["results"][3]["items"], 50)
+        self.assertIn("peak_traced_kb", report["results"][0])
+        for result in report["results"]:  # the process-wide high-water mark only ever rises
+            self.assertGreaterEqual(result["max_rss_growth_kb"], 0)
+            self.assertLessEqual(result["max_rss_growth_kb"], result["cumulative_max_rss_kb"])
+        json.dumps(report)
@@ -1,3 +1,6 @@
+import importlib.util
+import os
+import tempfile
 import unittest
 from src.classifier.jeopardy_classifier_models import *
 
@@ -16,6 +19,7 @@ class JeopardyFeatureSetTest(unittest.TestCase):
         question2 = {"category": "PRESIDENTIAL STATES OF BIRTH", "air_date": "2004-12-31", "question": "'California'",
                      "value": "$400", "answer": "Nixon", "round": "Double Jeopardy!", "show_number": "4680"}
 
+        self.questions = [question1, question2]
         self.actual_jeopardy_feature_set1 = JeopardyFeatureSet.build(question1, "Jeopardy!")
         self.actual_jeopardy_feature_set2 = JeopardyFeatureSet.build(question2, "Double Jeopardy!")
 
@@ -35,6 +39,59 @@ class JeopardyFeatureSetTest(unittest.TestCase):
         self.assertIn(self.feature2, self.actual_jeopardy_feature_set1.feat)
         self.assertIn(self.feature4, self.actual_jeopardy_feature_set2.feat)
 
+    def test_build_many(self):
+        feature_sets = JeopardyFeatureSet.build_many(self.questions, label_key="round", chunksize=1)
+
+        self.assertEqual([feature_set.feat for feature_set in feature_sets],
+                         [self.actual_jeopardy_feature_set1.feat, self.actual_jeopardy_feature_set2.feat])
+        self.assertEqual([feature_set.clas for feature_set in feature_sets], ["Jeopardy!", "Double Jeopardy!"])
+
+    @unittest.skipIf(importlib.util.find_spec("joblib") is None, "workers need joblib (see requirements.txt)")
+    def test_build_many_workers(self):
+        from joblib import Parallel
+        expected = JeopardyFeatureSet.build_many(self.questions * 3, label_key="round")
+        vocabulary = FeatureVocabulary()
+
+        with Parallel(n_jobs=2) as parallel:  # one pool for every call
+            batches = [JeopardyFeatureSet.build_many(self.questions * 3, label_key="round", chunksize=2,
+                                                     parallel=parallel) for _ in range(2)]
+            compact = JeopardyFeatureSet.build_many(self.questions * 3, label_key="round", chunksize=2,
+                                                    vocabulary=vocabulary, parallel=parallel)
+        for feature_sets in batches + [compact, JeopardyFeatureSet.build_many(self.questions * 3, label_key="round",
+                                                                                workers=2, chunksize=2)]:
+            self.assertEqual([feature_set.feat for feature_set in feature_sets],
+                             [feature_set.feat for feature_set in expected])
+            self.assertEqual([feature_set.clas for feature_set in feature_sets],
+                             [feature_set.clas for feature_set in expected])
+
+    def test_build_many_shares_features(self):
+        feature_sets = JeopardyFeatureSet.build_many(self.questions * 2, known_clas="Jeopardy!")
+
+        first = next(feature for feature in feature_sets[1].feat if feature == self.feature4)
+        second = next(feature for feature in feature_sets[3].feat if feature == self.feature4)
+        self.assertIs(first, second)
+        self.assertEqual(feature_sets[3].clas, "Jeopardy!")
+
+    def test_build_compact(self):
+        vocabulary = FeatureVocabulary()
+        compact_set = JeopardyFeatureSet.build_compact(self.questions[0], "Jeopardy!", vocabulary)
+
+        self.assertEqual(compact_set.feat, self.actual_jeopardy_feature_set1.feat)
+        self.assertEqual(list(compact_set.ids), [0, 1, 2])
+        self.assertEqual(compact_set.clas, "Jeopardy!")
+        self.assertFalse(hasattr(compact_set, "__dict__"))
+        with self.assertRaises(ValueError):  # ids only mean something within the vocabulary of a classifier
+            JeopardyFeatureSet.build_compact(self.questions[0], "Jeopardy!")
+
+    def test_build_many_compact(self):
+        vocabulary = FeatureVocabulary([self.feature3])
+        feature_sets = JeopardyFeatureSet.build_many(self.questions * 2, label_key="round", vocabulary=vocabulary)
+
+        self.assertEqual(len(vocabulary), 6)  # 2 categories, 2 lengths and 2 values
+        self.assertIn(vocabulary.get_id(self.feature3), feature_sets[1].ids)
+        self.assertEqual(feature_sets[0].ids, feature_sets[2].ids)
+        self.assertEqual(feature_sets[1].feat, self.actual_jeopardy_feature_set2.feat)
+
 
 class JeopardyClassifierTest(unittest.TestCase):
 
@@ -100,6 +157,51 @@ class JeopardyClassifierTest(unittest.TestCase):
 
         self.assertEqual(my_dict, self.constructed_classifier.get_probability_dict())
 
+    def test_partial_fit(self):
+        classifier = JeopardyClassifier.train(self.jeopardy_class_feature_sets[:3])
+        before = classifier.predict(self.feature_set4)
+
+        classifier.partial_fit(self.jeopardy_class_feature_sets[3:])
+
+        self.assertEqual(classifier.get_probability_dict(), self.constructed_prob_dict)
+        self.assertEqual(classifier.get_proportions_list(), [2/5, 1/5, 1/5, 1/5])
+        self.assertNotEqual(before.label, classifier.predict(self.feature_set4).label)
+
+    def test_merge(self):
+        shard1 = JeopardyClassifier.train(self.jeopardy_class_feature_sets[:2])
+        shard2 = JeopardyClassifier.train(self.jeopardy_class_feature_sets[2:])
+
+        merged = shard1.merge(shard2)
+
+        self.assertEqual(merged.get_probability_dict(), self.constructed_prob_dict)
+        self.assertEqual(merged.class_tallies, [2, 1, 1, 1])
+
+    def test_partial_fit_needs_counts(self):
+        with self.assertRaises(ValueError):
+            self.constructed_classifier.partial_fit([self.feature_set1])
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "model.jcm")
+            self.trained_classifier.save(file_path)
+
+            for memory_map in (True, False):
+                loaded = JeopardyClassifier.load(file_path, memory_map)
+
+                self.assertEqual(loaded.get_probability_dict(), self.constructed_prob_dict)
+                self.assertEqual(loaded.predict_many(self.jeopardy_class_feature_sets),
+                                 self.trained_classifier.predict_many(self.jeopardy_class_feature_sets))
+                self.assertEqual(loaded.gamma(self.feature_set1), self.trained_classifier.gamma(self.feature_set1))
+
+    def test_load_then_partial_fit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "model.jcm")
+            JeopardyClassifier.train(self.jeopardy_class_feature_sets[:3]).save(file_path)
+
+            loaded = JeopardyClassifier.load(file_path).partial_fit(self.jeopardy_class_feature_sets[3:])
+
+            self.assertEqual(loaded.get_probability_dict(), self.constructed_prob_dict)
+
     def test_gamma_jeopardy(self):
         output1 = self.trained_classifier.gamma(self.feature_set1)
 
@@ -120,6 +222,71 @@ class JeopardyClassifierTest(unittest.TestCase):
 
         self.assertEqual(output4, "Tiebreaker, gamma = " + str(1/5))
 
+    def test_gamma_batch(self):
+        labels, scores = self.trained_classifier.gamma_batch(self.jeopardy_class_feature_sets)
+
+        self.assertEqual(labels, ["Jeopardy!", "Double Jeopardy!", "Jeopardy!", "Final Jeopardy!", "Tiebreaker"])
+        self.assertAlmostEqual(scores[0], math.log(1/20))
+        self.assertAlmostEqual(scores[4], math.log(1/5))
+
+    def test_gamma_batch_after_recompile(self):
+        trained = self.trained_classifier
+        classifier = JeopardyClassifier(dict(trained.probability_dict), trained.proportions_list,
+                                        trained.class_tallies).use_prediction_cache()
+        history = JeopardyFeatureSet({self.feature1})
+        self.assertTrue(classifier.gamma(history).startswith("Jeopardy!"))
+        self.assertEqual(classifier.gamma_batch([history])[0], ["Jeopardy!"])
+
+        classifier.probability_dict[self.feature1] = [0.0, 1.0, 0.0, 0.0]
+        classifier.compile()
+
+        self.assertTrue(classifier.gamma(history).startswith("Double Jeopardy!"))
+        self.assertEqual(classifier.gamma_batch([history])[0], ["Double Jeopardy!"])
+
+    def test_gamma_batch_ties_match_gamma(self):
+        # the two rounds tie exactly on the last feature set, but the product and the log sum round differently
+        rows = {"Jeopardy!": [(0, 2, 1), (2, 1, 1), (3, 2, 1), (3, 2, 1), (1, 2, 0), (3, 1, 1), (0, 0, 0), (3, 0, 1)],
+                "Double Jeopardy!": [(1, 2, 0), (0, 0, 1), (0, 1, 0), (2, 1, 1), (3, 1, 0), (1, 2, 1)]}
+        def feature_set(row, clas=None):
+            return FeatureSet({Feature(name, value) for name, value in zip("FGH", row)}, clas)
+        classifier = JeopardyClassifier.train([feature_set(row, clas) for clas in rows for row in rows[clas]])
+        tie = feature_set((3, 1, 0))
+
+        self.assertTrue(classifier.gamma(tie).startswith("Jeopardy!,"))
+        self.assertEqual(classifier.gamma_batch([tie])[0], ["Jeopardy!"])
+
+    def test_predict_many_matches_gamma(self):
+        predictions = self.trained_classifier.predict_many(self.jeopardy_class_feature_sets)
+
+        for prediction, feature_set in zip(predictions, self.jeopardy_class_feature_sets):
+            self.assertTrue(self.trained_classifier.gamma(feature_set).startswith(prediction.label + ","))
+
+    def test_predict_smoothed(self):
+        prediction = self.trained_classifier.predict(self.feature_set2, posteriors=True)
+
+        self.assertEqual(prediction.index, 1)
+        self.assertEqual(prediction.label, "Double Jeopardy!")
+        # smoothed P(f | Double Jeopardy!) = (1 + 1) / (1 + 2) for each of its 3 features, and 1 - (0 + 1) / (1 + 2)
+        # for each of the 6 other training features it does not have, prior 1/5
+        self.assertAlmostEqual(prediction.log_score, math.log(1/5 * (2/3) ** 3 * (2/3) ** 6))
+        self.assertAlmostEqual(sum(prediction.posteriors), 1.0)
+
+    def test_predict_compact(self):
+        compact_set = CompactFeatureSet.encode(self.feature_set2, FeatureVocabulary())
+
+        self.assertEqual(self.trained_classifier.predict(compact_set), self.trained_classifier.predict(self.feature_set2))
+
+    def test_predict_does_not_underflow(self):
+        # every feature is seen in half of each class's questions, so gamma is 0.5 ** 1200 / 4
+        features = {JeopardyFeature("Value of Question", value) for value in range(1200)}
+        training_sets = [JeopardyFeatureSet(feature_set, clas) for clas in ROUNDS for feature_set in (features, set())]
+        classifier = JeopardyClassifier.train(training_sets, smoothing=0.0)
+
+        prediction = classifier.predict(JeopardyFeatureSet(features))
+
+        self.assertEqual(classifier.gamma(JeopardyFeatureSet(features)), "Jeopardy!, gamma = 0.0")
+        self.assertAlmostEqual(prediction.log_score, 1200 * math.log(0.5) + math.log(1/4))
+
 
 if __name__ == '__main__':
     unittest.main()
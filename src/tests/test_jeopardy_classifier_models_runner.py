@@ -0,0 +1,100 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+@unittest.skipIf(importlib.util.find_spec("click") is None, "the command line needs click (see requirements.txt)")
+class RunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        from click.testing import CliRunner
+        from src.classifier.jeopardy_classifier_models_runner import main
+        self.main = main
+        self.runner = CliRunner()
+
+        question1 = {"category": "HISTORY", "air_date": "2004-12-31", "question": "'For the last 8 years of his life, Galileo was under house arrest for espousing this man's theory'",
+                     "value": "$200", "answer": "Copernicus", "round": "Jeopardy!", "show_number": "4680"}
+        question2 = {"category": "PRESIDENTIAL STATES OF BIRTH", "air_date": "2004-12-31", "question": "'California'",
+                     "value": "$2,000", "answer": "Nixon", "round": "Double Jeopardy!", "show_number": "4680"}
+        question3 = {"category": "BRITISH NOVELS", "air_date": "1996-12-06", "question": "'This 1895 novel is subtitled \"An Invention\"'",
+                     "value": None, "answer": "The Time Machine", "round": "Final Jeopardy!", "show_number": "2825"}
+        self.questions = [question1, question2, question3] * 4
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.directory.name, "questions.json")
+        self.model_path = os.path.join(self.directory.name, "model.jcm")
+        with open(self.json_path, "w") as file:
+            json.dump(self.questions, file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def invoke(self, *args):
+        result = self.runner.invoke(self.main, list(args), catch_exceptions=False)
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result.output
+
+    @unittest.skipIf(importlib.util.find_spec("tqdm") is None, "predict needs tqdm (see requirements.txt)")
+    def test_train_then_predict(self):
+        self.invoke("train", self.json_path, self.model_path, "--test-fraction", "0")
+        output_path = os.path.join(self.directory.name, "predictions.jsonl")
+        self.invoke("predict", self.model_path, self.json_path, output_path, "--chunk-size", "5", "--posteriors")
+
+        with open(output_path) as file:
+            predictions = [json.loads(line) for line in file]
+        self.assertEqual([prediction["label"] for prediction in predictions],
+                         [question["round"] for question in self.questions])
+        self.assertAlmostEqual(sum(predictions[0]["posteriors"].values()), 1.0)
+
+    @unittest.skipIf(importlib.util.find_spec("tqdm") is None, "predict needs tqdm (see requirements.txt)")
+    def test_predict_with_cache(self):
+        self.invoke("train", self.json_path, self.model_path, "--test-fraction", "0")
+        output_path = os.path.join(self.directory.name, "predictions.jsonl")
+        profile_path = os.path.join(self.directory.name, "profile.json")
+        self.invoke("--profile", profile_path, "predict", self.model_path, self.json_path, output_path,
+                    "--prediction-cache", "100")
+
+        with open(profile_path) as file:
+            caches = json.load(file)["caches"]
+        self.assertEqual((caches["predictions"]["hits"], caches["predictions"]["misses"]), (9, 3))
+
+    def test_features(self):
+        self.invoke("train", self.json_path, self.model_path, "--test-fraction", "0")
+        output = self.invoke("features", self.model_path, "--top-n", "1")
+
+        self.assertIn("Most predictive features of Final Jeopardy!:", output)
+        self.assertIn("Category of Question = BRITISH NOVELS", output)
+
+    def test_evaluate(self):
+        report = json.loads(self.invoke("evaluate", self.json_path, "--folds", "2", "--seed", "0", "--json"))
+
+        self.assertEqual(sum(map(sum, report["confusion"])), len(self.questions))
+
+    def test_evaluate_checks_feature_config(self):
+        self.invoke("train", self.json_path, self.model_path, "--test-fraction", "0", "--extractors", "category")
+        result = self.runner.invoke(self.main, ["evaluate", self.json_path, "--model", self.model_path])
+
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("--extractors and --text-ngrams the model was trained with", result.output)
+        self.invoke("evaluate", self.json_path, "--model", self.model_path, "--extractors", "category")
+
+    @unittest.skipIf(importlib.util.find_spec("joblib") is None, "--workers needs joblib (see requirements.txt)")
+    def test_evaluate_workers(self):
+        arguments = ("evaluate", self.json_path, "--folds", "2", "--seed", "0", "--json")
+        in_process = json.loads(self.invoke(*arguments))
+        report = json.loads(self.invoke(*arguments, "--workers", "2"))  # folds of the memory-mapped feature cache
+
+        self.assertEqual(report["confusion"], in_process["confusion"])
+        self.assertEqual(report["fold_accuracies"], in_process["fold_accuracies"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from src.classifier.jeopardy_data import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class JeopardyDataTest(unittest.TestCase):
+
+    def setUp(self):
+        question1 = {"category": "HISTORY", "air_date": "2004-12-31", "question": "'For the last 8 years of his life, Galileo was under house arrest for espousing this man's theory'",
+                     "value": "$200", "answer": "Copernicus", "round": "Jeopardy!", "show_number": "4680"}
+        question2 = {"category": "PRESIDENTIAL STATES OF BIRTH", "air_date": "2004-12-31", "question": "'California'",
+                     "value": "$400", "answer": "Nixon", "round": "Double Jeopardy!", "show_number": "4680"}
+        question3 = {"category": "BRITISH NOVELS", "air_date": "1996-12-06", "question": "'This 1895 novel is subtitled \"An Invention\"'",
+                     "value": None, "answer": "The Time Machine", "round": "Final Jeopardy!", "show_number": "2825"}
+        question4 = {"category": "CHILD'S PLAY", "air_date": "2007-11-13", "question": "'A Longfellow poem & a Lillian Hellman play about a girls' boarding school share this timely title'",
+                     "value": None, "answer": "The Children\\'s Hour", "round": "Tiebreaker", "show_number": "5332"}
+        question5 = {"category": "SPECIAL", "air_date": "1996-12-06", "question": "'Not a real round'",
+                     "value": None, "answer": "Nothing", "round": "Bonus", "show_number": "2825"}
+        self.questions = [question1, question2, question3, question4, question5]
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.directory.name, "questions.json")
+        with open(self.json_path, "w") as file:
+            json.dump(self.questions, file, indent=2)
+        self.jsonl_path = os.path.join(self.directory.name, "questions.jsonl")
+        with open(self.jsonl_path, "w") as file:
+            file.writelines(json.dumps(question) + "\n" for question in self.questions)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_iter_questions_json_array(self):
+        self.assertEqual(list(iter_questions(self.json_path)), self.questions)
+
+    def test_iter_questions_small_chunks(self):
+        self.assertEqual(list(iter_questions(self.json_path, chunk_size=7)), self.questions)
+        self.assertEqual(list(iter_questions(self.jsonl_path, chunk_size=7)), self.questions)
+
+    def test_iter_questions_json_lines(self):
+        self.assertEqual(list(iter_questions(self.jsonl_path)), self.questions)
+
+    def test_iter_questions_profiled(self):
+        with Profiler() as profiler:
+            self.assertEqual(list(iter_questions(self.json_path, chunk_size=7)), self.questions)
+            self.assertEqual(list(iter_questions(self.jsonl_path)), self.questions)
+
+        self.assertEqual(profiler.stages["parse"].items, 2 * len(self.questions))  # cut-off values are not counted
+
+    def test_iter_feature_sets_skips_other_rounds(self):
+        feature_sets = list(iter_feature_sets(self.questions))
+
+        self.assertEqual([feature_set.clas for feature_set in feature_sets],
+                         ["Jeopardy!", "Double Jeopardy!", "Final Jeopardy!", "Tiebreaker"])
+
+    @unittest.skipIf(importlib.util.find_spec("joblib") is None, "workers need joblib (see requirements.txt)")
+    def test_iter_feature_sets_workers(self):
+        feature_sets = list(iter_feature_sets(self.questions * 3, workers=2, chunksize=2))  # 3 batches, 1 pool
+
+        self.assertEqual([feature_set.feat for feature_set in feature_sets],
+                         [feature_set.feat for feature_set in iter_feature_sets(self.questions * 3)])
+
+    def test_train_on_stream(self):
+        test_sets = []
+        stream = split_stream(iter_feature_sets(iter_questions(self.json_path)), 0.0, test_sets)
+
+        classifier = JeopardyClassifier.train(stream)
+
+        self.assertEqual(classifier.class_tallies, [1, 1, 1, 1])
+        self.assertEqual(test_sets, [])
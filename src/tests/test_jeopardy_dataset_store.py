@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from src.classifier.jeopardy_dataset_store import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class QuestionStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        question1 = {"category": "HISTORY", "air_date": "2004-12-31", "question": "'For the last 8 years of his life, Galileo was under house arrest for espousing this man's theory'",
+                     "value": "$200", "answer": "Copernicus", "round": "Jeopardy!", "show_number": "4680"}
+        question2 = {"category": "PRESIDENTIAL STATES OF BIRTH", "air_date": "2004-12-31", "question": "'California'",
+                     "value": "$2,000", "answer": "Nixon", "round": "Double Jeopardy!", "show_number": "4680"}
+        question3 = {"category": "BRITISH NOVELS", "air_date": "1996-12-06", "question": "'This 1895 novel is subtitled \"An Invention\"'",
+                     "value": None, "answer": "The Time Machine", "round": "Final Jeopardy!", "show_number": "2825"}
+        question4 = {"category": "HISTORY", "air_date": "1996-12-05", "question": "'Édouard Manet painted this bar at the Folies-Bergère'",
+                     "value": "$1,000", "answer": "A Bar at the Folies-Bergère", "round": "Jeopardy!", "show_number": "2824"}
+        self.questions = [question1, question2, question3, question4]
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.directory.name, "questions.json")
+        self.store_path = os.path.join(self.directory.name, "questions.jqs")
+        with open(self.json_path, "w") as file:
+            json.dump(self.questions, file)
+        self.store = QuestionStore.convert(self.json_path, self.store_path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(list(self.store.view()), self.questions)
+        self.assertEqual(list(QuestionStore.load(self.store_path, memory_map=False).view()), self.questions)
+
+    def test_by_round(self):
+        jeopardy = self.store.by_round("Jeopardy!")
+
+        self.assertIsInstance(jeopardy.rows, memoryview)  # a slice of the mapped round index, not a copy
+        self.assertEqual(list(jeopardy), [self.questions[0], self.questions[3]])
+        self.assertEqual(list(self.store.by_round("Final Jeopardy!", "Double Jeopardy!")), self.questions[1:3])
+        self.assertEqual(len(self.store.by_round("Tiebreaker")), 0)
+
+    def test_between(self):
+        december_1996 = self.store.between("1996-12-01", "1997-01-01")
+
+        self.assertEqual(december_1996.column("air_date"), ["1996-12-05", "1996-12-06"])  # in air date order
+        self.assertEqual(len(self.store.between(end=datetime.date(1996, 12, 6))), 1)
+        self.assertEqual(len(self.store.between("2005-01-01")), 0)
+
+    def test_between_undated(self):
+        store = QuestionStore.from_questions(self.questions + [dict(self.questions[3], air_date=None)])
+
+        self.assertEqual(store.view().column("air_date")[-1], None)
+        self.assertEqual(len(store.between()), 4)
+        self.assertEqual(len(store.between(end="1997-01-01")), 2)
+        self.assertEqual(sorted(store.between().rows), list(store.view().between().rows))  # the same rule for views
+        self.assertEqual(sorted(store.between(end="1997-01-01").rows), list(store.view().between(end="1997-01-01").rows))
+
+    def test_many_values(self):
+        questions = [dict(self.questions[0], value=f"${value}") for value in range(40000)]
+        store = QuestionStore.from_questions(questions)
+
+        self.assertEqual(store.value(39999, "value"), "$39999")
+
+    def test_by_show(self):
+        self.assertEqual(self.store.by_show("4680").column("answer"), ["Copernicus", "Nixon"])
+        self.assertEqual(len(self.store.by_show(2824, 2825)), 2)
+
+    def test_unusual_show_numbers(self):
+        questions = [dict(self.questions[0], show_number=show_number)
+                     for show_number in [None, "special", "0123", "4680", "special", "99999999999"]]
+        store = QuestionStore.from_questions(questions)
+
+        self.assertEqual(store.view().column("show_number"), [None, "special", "0123", "4680", "special", "99999999999"])
+        self.assertEqual(store.by_show(0, 10 ** 6).column("show_number"), ["4680"])
+        self.assertEqual(len(store.by_show(-2)), 0)
+        self.assertEqual(len(store.view().by_show(-5, 123)), 0)
+
+    def test_view_filters_compose(self):
+        view = self.store.by_round("Jeopardy!").between("2000-01-01")
+
+        self.assertEqual(list(view), [self.questions[0]])
+        self.assertEqual(list(self.store.between("1996-12-01", "1997-01-01").by_show(2825)), [self.questions[2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
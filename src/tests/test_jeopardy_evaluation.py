@@ -0,0 +1,100 @@
+import importlib.util
+import os
+import random
+import tempfile
+import unittest
+from src.classifier.jeopardy_evaluation import *
+from src.classifier.jeopardy_feature_cache import CachedFeatureSets
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class JeopardyEvaluationTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.feature_sets = []
+        for index in range(60):
+            clas = ROUNDS[index % 3]
+            features = {JeopardyFeature("Value of Question", 200 * (index % 3 + 1)),
+                        JeopardyFeature("Category of Question", rng.choice(["HISTORY", "SCIENCE", "POTPOURRI"]))}
+            self.feature_sets.append(JeopardyFeatureSet(features, clas))
+
+    def test_stratified_folds(self):
+        labels = [feature_set.clas for feature_set in self.feature_sets]
+
+        folds = stratified_folds(labels, 4, random.Random(1))
+
+        self.assertEqual(sorted(index for fold in folds for index in fold), list(range(60)))
+        for fold in folds:
+            self.assertEqual(sorted(labels[index] for index in fold).count("Jeopardy!"), 5)
+
+    def test_cross_validate(self):
+        report = cross_validate(self.feature_sets, k=5, seed=3)
+
+        self.assertEqual(report.total, 60)
+        self.assertEqual(report.accuracy, 1.0)  # the value alone gives the round away
+        self.assertEqual(report.fold_accuracies, [1.0] * 5)
+        self.assertEqual(report.f1()["Double Jeopardy!"], 1.0)
+        self.assertEqual(report.recall()["Tiebreaker"], 0.0)
+        self.assertIn("count", report.timings)
+
+    def test_cross_validate_empty_fold(self):
+        report = cross_validate(self.feature_sets[:3], k=4, seed=3)
+
+        self.assertEqual(report.fold_accuracies.count(None), 1)  # skipped rather than scored as 0.0
+        self.assertEqual(report.total, 3)
+
+    @unittest.skipIf(importlib.util.find_spec("joblib") is None, "parallel cross-validation needs joblib")
+    def test_cross_validate_workers(self):
+        in_process = cross_validate(self.feature_sets, k=5, seed=3)
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "features.jfc")
+            CachedFeatureSets.from_feature_sets(self.feature_sets, list(ROUNDS)).save(file_path)
+            cached = CachedFeatureSets.load(file_path)
+
+            for feature_sets in (self.feature_sets, cached):  # cached feature sets are mapped by the workers
+                report = cross_validate(feature_sets, k=5, workers=2, seed=3)
+                self.assertEqual((report.confusion, report.fold_accuracies),
+                                 (in_process.confusion, in_process.fold_accuracies))
+
+    def test_report_metrics(self):
+        report = EvaluationReport(["a", "b"], [[3, 1], [2, 4]])
+
+        self.assertEqual(report.accuracy, 0.7)
+        self.assertEqual(report.precision(), {"a": 3/5, "b": 4/5})
+        self.assertEqual(report.recall(), {"a": 3/4, "b": 4/6})
+        self.assertAlmostEqual(report.f1()["a"], 2 * (3/5) * (3/4) / (3/5 + 3/4))
+
+    def test_evaluate(self):
+        classifier = JeopardyClassifier.train(self.feature_sets)
+
+        self.assertEqual(evaluate(classifier, self.feature_sets).accuracy, 1.0)
+
+    def test_walk_forward(self):
+        questions = [{"category": f"CATEGORY {index % 4}", "air_date": f"{2000 + index // 12}-{index % 12 + 1:02d}-01",
+                      "question": "'A question'", "value": f"${200 * (index % 2 + 1)}", "answer": "An answer",
+                      "round": ROUNDS[index % 2], "show_number": str(index)} for index in range(48)]
+        store = QuestionStore.from_questions(reversed(questions))  # the store orders windows by air date
+
+        report = walk_forward(store, "2001-01-01", datetime.timedelta(365))
+
+        self.assertEqual([window["start"] for window in report.windows], ["2001-01-01", "2002-01-01", "2003-01-01"])
+        self.assertEqual([window["train_questions"] for window in report.windows], [12, 24, 36])
+        self.assertEqual(report.total, 36)
+        self.assertEqual(report.accuracy, 1.0)  # the value alone gives the round away
+        self.assertEqual(report.to_dict()["windows"][0]["test_questions"], 12)
+
+    def test_walk_forward_empty_window(self):
+        questions = [{"category": "HISTORY", "air_date": f"{year}-06-01", "question": "'A question'",
+                      "value": f"${200 * (index % 2 + 1)}", "answer": "An answer", "round": ROUNDS[index % 2],
+                      "show_number": str(index)} for index, year in enumerate([2000, 2000, 2001, 2001, 2003, 2003])]
+
+        report = walk_forward(QuestionStore.from_questions(questions), "2001-01-01", datetime.timedelta(365))
+
+        self.assertEqual([window["start"] for window in report.windows], ["2001-01-01", "2003-01-01"])  # none in 2002
+        self.assertEqual(report.fold_accuracies, [1.0, 1.0])
@@ -0,0 +1,79 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from src.classifier.jeopardy_feature_cache import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class FeatureCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        question1 = {"category": "HISTORY", "air_date": "2004-12-31", "question": "'For the last 8 years of his life, Galileo was under house arrest for espousing this man's theory'",
+                     "value": "$200", "answer": "Copernicus", "round": "Jeopardy!", "show_number": "4680"}
+        question2 = {"category": "PRESIDENTIAL STATES OF BIRTH", "air_date": "2004-12-31", "question": "'California'",
+                     "value": "$400", "answer": "Nixon", "round": "Double Jeopardy!", "show_number": "4680"}
+        question3 = {"category": "BRITISH NOVELS", "air_date": "1996-12-06", "question": "'This 1895 novel is subtitled \"An Invention\"'",
+                     "value": None, "answer": "The Time Machine", "round": "Final Jeopardy!", "show_number": "2825"}
+        self.questions = [question1, question2, question3]
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, "cache")
+        self.json_path = os.path.join(self.directory.name, "questions.json")
+        with open(self.json_path, "w") as file:
+            json.dump(self.questions, file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_builds_then_reuses(self):
+        cache = FeatureCache(self.cache_dir)
+
+        built = cache.load(self.json_path)
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(cache.path(self.json_path))])
+        reused = cache.load(self.json_path)
+
+        expected = [JeopardyFeatureSet.build(question, question["round"]) for question in self.questions]
+        for feature_sets in (built, reused):
+            self.assertEqual([feature_set.feat for feature_set in feature_sets],
+                             [feature_set.feat for feature_set in expected])
+            self.assertEqual([feature_set.clas for feature_set in feature_sets],
+                             ["Jeopardy!", "Double Jeopardy!", "Final Jeopardy!"])
+
+    def test_key_changes_with_file_and_config(self):
+        key = FeatureCache(self.cache_dir).key(self.json_path)
+
+        self.assertNotEqual(key, FeatureCache(self.cache_dir, rounds=["Jeopardy!"]).key(self.json_path))
+        with open(self.json_path, "w") as file:
+            json.dump(self.questions[:2], file)
+        self.assertNotEqual(key, FeatureCache(self.cache_dir).key(self.json_path))
+
+    def test_train_on_cached_feature_sets(self):
+        cached = FeatureCache(self.cache_dir).load(self.json_path)
+
+        classifier = JeopardyClassifier.train(cached, vocabulary=cached.vocabulary)
+
+        self.assertEqual(classifier.predict(cached[1]).label, "Double Jeopardy!")
+        self.assertEqual(classifier.class_tallies, [1, 1, 1, 0])
+
+    def test_indexing(self):
+        cached = FeatureCache(self.cache_dir).load(self.json_path)
+
+        self.assertEqual(cached[-3].feat, cached[0].feat)
+        for index in (3, -4):
+            with self.assertRaises(IndexError):
+                cached[index]
+
+    def test_pickle_memory_mapped_feature_sets(self):
+        cached = FeatureCache(self.cache_dir).load(self.json_path)
+
+        copies = pickle.loads(pickle.dumps([cached[0], cached[2]]))
+
+        self.assertEqual([copy.feat for copy in copies], [cached[0].feat, cached[2].feat])
+        self.assertEqual(list(copies[1].ids), list(cached[2].ids))
@@ -0,0 +1,121 @@
+import gc
+import pickle
+import unittest
+import weakref
+from src.classifier.jeopardy_classifier_models import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class FeatureExtractorsTest(unittest.TestCase):
+
+    def setUp(self):
+        question1 = {"category": "HISTORY", "air_date": "2004-12-31", "question": "'For the last 8 years of his life, Galileo was under house arrest for espousing this man's theory'",
+                     "value": "$200", "answer": "Copernicus", "round": "Jeopardy!", "show_number": "4680"}
+        question2 = {"category": "PRESIDENTIAL STATES OF BIRTH", "air_date": "2004-12-31", "question": "'California'",
+                     "value": "$2,000", "answer": "Nixon", "round": "Double Jeopardy!", "show_number": "4680"}
+        question3 = {"category": "HISTORY", "question": "'This 1895 novel is subtitled \"An Invention\"'",
+                     "value": None, "answer": "The Time Machine", "round": "Final Jeopardy!", "show_number": "2825"}
+        self.questions = [question1, question2, question3]
+
+    def test_default_plan(self):
+        feature_sets = JeopardyFeatureSet.build_batch(self.questions, label_key="round")
+
+        self.assertEqual(feature_sets[0].feat, {Feature("Category of Question", "HISTORY"),
+                                                Feature("Amount of characters is >80", True),
+                                                Feature("Value of Question", 200)})
+        self.assertEqual(feature_sets[1].feat, {Feature("Category of Question", "PRESIDENTIAL STATES OF BIRTH"),
+                                                Feature("Amount of characters is <80", True),
+                                                Feature("Value of Question", 2000)})
+        self.assertEqual([feature_set.clas for feature_set in feature_sets],
+                         ["Jeopardy!", "Double Jeopardy!", "Final Jeopardy!"])
+        for question, feature_set in zip(self.questions, feature_sets):
+            self.assertEqual(JeopardyFeatureSet.build(question, question["round"]).feat, feature_set.feat)
+
+    def test_shared_features(self):
+        first, _, third = JeopardyFeatureSet.build_batch(self.questions)
+        category = Feature("Category of Question", "HISTORY")
+
+        self.assertIs(next(feature for feature in first.feat if feature == category),
+                      next(feature for feature in third.feat if feature == category))
+
+    def test_configured_extractors(self):
+        extractors = ["category", ("length", {"threshold": 20}), ("date", {"granularity": "decade"})]
+        feature_sets = JeopardyFeatureSet.build_batch(self.questions, extractors=extractors)
+
+        self.assertEqual(feature_sets[0].feat, {Feature("Category of Question", "HISTORY"),
+                                                Feature("Amount of characters is >20", True),
+                                                Feature("Air decade", 2000)})
+        self.assertEqual(feature_sets[2].feat, {Feature("Category of Question", "HISTORY"),
+                                                Feature("Amount of characters is >20", True)})  # no air date
+        self.assertIs(compile_plan(extractors), compile_plan(list(extractors)))  # compiled once per config
+        self.assertEqual(JeopardyFeatureSet.build(self.questions[0], extractors=("date",)).feat,
+                         {Feature("Air year", 2004)})
+
+    def test_text_extractor(self):
+        vectorizer = HashingVectorizer(n_features=1024, ngram_range=(1, 2))
+        feature_sets = JeopardyFeatureSet.build_batch(self.questions, extractors=(), text_vectorizer=vectorizer)
+
+        self.assertEqual([feature_set.feat for feature_set in feature_sets],
+                         [vectorizer.features(question) for question in self.questions])
+
+    def test_no_extractors(self):
+        feature_sets = JeopardyFeatureSet.build_batch(self.questions, label_key="round", extractors=())
+
+        self.assertEqual([(feature_set.feat, feature_set.clas) for feature_set in feature_sets],
+                         [(set(), question["round"]) for question in self.questions])
+        self.assertEqual(len(JeopardyFeatureSet.build_many(self.questions, extractors=(), chunksize=2)), 3)
+
+    def test_register_extractor(self):
+        @register_extractor("answer length")
+        class AnswerLengthExtractor(FeatureExtractor):
+            fields = ("answer",)
+
+            def extract(self, columns):
+                return [[Feature("Answer words", len(answer.split()))] for answer in columns["answer"]]
+
+        try:
+            feature_sets = JeopardyFeatureSet.build_batch(self.questions, extractors=("answer length", "value"))
+            self.assertEqual(feature_sets[2].feat, {Feature("Answer words", 3)})
+            self.assertEqual(JeopardyFeatureSet.build(self.questions[1], extractors=("answer length",)).feat,
+                             {Feature("Answer words", 1)})
+        finally:
+            del EXTRACTORS["answer length"]
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            compile_plan(("category", "colour"))
+        with self.assertRaises(KeyError):  # required fields must be present
+            JeopardyFeatureSet.build_batch([{"question": "'California'", "value": "$200"}])
+
+    def test_pickle(self):
+        plan = compile_plan(("category", "value"))
+        plan.extract(self.questions)
+        copy = pickle.loads(pickle.dumps(plan))
+
+        self.assertEqual(copy.extractors[0]._memo.cache_info().currsize, 0)  # memos are not shipped to workers
+        self.assertEqual(copy.extract(self.questions), plan.extract(self.questions))
+
+    def test_bounded_memo(self):
+        extractor = CategoryExtractor()
+        extractor.extract({"category": [f"CATEGORY {n}" for n in range(CategoryExtractor.MEMO_SIZE + 10)]})
+
+        self.assertEqual(extractor._memo.cache_info().currsize, CategoryExtractor.MEMO_SIZE)
+
+    def test_plans_do_not_keep_vectorizers(self):
+        vectorizer = HashingVectorizer(n_features=1024)
+        plan = compile_plan(("category",), vectorizer)
+        self.assertIs(plan.extractors[0], compile_plan(("category",)).extractors[0])  # shares the memoized extractor
+        reference = weakref.ref(vectorizer)
+        del vectorizer, plan
+        gc.collect()
+
+        self.assertIsNone(reference())
+
+
+if __name__ == '__main__':
+    unittest.main()
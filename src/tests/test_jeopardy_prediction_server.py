@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from src.classifier.jeopardy_classifier_models import *
+from src.classifier.jeopardy_prediction_server import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class PredictionServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.questions = [
+            {"category": "HISTORY", "question": "'Galileo was under house arrest'", "value": "$200",
+             "answer": "Copernicus", "round": "Jeopardy!"},
+            {"category": "SCIENCE", "question": "'This element is number 79'", "value": "$2,000",
+             "answer": "gold", "round": "Double Jeopardy!"},
+            {"category": "AUTHORS", "question": "'He wrote Ulysses and Dubliners'", "value": None,
+             "answer": "James Joyce", "round": "Final Jeopardy!"},
+            {"category": "AUTHORS", "question": "'She wrote Frankenstein'", "value": None,
+             "answer": "Mary Shelley", "round": "Tiebreaker"},
+        ]
+        self.classifier = JeopardyClassifier.train(
+            [JeopardyFeatureSet.build(question, question["round"]) for question in self.questions])
+        self.expected = self.classifier.predict_many(
+            [JeopardyFeatureSet.build(question, None) for question in self.questions], posteriors=True)
+
+    def test_micro_batches(self):
+        async def run():
+            batcher = MicroBatcher(self.classifier, max_batch_size=4, max_wait=0.05)
+            await batcher.start()
+            feature_sets = [JeopardyFeatureSet.build(question, None) for question in self.questions * 3]
+            predictions = await asyncio.gather(*(batcher.submit(feature_set) for feature_set in feature_sets))
+            await batcher.stop()
+            return batcher, predictions
+
+        batcher, predictions = asyncio.run(run())
+
+        self.assertEqual((batcher.batches, batcher.items), (3, 12))
+        self.assertEqual(predictions, self.expected * 3)
+
+    def test_http_predict(self):
+        async def request(port, method, path, payload=None):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = json.dumps(payload).encode() if payload is not None else b""
+            writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                         .encode() + body)
+            status = int((await reader.readline()).split()[1])
+            response = (await reader.read()).split(b"\r\n\r\n", 1)[1]
+            writer.close()
+            return status, json.loads(response)
+
+        async def run(model_path):
+            server = PredictionServer(JeopardyClassifier.load(model_path), max_wait=0.01)
+            listener = await server.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                return await asyncio.gather(request(port, "POST", "/predict", self.questions[1]),
+                                            request(port, "POST", "/predict", self.questions),
+                                            request(port, "GET", "/predict"),
+                                            request(port, "POST", "/predict", {"question": "no category"}))
+            finally:
+                await server.stop()
+
+        with tempfile.TemporaryDirectory() as directory:
+            model_path = os.path.join(directory, "model.jcm")
+            self.classifier.save(model_path)
+            single, many, wrong_method, invalid = asyncio.run(run(model_path))
+
+        self.assertEqual(single[0], 200)
+        self.assertEqual(single[1]["label"], "Double Jeopardy!")
+        self.assertAlmostEqual(sum(single[1]["posteriors"].values()), 1.0)
+        self.assertEqual([prediction["label"] for prediction in many[1]], [prediction.label for prediction in self.expected])
+        self.assertEqual(wrong_method[0], 405)
+        self.assertEqual(invalid[0], 400)
+
+    def test_internal_error(self):
+        async def fail(question):
+            raise RuntimeError("scoring failed")
+
+        server = PredictionServer(self.classifier)
+        server.predict = fail
+        with self.assertLogs(logger, "ERROR"):
+            status, response = asyncio.run(server._route("POST", "/predict", json.dumps(self.questions[0]).encode()))
+
+        self.assertEqual(status, 500)
+        self.assertIn("scoring failed", response["error"])
+
+    def test_feature_config_checked(self):
+        self.classifier.feature_config = JeopardyFeatureSet.feature_config()
+        with tempfile.TemporaryDirectory() as directory:
+            model_path = os.path.join(directory, "model.jcm")
+            self.classifier.save(model_path)
+            classifier = JeopardyClassifier.load(model_path)
+
+        self.assertEqual(classifier.feature_config, self.classifier.feature_config)
+        PredictionServer(classifier)
+        with self.assertRaises(ValueError):
+            PredictionServer(classifier, text_vectorizer=HashingVectorizer(ngram_range=(1, 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
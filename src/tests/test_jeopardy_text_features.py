@@ -0,0 +1,64 @@
+import importlib.util
+import pickle
+import unittest
+import zlib
+from src.classifier.jeopardy_classifier_models import *
+from src.classifier.jeopardy_text_features import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class HashingVectorizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.question = {"category": "HISTORY", "air_date": "2004-12-31", "question": "'For the last 8 years of his life, Galileo was under house arrest for espousing this man's theory'",
+                         "value": "$200", "answer": "Copernicus", "round": "Jeopardy!", "show_number": "4680"}
+        self.vectorizer = HashingVectorizer(n_features=1024, ngram_range=(1, 2))
+
+    def test_ngrams(self):
+        self.assertEqual(self.vectorizer.tokens("Galileo's house, ARREST!"), ["galileo's", "house", "arrest"])
+        self.assertEqual(self.vectorizer.ngrams("under house arrest"),
+                         ["under", "house", "arrest", "under house", "house arrest"])
+
+    def test_features(self):
+        features = self.vectorizer.features(self.question)
+
+        self.assertIn(Feature("Answer text hash", zlib.crc32(b"copernicus") % 1024), features)
+        self.assertIn(Feature("Question text hash", zlib.crc32(b"house arrest") % 1024), features)
+        self.assertTrue(all(0 <= feature.value < 1024 for feature in features))
+
+    def test_transform_caches_texts(self):
+        features = self.vectorizer.transform([self.question] * 3)
+
+        self.assertEqual(self.vectorizer.buckets.cache_info().misses, 2)  # one question text and one answer text
+        self.assertEqual(features, [self.vectorizer.features(self.question)] * 3)
+
+    @unittest.skipIf(importlib.util.find_spec("nltk") is None, "stemming needs nltk")
+    def test_stem_cache_bounded(self):
+        vectorizer = HashingVectorizer(stem=True, cache_size=2)
+
+        self.assertEqual(vectorizer.tokens("running runs ran running"), ["run", "run", "ran", "run"])
+        self.assertEqual(vectorizer._stem.cache_info().currsize, 2)
+
+    def test_build_with_text_features(self):
+        feature_set = JeopardyFeatureSet.build(self.question, "Jeopardy!", text_vectorizer=self.vectorizer)
+
+        self.assertIn(JeopardyFeature("Category of Question", "HISTORY"), feature_set.feat)
+        self.assertTrue(self.vectorizer.features(self.question) <= feature_set.feat)
+
+    def test_column_features(self):
+        rows = self.vectorizer.column_features("answer", ["Copernicus", None, "Copernicus"])
+
+        self.assertEqual(set(rows[0]), self.vectorizer.features({"answer": "Copernicus"}))
+        self.assertEqual(rows[1], [])
+        self.assertIs(rows[0][0], rows[2][0])  # one shared instance per bucket
+
+    def test_pickle(self):
+        copy = pickle.loads(pickle.dumps(self.vectorizer))
+
+        self.assertEqual(repr(copy), repr(self.vectorizer))
+        self.assertEqual(copy.features(self.question), self.vectorizer.features(self.question))
@@ -0,0 +1,59 @@
+import os
+import pickle
+import tempfile
+import unittest
+from src.classifier.mapped_vocabulary import *
+from src.classifier.section_file import read_sections, write_sections
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class MappedVocabularyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.features = [Feature("Category of Question", "HISTORY"), Feature("Value of Question", 200),
+                         Feature("Amount of characters is >80", True), Feature("Score", 0.5), Feature("Missing")]
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "vocabulary.bin")
+        write_sections(self.file_path, b"TEST", 1, {}, vocabulary_sections(self.features))
+        _, sections = read_sections(self.file_path, b"TEST", 1)
+        self.vocabulary = MappedVocabulary.from_sections(sections)
+
+    def tearDown(self):
+        del self.vocabulary  # release the memory mapping before the file is removed
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(list(self.vocabulary), self.features)
+        self.assertEqual([type(feature.value) for feature in self.vocabulary],
+                         [str, int, bool, float, type(None)])
+        self.assertEqual(self.vocabulary._decoded.keys(), set(range(5)))
+
+    def test_lazy_lookup(self):
+        self.assertEqual(self.vocabulary.get_id(Feature("Score", 0.5)), 3)
+        self.assertEqual(self.vocabulary._decoded.keys(), {3})  # only the candidates of the hash are decoded
+        self.assertEqual(self.vocabulary.get_id(Feature("Value of Question", 200.0)), 1)  # equal features match
+        self.assertIsNone(self.vocabulary.get_id(Feature("Value of Question", 400)))
+        self.assertIsNone(self.vocabulary.get_id(Feature("Value of Question", (200,))))
+
+    def test_intern_beyond_stored(self):
+        self.assertEqual(self.vocabulary.intern(Feature("Score", 0.5)), 3)
+        self.assertEqual(self.vocabulary.intern(Feature("Air year", 2004)), 5)
+        self.assertEqual(len(self.vocabulary), 6)
+        self.assertEqual(self.vocabulary.feature(5), Feature("Air year", 2004))
+
+        copy = pickle.loads(pickle.dumps(self.vocabulary))
+        self.assertEqual(list(copy), list(self.vocabulary))
+        self.assertEqual(copy.get_id(Feature("Air year", 2004)), 5)
+
+    def test_unsupported_values(self):
+        with self.assertRaises(TypeError):
+            vocabulary_sections([Feature("Answer words", ("the", "time"))])  # would come back as a list
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import math
+import os
+import random
+import tempfile
+import unittest
+from src.classifier.jeopardy_classifier_models import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class NaiveBayesClassifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cheap = Feature("Value bucket", "cheap")
+        self.pricey = Feature("Value bucket", "pricey")
+        self.history = Feature("Category family", "history")
+        self.science = Feature("Category family", "science")
+        self.training_set = [
+            FeatureSet({self.cheap, self.history}, "low"),
+            FeatureSet({self.cheap, self.science}, "low"),
+            FeatureSet({self.pricey, self.history}, "mid"),
+            FeatureSet({self.pricey}, "high"),
+            FeatureSet({self.pricey, self.science}, "high"),
+        ]
+
+    def test_train_any_labels(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"])
+
+        self.assertEqual(classifier.class_tallies, [2, 1, 2])
+        self.assertEqual(classifier.get_probability_dict()[self.pricey], [0.0, 1.0, 1.0])
+        self.assertEqual(classifier.predict(FeatureSet({self.cheap})).label, "low")
+        self.assertEqual(classifier.gamma(FeatureSet({self.pricey, self.science})), "high")
+
+    def test_train_needs_labels(self):
+        with self.assertRaises(ValueError):
+            NaiveBayesClassifier.train(self.training_set)
+
+    def test_unknown_label(self):
+        with self.assertRaises(ValueError):
+            NaiveBayesClassifier.train(self.training_set, labels=["low", "mid"])
+
+    def test_multinomial(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"], model="multinomial")
+
+        # "high" has 3 feature occurrences, 2 of them pricey, and 4 features were counted overall
+        self.assertAlmostEqual(classifier.log_gammas(FeatureSet({self.pricey}))[2],
+                               math.log(2/5) + math.log((2 + 1) / (3 + 4)))
+        self.assertEqual(classifier.predict(FeatureSet({self.cheap, self.history})).label, "low")
+
+    def test_multinomial_unsmoothed(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, smoothing=0.0, labels=["low", "mid", "high"],
+                                                model="multinomial")
+        from_probabilities = NaiveBayesClassifier(classifier.probability_dict, classifier.proportions_list,
+                                                  classifier.class_tallies, 0.0, model="multinomial",
+                                                  labels=["low", "mid", "high"])
+
+        expected = math.log(2/5) + math.log(2 / 3)
+        self.assertAlmostEqual(classifier.log_gammas(FeatureSet({self.pricey}))[2], expected)
+        self.assertAlmostEqual(from_probabilities.log_gammas(FeatureSet({self.pricey}))[2], expected)
+
+    def test_bernoulli_sparse_imbalanced(self):
+        # many uninformative words drawn from a large vocabulary, and a class with 100 times fewer training sets
+        rng = random.Random(5)
+        def feature_sets(clas, n):
+            return [FeatureSet({Feature("Word", rng.randrange(5000)) for _ in range(8)}, clas) for _ in range(n)]
+        training_set = feature_sets("common", 500) + feature_sets("rare", 5)
+        test_set = feature_sets("common", 100)
+
+        for model in EVENT_MODELS:
+            classifier = NaiveBayesClassifier.train(training_set, labels=["common", "rare"], model=model)
+            predictions = classifier.predict_many(test_set)
+            self.assertEqual(sum(prediction.label == "common" for prediction in predictions), 100, model)
+
+    def test_bernoulli_absent_features(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"])
+
+        # P(f | low) = (count + 1) / (2 + 2): cheap 3/4 present; pricey 1/4, history 2/4, science 2/4 absent
+        self.assertAlmostEqual(classifier.log_gammas(FeatureSet({self.cheap}))[0],
+                               math.log(2/5) + math.log(3/4) + math.log(3/4) + 2 * math.log(2/4))
+
+    def test_bernoulli_certain_features(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, smoothing=0.0, labels=["low", "mid", "high"])
+
+        # every "mid" and "high" training set is pricey, so a feature set that is not rules both out
+        self.assertEqual(classifier.log_gammas(FeatureSet({self.history}))[1:], [-math.inf, -math.inf])
+        self.assertAlmostEqual(classifier.log_gammas(FeatureSet({self.pricey, self.history}))[1], math.log(1/5))
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "model.nbc")
+            classifier.save(file_path)
+            loaded = NaiveBayesClassifier.load(file_path)
+            self.assertEqual(loaded.log_gammas(FeatureSet({self.history})),
+                             classifier.log_gammas(FeatureSet({self.history})))
+
+    def test_partial_fit_updates_tables(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"])
+        classifier.predict(FeatureSet({self.cheap}))
+        classifier.log_gammas(FeatureSet({self.cheap}), smoothing=0.0)
+        classifier.gamma(FeatureSet({self.cheap}))
+        new_feature = Feature("Category family", "art")
+
+        # "low" and "high" gain nothing: only the new feature's row and their priors change
+        classifier.partial_fit([FeatureSet({self.pricey, new_feature}, "mid")])
+
+        self.assertEqual(len(classifier._log_tables), 3)  # updated rather than dropped
+        for key, table in classifier._log_tables.items():
+            compiled = classifier.counts.scoring_table(*key)
+            self.assertEqual([list(column) for column in table.columns],
+                             [list(column) for column in compiled.columns], key)
+            for bias, compiled_bias in zip(table.bias, compiled.bias):
+                self.assertAlmostEqual(bias, compiled_bias)
+
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"], model="gaussian")
+
+    def test_prediction_cache(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"])
+        self.assertIsNone(classifier.prediction_cache)  # opt-in
+        classifier.use_prediction_cache()
+
+        first = classifier.predict_many([FeatureSet({self.cheap, self.history}), FeatureSet({self.pricey})])
+        again = classifier.predict_many([FeatureSet({self.history, self.cheap}), FeatureSet({self.pricey})])
+        self.assertEqual(first, again)
+        self.assertEqual((classifier.prediction_cache.hits, classifier.prediction_cache.misses), (2, 2))
+
+        classifier.log_gammas(FeatureSet({self.pricey}), smoothing=0.5)
+        classifier.compile(0.5)  # only drops the log gammas of the recompiled table
+        self.assertEqual(len(classifier.prediction_cache), 2)
+
+    def test_compile_after_probability_change(self):
+        trained = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"])
+        classifier = NaiveBayesClassifier(dict(trained.probability_dict), trained.proportions_list,
+                                          trained.class_tallies, labels=["low", "mid", "high"])
+        classifier.use_prediction_cache()
+        feature_set = FeatureSet({self.cheap})
+        self.assertEqual(classifier.gamma_batch([feature_set])[0], ["low"])
+
+        classifier.probability_dict[self.cheap] = [0.0, 1.0, 0.0]
+        classifier.compile()
+
+        self.assertEqual(classifier.gamma(feature_set), "mid")
+        self.assertEqual(classifier.gamma_batch([feature_set])[0], ["mid"])
+
+    def test_prediction_cache_eviction(self):
+        cache = PredictionCache(max_size=2)
+        cache.put(("a",), (1.0,))
+        cache.put(("b",), (2.0,))
+        cache.get(("a",))
+        cache.put(("c",), (3.0,))
+
+        self.assertEqual((cache.get(("a",)), cache.get(("b",)), len(cache)), ((1.0,), None, 2))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_prediction_cache_invalidated(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"]).use_prediction_cache()
+        self.assertEqual(classifier.predict(FeatureSet({self.pricey, self.history})).label, "mid")
+
+        classifier.partial_fit([FeatureSet({self.pricey, self.history}, "high")] * 3)
+        self.assertEqual(len(classifier.prediction_cache), 0)
+        self.assertEqual(classifier.predict(FeatureSet({self.pricey, self.history})).label, "high")
+
+    def test_present_features(self):
+        classifier = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"])
+
+        top_features = classifier.present_features(2)
+
+        self.assertEqual(len(top_features["low"]), 2)
+        self.assertEqual(top_features["low"][0][0], self.cheap)
+        self.assertEqual(top_features["high"][0][0], self.pricey)
+        # with smoothing 1: log((2 + 1) / (2 + 2)) - log((0 + 1) / (3 + 2))
+        self.assertAlmostEqual(top_features["low"][0][1], math.log(3 / 4) - math.log(1 / 5))
+        self.assertEqual(list(top_features), ["low", "mid", "high"])
+
+    def test_present_features_from_probabilities(self):
+        trained = NaiveBayesClassifier.train(self.training_set, labels=["low", "mid", "high"])
+        classifier = NaiveBayesClassifier(trained.probability_dict, trained.proportions_list, trained.class_tallies,
+                                          labels=["low", "mid", "high"])
+
+        self.assertEqual(classifier.present_features(3), trained.present_features(3))
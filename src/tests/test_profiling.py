@@ -0,0 +1,68 @@
+import json
+import unittest
+from src.classifier.jeopardy_classifier_models import *
+
+__author__ = "Connor Rogstad"
+__copyright__ = "Copyright 2023, Westmont College, Connor Rogstad"
+__credits__ = ["Connor Rogstad"]
+__license__ = "MIT"
+__email__ = ["crogstad@westmont.edu"]
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        question1 = {"category": "HISTORY", "question": "'For the last 8 years of his life, Galileo was under house arrest for espousing this man's theory'",
+                     "value": "$200", "answer": "Copernicus", "round": "Jeopardy!"}
+        question2 = {"category": "BRITISH NOVELS", "question": "'This 1895 novel is subtitled \"An Invention\"'",
+                     "value": None, "answer": "The Time Machine", "round": "Final Jeopardy!"}
+        self.feature_sets = [JeopardyFeatureSet.build(question, question["round"]) for question in [question1, question2]]
+
+    def test_inactive_by_default(self):
+        profiler = current_profiler()
+        self.assertFalse(profiler.enabled)
+        with profiler.stage("anything") as stage:
+            stage.add(3)
+        self.assertEqual(profiler.stages, {})
+
+    def test_stages(self):
+        with Profiler() as profiler:
+            self.assertIs(current_profiler(), profiler)
+            for _ in range(2):
+                with profiler.stage("work", 5) as stage:
+                    stage.add(1)
+            profiler.count("events", 2)
+            profiler.cache("lookups", 3, 1)
+        self.assertFalse(current_profiler().enabled)
+
+        report = json.loads(profiler.to_json())
+        self.assertEqual((report["stages"]["work"]["calls"], report["stages"]["work"]["items"]), (2, 12))
+        self.assertEqual(report["counters"], {"events": 2})
+        self.assertEqual(report["caches"]["lookups"]["hit_rate"], 0.75)
+
+    def test_nested_peaks(self):
+        with Profiler(trace_memory=True) as profiler:
+            with profiler.stage("outer"):
+                big = [0] * 500_000
+                del big
+                with profiler.stage("inner"):
+                    small = [0] * 1000
+                    del small
+
+        self.assertGreater(profiler.stages["outer"].peak_kb, 3000)
+        self.assertLess(profiler.stages["inner"].peak_kb, profiler.stages["outer"].peak_kb)
+
+    def test_classifier_stages(self):
+        with Profiler() as profiler:
+            classifier = JeopardyClassifier.train(self.feature_sets)
+            classifier.predict_many(self.feature_sets * 3)
+            classifier.gamma_batch(self.feature_sets[:1])
+
+        self.assertEqual(profiler.stages["train"].items, 2)
+        self.assertEqual(profiler.stages["predict_many"].items, 6)
+        self.assertEqual(profiler.stages["gamma_batch"].items, 1)
+        self.assertEqual(profiler.stages["compile"].calls, 2)  # smoothed for predict_many, unsmoothed for gamma_batch
+
+
+if __name__ == '__main__':
+    unittest.main()